@@ -18,17 +18,24 @@
 """
 
 
-from hyfed_client.util.status import OperationStatus, ProjectStatus
+from hyfed_client.util.status import OperationStatus, ProjectStatus, ProjectEvent
 from hyfed_client.util.hyfed_parameters import Parameter, CoordinationParameter, SyncParameter, \
-    MonitoringParameter, AuthenticationParameter, ConnectionParameter
+    MonitoringParameter, AuthenticationParameter, ConnectionParameter, NoiseSeedParameter
 from hyfed_client.util.hyfed_steps import HyFedProjectStep
 from hyfed_client.util.monitoring import Timer
 from hyfed_client.util.operation import ClientOperation
-from hyfed_client.util.endpoint import EndPoint
-from hyfed_client.util.utils import make_noisy
-
+from hyfed_client.util.endpoint import EndPoint, RoutingHeader
+from hyfed_client.util.utils import make_noisy, mask_value, delta_decode
+from hyfed_client.util.parameter_pack import ParameterPack, unpack_parameters
+from hyfed_client.util.modular import PRIME_RING, FLOAT32_FIXED_POINT, fixed_point_encode, fixed_point_data_type, \
+    is_float32
+from hyfed_client.util.noise import new_noise_seed, noise_generator, noise_streams, get_noise_shape, \
+    new_lane_noise, fill_lane_noise
+from hyfed_client.util import codec
+
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
-import pickle
+import threading
 import requests
 import datetime
 import time
@@ -74,7 +81,9 @@ class HyFedClientProject:
         # model related parameters client <-> server and client <-> compensator
         self.local_parameters = dict()
         self.global_parameters = dict()
+        self.global_parameters_round = -1  # the server communication round of the global parameters; -1 means none
         self.compensation_parameters = dict()  # a dictionary with the same keys as the self.local parameters but with noise values
+        self.noise_seed_parameters = dict()  # the seed and layout of the noise values in the seed-based compensation mode
         self.data_type_parameters = dict()   # a dictionary with the same keys as the self.local parameters but with data_type vlaues
 
         # a flag configurable in each project step, to hide the local parameters of the step from the server
@@ -83,17 +92,47 @@ class HyFedClientProject:
         # dtype of parameter, will set by the developer using set_compensator_flag(data_type)
         self.parameter_data_type = dict()
 
+        # (scale, ring) of the real-valued parameters that are encoded as fixed-point integers before masking (instead
+        # of being masked with Gaussian noise), set by the developer using set_compensator_flag(data_type, fixed_point);
+        # the encoded values are masked and aggregated exactly in the ring, and decoded by the server
+        self.fixed_point_parameters = dict()
+
         # a flag which indicates whether the compensator ever used in the project.
         # if so, a dummy parameter will be sent to compensator in the Result step to enforce the compensator to share
         # its monitoring parameters from the previous step with the server. This way, the compensator time will not be ignored for
         # the last step it was used
         self.compensator_ever_used = False
 
+        # if True, the local parameters are packed into one contiguous buffer per lane (see ParameterPack) after
+        # they are computed, so they are masked, encoded, and aggregated with one numpy operation per lane
+        self.parameter_packing = True
+
+        # if True, the noise values are drawn from a secret seed of the round, and the compensator receives the seed
+        # (and the shapes) instead of the noise values, so the client -> compensator traffic is O(1) per parameter;
+        # the client and compensator must use the same numpy version to generate the same noise from the seed
+        self.seed_based_compensation = False
+
+        # the noise of the lanes is drawn by multiple threads (noise_thread_count) from a counter-based generator, and
+        # the noise of the next round is precomputed in the background while the client waits for the server, for the
+        # lane sizes of the last masked round (a lane whose size changes gets fresh noise instead)
+        self.noise_thread_count = os.cpu_count() or 1
+        self.noise_executor = None  # created on the first use
+        self.noise_precomputation = True
+        self.noise_lane_sizes = dict()  # lane -> size in the last masked round
+        self.precomputed_noise_seed = None
+        self.precomputed_noise = dict()  # lane -> (noise buffer, gaussian std, futures of the noise chunks)
+
         # standard deviation of the Gaussian distribution to generate noise
         # for negative integers and floating-point values
         # the value of this parameter can be changed by the corresponding setter function
         self.gaussian_std = 1e6
 
+        # compression of the payloads sent to the server and compensator; the algorithms are negotiated using the
+        # compression algorithms the server/compensator reports in its responses (no compression until then)
+        self.server_compression = codec.Compression.NONE
+        self.compensator_compression = codec.Compression.NONE
+        self.compression_level = None  # None means the default level of the algorithm
+
         # monitoring timers; they are reset in receive_parameters_from_server in communication round 1
         self.computation_timer = Timer(name='Computation')
         self.network_send_timer = Timer(name='Network Send')
@@ -102,6 +141,14 @@ class HyFedClientProject:
 
         # server inquiry period and timeouts (in seconds)
         self.inquiry_period = 5
+        self.long_poll_timeout = 30  # the server holds the global model request until ready or timeout; 0 disables it
+
+        # project event channel through which the server pushes the project events; if the channel is not connected,
+        # the client polls the server every inquiry_period seconds
+        self.event_channel_enabled = True
+        self.event_channel_connected = False
+        self.event_channel_timeout = 60  # maximum wait for an event (or heartbeat) before polling the server anyway
+        self.project_event = threading.Event()  # set when an event is pushed from the server
         self.inquiry_timeout = 60
         self.upload_parameters_timeout = 600
         self.download_parameters_timeout = 600
@@ -151,6 +198,12 @@ class HyFedClientProject:
     def set_inquiry_period(self, inquiry_period):
         self.inquiry_period = inquiry_period
 
+    def set_long_poll_timeout(self, long_poll_timeout):
+        self.long_poll_timeout = long_poll_timeout
+
+    def set_event_channel_enabled(self, event_channel_enabled):
+        self.event_channel_enabled = event_channel_enabled
+
     def set_inquiry_timeout(self, inquiry_timeout):
         self.inquiry_timeout = inquiry_timeout
 
@@ -177,6 +230,100 @@ class HyFedClientProject:
         time.sleep(seconds)
         self.idle_timer.stop()
 
+    def wait_for_project_event(self, seconds):
+        """
+            Wait until the server pushes an event through the project event channel (at most event_channel_timeout
+            seconds) or, if the channel is not connected, wait for seconds (i.e. polling) while keeping track of idle time
+        """
+
+        if not self.event_channel_connected:
+            self.wait(seconds)
+            return
+
+        if self.project_step == HyFedProjectStep.INIT:
+            self.project_event.wait(timeout=self.event_channel_timeout)
+            return
+
+        self.idle_timer.start()
+        self.project_event.wait(timeout=self.event_channel_timeout)
+        self.idle_timer.stop()
+
+    # ####### Project event channel (client <- server)
+    def start_event_listener(self):
+        """ Open the project event channel in a background thread if it is enabled """
+
+        if not self.event_channel_enabled:
+            return
+
+        event_listener_thread = threading.Thread(target=self.listen_to_project_events, daemon=True)
+        event_listener_thread.start()
+
+    def listen_to_project_events(self):
+        """
+            Keep the project event channel open until the client is done with the project; the server closes
+            the channel periodically, after which it is re-opened right away; if the channel drops, the client falls
+            back to polling and the channel is re-opened after inquiry_period seconds; if the server has the channel
+            disabled, the client only polls
+        """
+
+        try:
+            request_body = {
+                Parameter.AUTHENTICATION: {
+                    AuthenticationParameter.USERNAME: self.username,
+                    AuthenticationParameter.TOKEN: self.token,
+                    AuthenticationParameter.PROJECT_ID: self.project_id
+                }
+            }
+            serialized_request_body = codec.encode(request_body)
+        except Exception as serialization_exp:
+            self.log(f'\t{serialization_exp}\n')
+            return
+
+        while self.project_step != HyFedProjectStep.FINISHED and not self.is_client_operation_aborted() \
+                and not self.is_operation_status_failed():
+            try:
+                with requests.get(url=f'{self.server_url}/{EndPoint.PROJECT_EVENTS}',
+                                  data=serialized_request_body,
+                                  headers={RoutingHeader.PROJECT_ID: self.project_id},
+                                  stream=True,
+                                  timeout=(self.inquiry_timeout, self.event_channel_timeout)) as response:
+
+                    if response.status_code == 501:
+                        self.log("Project event channel is disabled on the server; polling the server ...")
+                        return
+
+                    if response.status_code == 200:
+                        self.event_channel_connected = True
+
+                        # the server pushes the current state of the project right after the connection, and then
+                        # each event as it happens; the waiting client is woken up on any event to inquire the server
+                        event_name = None
+                        heartbeat_received = False
+                        for line in response.iter_lines(decode_unicode=True):
+                            if line.startswith(':'):
+                                heartbeat_received = True
+                            elif line.startswith('event:'):
+                                event_name = line[len('event:'):].strip()
+                            elif line == '' and event_name is not None:
+                                if event_name in (ProjectEvent.FAILED, ProjectEvent.ABORTED):
+                                    self.log(f"Got {event_name} event from the server!")
+                                self.project_event.set()
+                                event_name = None
+
+                        # closed by the server after its maximum lifetime (see PROJECT_EVENTS_MAX_HEARTBEATS) rather
+                        # than at the end of the project: re-open the channel right away
+                        if heartbeat_received:
+                            continue
+
+            except Exception as event_channel_exception:
+                if self.event_channel_connected:
+                    self.log(f"Project event channel dropped ({event_channel_exception}); falling back to polling ...")
+
+            # wake up the waiting client so that it polls the server until the channel is re-opened
+            self.event_channel_connected = False
+            self.project_event.set()
+            time.sleep(self.inquiry_period)
+
     # ####### Run the client project
     def run(self):
         """ The main pipeline of the client project """
@@ -184,10 +331,13 @@ class HyFedClientProject:
         # log the general info of the project such as participant username, project id, coordinator username, etc
         self.log_project_info()
 
+        # open the channel through which the server pushes the project events (e.g. project started, parameters ready)
+        self.start_event_listener()
+
         # (I) wait for server to start project
         self.wait_for_project_start()
 
-        # if error occurred during the pickling of the authentication parameters, terminate the project run
+        # if error occurred during the serialization of the authentication parameters, terminate the project run
         if self.is_operation_status_failed():
             return
 
@@ -196,7 +346,7 @@ class HyFedClientProject:
             # (II) download parameters from the server
             self.receive_parameters_from_server()
 
-            # if error occurred during the pickling of the authentication parameters, terminate the project
+            # if error occurred during the serialization of the authentication parameters, terminate the project
             if self.is_operation_status_failed():
                 return
 
@@ -216,10 +366,13 @@ class HyFedClientProject:
             # (IV) share local parameters with the server and compensation parameters with compensator if self.compensator_flag is True
             self.send_client_parameters()
 
-            # if error occurred during the pickling of the client parameters, terminate the project
+            # if error occurred during the serialization of the client parameters, terminate the project
             if self.is_operation_status_failed():
                 return
 
+            # draw the noise of the next round while waiting for the server
+            self.precompute_noise()
+
     # ####### (I) Wait until server starts project (client <- server)
     def wait_for_project_start(self):
         """ Inquire the server until server tells the client that project started """
@@ -236,23 +389,25 @@ class HyFedClientProject:
                     AuthenticationParameter.PROJECT_ID: self.project_id
                 }
             }
-            serialized_request_body = pickle.dumps(request_body)
-        except Exception as pickling_exp:
-            self.log(f'\t{pickling_exp}\n')
+            serialized_request_body = codec.encode(request_body)
+        except Exception as serialization_exp:
+            self.log(f'\t{serialization_exp}\n')
             self.set_operation_status_failed()
             self.set_client_operation_aborted()
             return
 
         while True:
             try:
-                # inquire the server periodically
+                # inquire the server periodically (or whenever the server pushes an event)
                 self.log("Inquiring the server to see whether project started ...")
+                self.project_event.clear()
                 response = requests.get(url=f'{self.server_url}/{EndPoint.PROJECT_STARTED}',
                                         data=serialized_request_body,
+                                        headers={RoutingHeader.PROJECT_ID: self.project_id},
                                         timeout=self.inquiry_timeout)
 
                 if response.status_code == 200:
-                    json_response = pickle.loads(response.content)
+                    json_response = codec.decode(response.content)
                     project_started = json_response[CoordinationParameter.PROJECT_STARTED]
 
                     if project_started:
@@ -262,7 +417,7 @@ class HyFedClientProject:
                 else:
                     self.log(f"Got {response.status_code} status code from the server!")
 
-                time.sleep(self.inquiry_period)
+                self.wait_for_project_event(seconds=self.inquiry_period)
 
             except Exception as exception:
                 self.log(f"\t{exception}\n")
@@ -274,7 +429,9 @@ class HyFedClientProject:
 
         self.client_operation = ClientOperation.WAITING_FOR_AGGREGATION
 
-        self.wait(seconds=self.inquiry_period)
+        # with long polling, the server itself holds the request until the global parameters are ready
+        if self.long_poll_timeout == 0:
+            self.wait_for_project_event(seconds=self.inquiry_period)
 
         # initialize client authentication parameters
         serialized_client_parameters = self.prepare_server_parameters(sync_param_flag=True, monitoring_param_flag=False, local_param_flag=False)
@@ -288,9 +445,12 @@ class HyFedClientProject:
                 if self.project_step != HyFedProjectStep.RESULT:
                     self.log("Inquiring the server to see whether global parameters are ready ...")
 
+                self.project_event.clear()
                 self.network_receive_timer.start()
+                inquiry_start_time = time.time()
                 response = requests.get(url=f'{self.server_url}/{EndPoint.GLOBAL_MODEL}',
                                         data=serialized_client_parameters,
+                                        headers={RoutingHeader.PROJECT_ID: self.project_id},
                                         timeout=self.download_parameters_timeout)
 
             except Exception as network_exp:
@@ -310,22 +470,57 @@ class HyFedClientProject:
                 self.computation_timer.start()
 
                 # extract coordination parameters
-                server_parameters = pickle.loads(response.content)
+                server_parameters = codec.decode(response.content)
                 coordination_parameters = server_parameters[Parameter.COORDINATION]
                 server_project_id = coordination_parameters[CoordinationParameter.PROJECT_ID]
                 server_project_status = coordination_parameters[CoordinationParameter.PROJECT_STATUS]
                 server_project_step = coordination_parameters[CoordinationParameter.PROJECT_STEP]
                 server_comm_round = coordination_parameters[CoordinationParameter.COMM_ROUND]
+                self.server_compression = codec.negotiate_compression(coordination_parameters[CoordinationParameter.COMPRESSION])
 
                 self.computation_timer.stop()
 
-            except Exception as unpickling_exception:
-                self.log(f'\t{unpickling_exception}\n')
+            except Exception as deserialization_exception:
+                self.log(f'\t{deserialization_exception}\n')
                 self.computation_timer.stop()
                 self.network_receive_timer.ignore()
                 self.wait(seconds=self.inquiry_period)
                 continue
 
+            # the global parameters shared with all clients are fetched separately using their content hash
+            if server_comm_round == self.comm_round + 1 and \
+                    CoordinationParameter.GLOBAL_PARAMETERS_HASH in coordination_parameters.keys():
+                try:
+                    global_parameters_hash = coordination_parameters[CoordinationParameter.GLOBAL_PARAMETERS_HASH]
+                    global_parameters_capability = \
+                        coordination_parameters[CoordinationParameter.GLOBAL_PARAMETERS_CAPABILITY]
+                    server_parameters.update(self.fetch_global_parameters(global_parameters_hash,
+                                                                          global_parameters_capability))
+                except Exception as fetch_exception:
+                    self.log(f'\t{fetch_exception}\n')
+                    self.network_receive_timer.ignore()
+                    self.wait(seconds=self.inquiry_period)
+                    continue
+
+            # reconstruct the global parameters (some might be sent as delta against those of the previous round)
+            global_parameters = dict()
+            if server_comm_round == self.comm_round + 1:
+                self.computation_timer.start()
+                global_parameters = self.reconstruct_global_parameters(server_parameters)
+                self.computation_timer.stop()
+
+            # if the global parameters cannot be reconstructed from the deltas, request the full global parameters
+            if global_parameters is None:
+                self.log("Global parameters cannot be reconstructed! Requesting the full global parameters ...")
+                self.network_receive_timer.ignore()
+                self.global_parameters_round = -1
+                serialized_client_parameters = self.prepare_server_parameters(sync_param_flag=True, monitoring_param_flag=False, local_param_flag=False)
+                if self.is_operation_status_failed():
+                    self.set_client_operation_aborted()
+                    return
+                self.client_operation = ClientOperation.WAITING_FOR_AGGREGATION
+                continue
+
             # make sure the client is synced with the server,
             # i.e. the same project id as well as communication round difference of at most 1 )
             self.computation_timer.start()
@@ -363,7 +558,10 @@ class HyFedClientProject:
                 self.project_status = server_project_status
                 self.computation_timer.stop()
                 self.network_receive_timer.ignore()
-                self.wait(seconds=self.inquiry_period)
+
+                # inquire again immediately if the server held the request for the whole long polling timeout
+                if self.long_poll_timeout == 0 or time.time() - inquiry_start_time < self.long_poll_timeout:
+                    self.wait_for_project_event(seconds=self.inquiry_period)
                 continue
 
             # if parameters are ready, sync with the server and extract global parameters
@@ -387,7 +585,8 @@ class HyFedClientProject:
                 self.project_status = server_project_status
 
                 # set global parameters
-                self.global_parameters = server_parameters[Parameter.GLOBAL]
+                self.global_parameters = global_parameters
+                self.global_parameters_round = server_comm_round
 
                 # computation timer already stopped during reset in communication round 1, so just stop the timer in
                 # comm_round > 1
@@ -404,6 +603,54 @@ class HyFedClientProject:
 
                 return
 
+    def reconstruct_global_parameters(self, server_parameters):
+        """
+            Reconstruct the global parameters from the server parameters, where the values of some global parameters
+            might be sent as delta against the values from the previous round;
+            return None if the deltas are not computed against the global parameters the client holds
+        """
+
+        try:
+            global_parameters = unpack_parameters(server_parameters[Parameter.GLOBAL])
+            global_parameter_deltas = server_parameters[Parameter.GLOBAL_DELTA]
+            if not global_parameter_deltas:
+                return global_parameters
+
+            # the deltas must be computed against the global parameters of the same round as those the client holds
+            global_base_round = server_parameters[Parameter.COORDINATION][CoordinationParameter.GLOBAL_BASE_ROUND]
+            if global_base_round != self.global_parameters_round:
+                self.log(f"Global parameters round mismatch ({self.global_parameters_round} vs. {global_base_round})!")
+                return None
+
+            for parameter_name, (delta_kind, delta_byte_planes) in global_parameter_deltas.items():
+                global_parameters[parameter_name] = delta_decode(delta_kind, delta_byte_planes,
+                                                                 self.global_parameters[parameter_name])
+        except Exception as delta_exp:
+            self.log(f'\t{delta_exp}\n')
+            return None
+
+        return global_parameters
+
+    def fetch_global_parameters(self, global_parameters_hash, global_parameters_capability):
+        """
+            Fetch the serialized global parameters shared with all clients using their content hash and the capability
+            the server gave this client for them (part of the URL, so no request body is sent);
+            the content is verified against the hash
+        """
+
+        response = requests.get(url=f'{self.server_url}/{EndPoint.GLOBAL_PARAMETERS}{self.project_id}/'
+                                    f'{global_parameters_hash}/{global_parameters_capability}/',
+                                headers={RoutingHeader.PROJECT_ID: self.project_id},
+                                timeout=self.download_parameters_timeout)
+
+        if response.status_code != 200:
+            raise ValueError(f"Got {response.status_code} status code while fetching the global parameters!")
+
+        if hashlib.sha256(response.content).hexdigest() != global_parameters_hash:
+            raise ValueError("The content hash of the fetched global parameters does not match!")
+
+        return codec.decode(response.content)
+
     # ####### (III) compute local model parameters
     def pre_compute_local_parameters(self):
         """
@@ -416,6 +663,7 @@ class HyFedClientProject:
         self.set_operation_status_in_progress()
         self.local_parameters = dict()
         self.compensation_parameters = dict()
+        self.noise_seed_parameters = dict()
         self.data_type_parameters = dict()
         self.unset_compensator_flag()
         self.log(f"######### Communication round # {self.comm_round }")
@@ -474,10 +722,10 @@ class HyFedClientProject:
                     AuthenticationParameter.PROJECT_ID: self.project_id
                 }
             }
-            serialized_request_body = pickle.dumps(request_body)
+            serialized_request_body = codec.encode(request_body)
 
-        except Exception as pickling_exp:
-            self.log(f'\t{pickling_exp}\n')
+        except Exception as serialization_exp:
+            self.log(f'\t{serialization_exp}\n')
             self.set_operation_status_failed()
             self.set_client_operation_aborted()
             return
@@ -490,6 +738,7 @@ class HyFedClientProject:
 
                 response = requests.get(url=result_url,
                                         data=serialized_request_body,
+                                        headers={RoutingHeader.PROJECT_ID: self.project_id},
                                         timeout=self.download_result_timeout)
 
                 if response.status_code == 200:
@@ -555,12 +804,17 @@ class HyFedClientProject:
                 self.network_send_timer.start()
                 response = requests.post(url=f'{self.server_url}/{EndPoint.MODEL_AGGREGATION}',
                                          data=server_parameters_serialized,
+                                         headers={RoutingHeader.PROJECT_ID: self.project_id},
                                          timeout=self.upload_parameters_timeout)
                 self.network_send_timer.stop()
 
                 if response.status_code == 200:
                     self.log("Done!")
                     return
+                elif response.status_code == 409:
+                    # the server already started the aggregation of the round without these parameters
+                    self.log("Rejected: the server has already started the aggregation!")
+                    return
                 else:
                     self.log(f"Failed: got {response.status_code} status code from the server!")
                     self.wait(self.inquiry_period)
@@ -591,8 +845,9 @@ class HyFedClientProject:
                 self.network_send_timer.stop()
 
                 if response.status_code == 200:
-                    response_json = pickle.loads(response.content)
+                    response_json = codec.decode(response.content)
                     should_retry = response_json[SyncParameter.SHOULD_RETRY]
+                    self.compensator_compression = codec.negotiate_compression(response_json[SyncParameter.COMPRESSION])
 
                     if not should_retry:
                         self.log("Done!")
@@ -619,6 +874,16 @@ class HyFedClientProject:
         if self.compensator_ever_used and self.project_step == HyFedProjectStep.RESULT:
             self.set_compensator_flag({})
 
+        if self.compensator_flag and self.fixed_point_parameters:
+            self.encode_fixed_point_parameters()
+            if self.is_operation_status_failed():
+                self.log("Failed!")
+                return
+
+        if self.parameter_packing:
+            self.local_parameters = ParameterPack.pack(self.local_parameters,
+                                                       self.parameter_data_type if self.compensator_flag else None)
+
         if self.compensator_flag:
             # add noise to the local model parameters
             self.make_local_parameters_noisy()
@@ -639,18 +904,55 @@ class HyFedClientProject:
             self.send_parameters_to_server()
 
     # ####### Compensator related functions
-    def set_compensator_flag(self, data_type):
+    def set_compensator_flag(self, data_type, fixed_point=None):
+        """
+            data_type is a dictionary of the parameter names and their data types (see DataType); fixed_point is
+            a dictionary of the names of the real-valued parameters to encode as fixed-point integers and their
+            scale (the values are rounded to multiples of 1/scale) or (scale, ring), where ring is PRIME_RING (default),
+            WRAPAROUND_RING, or WRAPAROUND32_RING; the float32 parameters are encoded as int32 fixed-point integers by
+            default (see FLOAT32_FIXED_POINT), since float32 Gaussian noise is too coarse to be removed without wiping
+            out the values; a float32 parameter mapped to None in fixed_point is masked with float32 Gaussian noise
+        """
+
         self.compensator_flag = True
         self.compensator_ever_used = True
-        self.parameter_data_type = data_type
+        self.parameter_data_type = dict(data_type)
+        self.fixed_point_parameters = {parameter_name: FLOAT32_FIXED_POINT
+                                       for parameter_name, parameter_type in self.parameter_data_type.items()
+                                       if is_float32(parameter_type)}
+        for parameter_name, spec in (fixed_point or dict()).items():
+            if spec is None:
+                self.fixed_point_parameters.pop(parameter_name, None)
+            else:
+                self.fixed_point_parameters[parameter_name] = spec if isinstance(spec, tuple) else (spec, PRIME_RING)
 
     def unset_compensator_flag(self):
         self.compensator_flag = False
         self.parameter_data_type = dict()
+        self.fixed_point_parameters = dict()
 
     def is_compensator_flag_set(self):
         return self.compensator_flag
 
+    def encode_fixed_point_parameters(self):
+        """ Encode the fixed-point parameters as integers in their ring, which are then masked like other integers """
+
+        try:
+            self.computation_timer.start()
+
+            for parameter_name, (scale, ring) in self.fixed_point_parameters.items():
+                local_parameter_value = self.local_parameters[parameter_name]
+                self.local_parameters[parameter_name] = fixed_point_encode(local_parameter_value, scale, ring)
+                self.parameter_data_type[parameter_name] = fixed_point_data_type(local_parameter_value, ring)
+
+            self.computation_timer.stop()
+
+        except Exception as encode_exp:
+            self.log(f'\t{encode_exp}\n')
+            self.computation_timer.stop()
+            self.set_operation_status_failed()
+            self.set_client_operation_aborted()
+
     def make_local_parameters_noisy(self):
         """ Add HIGH noise to the local parameter values """
 
@@ -660,16 +962,55 @@ class HyFedClientProject:
             self.log("Making the local model highly NOISY ...")
             self.computation_timer.start()
 
+            # the values that are not packed are made noisy one by one
+            packed_parameters = self.local_parameters if isinstance(self.local_parameters, ParameterPack) else None
+            local_parameters = self.local_parameters if packed_parameters is None else packed_parameters.extras
+
+            # the noise is drawn from the (independent) streams of a secret seed of the round (the seed of the
+            # precomputed noise, if any); in the seed-based compensation mode, only the seed and the layout of the
+            # noise values are shared with the compensator
+            noise_seed = self.precomputed_noise_seed if self.precomputed_noise else new_noise_seed()
+            parameter_streams = noise_streams(local_parameters.keys())
+
+            # the packed local parameters are made noisy with one addition per lane;
+            # the lanes of the unmasked parameters are not supported since all parameters must be masked
+            if packed_parameters is not None:
+                noisy_buffers = dict()
+                noise_buffers = dict()
+                for lane, buffer in packed_parameters.buffers.items():
+                    lane_data_type = ParameterPack.get_lane_data_type(lane)
+                    if lane_data_type is None:
+                        self.log(f"Unsupported local parameter format (lane {lane})!")
+                        self.set_operation_status_failed()
+                        self.set_client_operation_aborted()
+                        return
+
+                    noise_buffers[lane] = self.get_lane_noise(lane, buffer.size, noise_seed)
+                    noisy_buffers[lane] = mask_value(buffer, noise_buffers[lane], lane_data_type)
+
+                self.noise_lane_sizes = {lane: buffer.size for lane, buffer in packed_parameters.buffers.items()}
+
+                for local_parameter_name in packed_parameters.keys():
+                    self.data_type_parameters[local_parameter_name] = self.parameter_data_type[local_parameter_name]
+
+                self.local_parameters = ParameterPack(noisy_buffers, packed_parameters.index)
+                self.compensation_parameters = ParameterPack(noise_buffers, packed_parameters.index)
+
+            # the precomputed noise must never be used in more than one round
+            self.precomputed_noise = dict()
+            self.precomputed_noise_seed = None
+
             # for each local parameter, do
-            for local_parameter_name in self.local_parameters.keys():
+            for local_parameter_name in local_parameters.keys():
 
                 # get the value(s) of the local parameter
-                local_parameter_values = self.local_parameters[local_parameter_name]
+                local_parameter_values = local_parameters[local_parameter_name]
 
                 # make the local model parameters noisy
+                generator = noise_generator(noise_seed, parameter_streams[local_parameter_name])
                 noisy_local_parameter_values, noise_values = make_noisy(local_parameter_values,
                                                                         self.parameter_data_type[local_parameter_name],
-                                                                        self.gaussian_std)
+                                                                        self.gaussian_std, generator)
 
                 # if error occurred in making the parameter value noisy, fail project
                 if noisy_local_parameter_values is None or noise_values is None:
@@ -682,15 +1023,30 @@ class HyFedClientProject:
                     self.set_client_operation_aborted()
                     return
 
-                # put noisy local model values in the local parameters
-                self.local_parameters[local_parameter_name] = noisy_local_parameter_values
-
-                # add noise values to the compensation parameters
-                self.compensation_parameters[local_parameter_name] = noise_values
+                # put noisy local model values in the local parameters (or in the extras of the packed ones)
+                if isinstance(self.local_parameters, ParameterPack):
+                    self.local_parameters.extras[local_parameter_name] = noisy_local_parameter_values
+                    self.compensation_parameters.extras[local_parameter_name] = noise_values
+                else:
+                    self.local_parameters[local_parameter_name] = noisy_local_parameter_values
+                    self.compensation_parameters[local_parameter_name] = noise_values
 
                 # add data type info of the local parameter into data_type parmaeters
                 self.data_type_parameters[local_parameter_name] = self.parameter_data_type[local_parameter_name]
 
+            # the compensator regenerates the noise values from the seed, so they are not sent
+            if self.seed_based_compensation:
+                self.noise_seed_parameters = {
+                    NoiseSeedParameter.SEED: noise_seed,
+                    NoiseSeedParameter.GAUSSIAN_STD: self.gaussian_std,
+                    NoiseSeedParameter.LANE_SIZES: {lane: buffer.size for lane, buffer in packed_parameters.buffers.items()}
+                    if packed_parameters else dict(),
+                    NoiseSeedParameter.INDEX: packed_parameters.index if packed_parameters else dict(),
+                    NoiseSeedParameter.SHAPES: {local_parameter_name: get_noise_shape(local_parameter_value)
+                                                for local_parameter_name, local_parameter_value in local_parameters.items()}
+                }
+                self.compensation_parameters = dict()
+
             self.computation_timer.stop()
 
         except Exception as noise_exp:
@@ -700,6 +1056,48 @@ class HyFedClientProject:
             self.set_operation_status_failed()
             self.set_client_operation_aborted()
 
+    def get_noise_executor(self):
+        """ Thread pool in which the noise chunks are drawn """
+
+        if self.noise_executor is None:
+            self.noise_executor = ThreadPoolExecutor(max_workers=self.noise_thread_count, thread_name_prefix='noise')
+
+        return self.noise_executor
+
+    def get_lane_noise(self, lane, size, noise_seed):
+        """ Noise of the lane with the given size: the precomputed one if it matches, otherwise drawn in parallel """
+
+        precomputed_noise = self.precomputed_noise.pop(lane, None)
+        if precomputed_noise is not None and noise_seed == self.precomputed_noise_seed:
+            noise, gaussian_std, noise_futures = precomputed_noise
+            if noise.size == size and gaussian_std == self.gaussian_std:
+                for noise_future in noise_futures:
+                    noise_future.result()
+                return noise
+
+        noise = new_lane_noise(lane, size)
+        for noise_future in fill_lane_noise(noise, lane, self.gaussian_std, noise_seed, self.get_noise_executor()):
+            noise_future.result()
+
+        return noise
+
+    def precompute_noise(self):
+        """
+            Start drawing the noise of the next round in the background for the lane sizes of the last masked round,
+            so that making the local parameters noisy is just an addition; called while waiting for the server
+        """
+
+        if not self.noise_precomputation or not self.noise_lane_sizes:
+            return
+
+        self.precomputed_noise_seed = new_noise_seed()
+        self.precomputed_noise = dict()
+        for lane, size in self.noise_lane_sizes.items():
+            noise = new_lane_noise(lane, size)
+            noise_futures = fill_lane_noise(noise, lane, self.gaussian_std, self.precomputed_noise_seed,
+                                            self.get_noise_executor())
+            self.precomputed_noise[lane] = (noise, self.gaussian_std, noise_futures)
+
     # ####### Helper functions
     def prepare_server_parameters(self, sync_param_flag=True, monitoring_param_flag=True, local_param_flag=True):
         """ Prepare the parameters shared with the server """
@@ -723,6 +1121,9 @@ class HyFedClientProject:
                 sync_parameters[SyncParameter.COMM_ROUND] = self.comm_round
                 sync_parameters[SyncParameter.OPERATION_STATUS] = self.operation_status
                 sync_parameters[SyncParameter.COMPENSATOR_FLAG] = self.compensator_flag
+                sync_parameters[SyncParameter.COMPRESSION] = codec.available_compressions()
+                sync_parameters[SyncParameter.GLOBAL_PARAMETERS_ROUND] = self.global_parameters_round
+                sync_parameters[SyncParameter.LONG_POLL_TIMEOUT] = self.long_poll_timeout
 
             # initialize monitoring parameters
             monitoring_parameters = dict()
@@ -742,16 +1143,18 @@ class HyFedClientProject:
             parameters_json = {Parameter.AUTHENTICATION: authentication_parameters,
                                Parameter.SYNCHRONIZATION: sync_parameters,
                                Parameter.MONITORING: monitoring_parameters,
-                               Parameter.LOCAL: local_parameters
+                               Parameter.LOCAL: local_parameters,
+                               Parameter.DATA_TYPE: self.data_type_parameters if local_param_flag else dict(),
+                               Parameter.FIXED_POINT: self.fixed_point_parameters if local_param_flag else dict()
                                }
-            parameters_serialized = pickle.dumps(parameters_json)
+            parameters_serialized = codec.encode(parameters_json, self.server_compression, self.compression_level)
 
             self.computation_timer.stop()
 
             return parameters_serialized
 
-        except Exception as pickling_exp:
-            self.log(f'\t{pickling_exp}\n')
+        except Exception as serialization_exp:
+            self.log(f'\t{serialization_exp}\n')
             self.computation_timer.stop()
             self.set_operation_status_failed()
             self.set_client_operation_aborted()
@@ -789,16 +1192,17 @@ class HyFedClientProject:
                                Parameter.SYNCHRONIZATION: sync_parameters,
                                Parameter.CONNECTION: connection_parameters,
                                Parameter.COMPENSATION: self.compensation_parameters,
+                               Parameter.NOISE_SEED: self.noise_seed_parameters,
                                Parameter.DATA_TYPE: self.data_type_parameters
                                }
-            parameters_serialized = pickle.dumps(parameters_json)
+            parameters_serialized = codec.encode(parameters_json, self.compensator_compression, self.compression_level)
 
             self.computation_timer.stop()
 
             return parameters_serialized
 
-        except Exception as pickling_exp:
-            self.log(f'\t{pickling_exp}\n')
+        except Exception as serialization_exp:
+            self.log(f'\t{serialization_exp}\n')
             self.computation_timer.stop()
             self.set_operation_status_failed()
             self.set_client_operation_aborted()
@@ -868,12 +1272,27 @@ class HyFedClientProject:
             self.set_operation_status_failed()
 
     # ####### setter functions
+    def set_parameter_packing(self, parameter_packing):
+        self.parameter_packing = parameter_packing
+
+    def set_seed_based_compensation(self, seed_based_compensation):
+        self.seed_based_compensation = seed_based_compensation
+
+    def set_noise_thread_count(self, noise_thread_count):
+        self.noise_thread_count = noise_thread_count
+
+    def set_noise_precomputation(self, noise_precomputation):
+        self.noise_precomputation = noise_precomputation
+
     def set_gaussian_std(self, gaussian_std):
         if gaussian_std < 1000:
             self.gaussian_std = 1000
         else:
             self.gaussian_std = gaussian_std
 
+    def set_compression_level(self, compression_level):
+        self.compression_level = compression_level
+
     # ####### getter functions
     def get_name(self):
         return self.name
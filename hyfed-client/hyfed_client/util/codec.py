@@ -0,0 +1,459 @@
+"""
+    Binary codec to serialize the parameters exchanged between the clients, server, and compensator
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_client.util.parameter_pack import ParameterPack
+from hyfed_client.util.sparse import SparseArray
+import struct
+import zlib
+import numpy as np
+
+# zstd and lz4 are optional; zlib (standard library) is always available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Layout of an encoded payload:
+#   header:    magic (4 bytes), version (1 byte), compression (1 byte), reserved (2 bytes),
+#              structure size (8 bytes), data section offset (8 bytes), body size (8 bytes)
+#   body:      (optionally compressed) structure section followed by the data section
+#   structure: the nested dict/list/scalar tree; numpy arrays are stored as references into the data section,
+#              parameter packs as the dict of their lane buffers, index, and extras, and sparse arrays as the dict
+#              of their shape, indices, and values
+#   data:      the raw buffers of the numpy arrays, each aligned to BUFFER_ALIGNMENT bytes (relative to the body)
+# Decoding the arrays is zero-copy (np.frombuffer on the (decompressed) body), so the decoded arrays are READ-ONLY.
+
+CODEC_MAGIC = b'HYFC'
+CODEC_VERSION = 2  # version 1 had no body size in the header; the header layout depends on the version
+BUFFER_ALIGNMENT = 64
+
+_HEADER_PREFIX = struct.Struct('<4sB')  # magic and version, the same in all versions
+_HEADER = struct.Struct('<4sBBHQQQ')
+
+
+class Compression:
+    """ Compression algorithms of the payload body; the order of ALL is the order of preference """
+
+    NONE = 'none'
+    ZSTD = 'zstd'
+    LZ4 = 'lz4'
+    ZLIB = 'zlib'
+
+    ALL = [ZSTD, LZ4, ZLIB]
+
+
+_COMPRESSION_IDS = {Compression.NONE: 0, Compression.ZLIB: 1, Compression.ZSTD: 2, Compression.LZ4: 3}
+_COMPRESSION_NAMES = {compression_id: name for name, compression_id in _COMPRESSION_IDS.items()}
+
+# bodies smaller than this are never compressed
+MIN_COMPRESSION_SIZE = 1024
+
+# a body is sent compressed only if the compressed size is at most this fraction of the uncompressed size;
+# for large bodies, a sample is compressed first, so incompressible payloads (e.g. Gaussian noisy floats) are
+# detected without compressing the whole body
+MAX_COMPRESSION_RATIO = 0.9
+COMPRESSION_SAMPLE_SIZE = 256 * 1024
+
+# default maximum size (in bytes) of a decoded body; payloads whose header declares a larger body are rejected before
+# their body is decompressed, and no more than the declared body size is ever decompressed, so a small compressed
+# payload cannot force a large allocation
+MAX_BODY_SIZE = 5 * 2 ** 30
+
+_NONE = b'N'
+_TRUE = b'T'
+_FALSE = b'F'
+_INT = b'i'
+_BIG_INT = b'I'
+_FLOAT = b'f'
+_STR = b's'
+_BYTES = b'y'
+_LIST = b'l'
+_TUPLE = b't'
+_DICT = b'd'
+_NUMPY_ARRAY = b'a'
+_NUMPY_SCALAR = b'g'
+_PARAMETER_PACK = b'p'
+_SPARSE_ARRAY = b'c'
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _padding(size):
+    """ Number of bytes needed to align size to BUFFER_ALIGNMENT """
+
+    return (-size) % BUFFER_ALIGNMENT
+
+
+def _write_short_bytes(structure, value):
+    structure += struct.pack('<B', len(value))
+    structure += value
+
+
+def _write_long_bytes(structure, value):
+    structure += struct.pack('<Q', len(value))
+    structure += value
+
+
+def _write(structure, buffers, data_size, value):
+    """ Append the encoding of value to structure; the numpy buffers are collected in buffers; return new data size """
+
+    # numpy scalars are checked first because e.g. np.float64 is also a python float
+    if isinstance(value, np.generic):
+        if value.dtype.hasobject:
+            raise TypeError(f'Codec does not support numpy scalars of dtype {value.dtype}!')
+        structure += _NUMPY_SCALAR
+        _write_short_bytes(structure, value.dtype.str.encode('ascii'))
+        _write_long_bytes(structure, value.tobytes())
+
+    elif isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError('Codec does not support numpy arrays of dtype object (e.g. ragged arrays)!')
+        array = value if value.flags.c_contiguous else value.copy(order='C')
+        data_size += _padding(data_size)
+        structure += _NUMPY_ARRAY
+        _write_short_bytes(structure, array.dtype.str.encode('ascii'))
+        structure += struct.pack('<B', array.ndim)
+        structure += struct.pack(f'<{array.ndim}Q', *array.shape)
+        structure += struct.pack('<QQ', data_size, array.nbytes)
+        buffers.append((data_size, array))
+        data_size += array.nbytes
+
+    elif isinstance(value, ParameterPack):
+        structure += _PARAMETER_PACK
+        data_size = _write(structure, buffers, data_size, value.to_dict())
+
+    elif isinstance(value, SparseArray):
+        structure += _SPARSE_ARRAY
+        data_size = _write(structure, buffers, data_size, value.to_dict())
+
+    elif value is None:
+        structure += _NONE
+
+    elif value is True:
+        structure += _TRUE
+
+    elif value is False:
+        structure += _FALSE
+
+    elif isinstance(value, int):
+        if _INT64_MIN <= value <= _INT64_MAX:
+            structure += _INT
+            structure += struct.pack('<q', value)
+        else:
+            structure += _BIG_INT
+            _write_long_bytes(structure, str(value).encode('ascii'))
+
+    elif isinstance(value, float):
+        structure += _FLOAT
+        structure += struct.pack('<d', value)
+
+    elif isinstance(value, str):
+        structure += _STR
+        _write_long_bytes(structure, value.encode('utf-8'))
+
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        structure += _BYTES
+        _write_long_bytes(structure, bytes(value))
+
+    elif isinstance(value, dict):
+        structure += _DICT
+        structure += struct.pack('<Q', len(value))
+        for key, item in value.items():
+            data_size = _write(structure, buffers, data_size, key)
+            data_size = _write(structure, buffers, data_size, item)
+
+    elif isinstance(value, (list, tuple)):
+        structure += _TUPLE if isinstance(value, tuple) else _LIST
+        structure += struct.pack('<Q', len(value))
+        for item in value:
+            data_size = _write(structure, buffers, data_size, item)
+
+    else:
+        raise TypeError(f'Codec does not support values of type {type(value).__name__}!')
+
+    return data_size
+
+
+def available_compressions():
+    """ Compression algorithms supported by this side, in the order of preference """
+
+    available = list()
+    for compression in Compression.ALL:
+        if compression == Compression.ZSTD and zstandard is None:
+            continue
+        if compression == Compression.LZ4 and lz4_frame is None:
+            continue
+        available.append(compression)
+
+    return available
+
+
+def negotiate_compression(peer_compressions):
+    """ Choose the most preferred compression algorithm supported by both this side and the peer """
+
+    if not peer_compressions:
+        return Compression.NONE
+
+    for compression in available_compressions():
+        if compression in peer_compressions:
+            return compression
+
+    return Compression.NONE
+
+
+def _compress(body, compression, level):
+    if compression == Compression.ZSTD:
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(body)
+
+    if compression == Compression.LZ4:
+        return lz4_frame.compress(body, compression_level=0 if level is None else level)
+
+    if compression == Compression.ZLIB:
+        return zlib.compress(body, -1 if level is None else level)
+
+    raise ValueError(f'Compression {compression} is not supported!')
+
+
+def _decompress(body, compression, body_size):
+    """
+        Decompress at most body_size + 1 bytes of the body, so that a body larger than its declared size is detected
+        (by its size) without decompressing it completely
+    """
+
+    if compression == Compression.ZSTD and zstandard is not None:
+        # the output buffer is allocated with the content size of the frame if the frame has one
+        if zstandard.frame_content_size(body) > body_size:
+            raise ValueError('Codec payload is larger than its declared body size!')
+        return zstandard.ZstdDecompressor().decompress(body, max_output_size=body_size)
+
+    if compression == Compression.LZ4 and lz4_frame is not None:
+        return lz4_frame.LZ4FrameDecompressor().decompress(body, max_length=body_size + 1)
+
+    if compression == Compression.ZLIB:
+        decompressor = zlib.decompressobj()
+        decompressed_body = decompressor.decompress(body, body_size + 1)
+        if decompressor.unconsumed_tail:
+            raise ValueError('Codec payload is larger than its declared body size!')
+        return decompressed_body
+
+    raise ValueError(f'Compression {compression} is not supported!')
+
+
+def _is_compressible(body, compression, level):
+    """ Estimate the compression ratio of body using a sample taken from its middle """
+
+    if len(body) <= COMPRESSION_SAMPLE_SIZE:
+        return True
+
+    sample_start = (len(body) - COMPRESSION_SAMPLE_SIZE) // 2
+    sample = body[sample_start:sample_start + COMPRESSION_SAMPLE_SIZE]
+
+    return len(_compress(sample, compression, level)) <= MAX_COMPRESSION_RATIO * len(sample)
+
+
+def encode(value, compression=Compression.NONE, level=None):
+    """
+        Serialize value, which can be a (nested) dict/list/tuple of None, bool, int, float, str, bytes,
+        numpy scalars, numpy arrays, parameter packs, and sparse arrays, into bytes;
+        The body is compressed with the given compression algorithm unless it is small or incompressible.
+    """
+
+    structure = bytearray()
+    buffers = list()
+    _write(structure, buffers, 0, value)
+
+    data_offset = len(structure) + _padding(len(structure))
+    chunks = [structure, bytes(data_offset - len(structure))]
+
+    data_size = 0
+    for buffer_offset, array in buffers:
+        chunks.append(bytes(buffer_offset - data_size))
+        chunks.append(array.reshape(-1).view(np.uint8).data if array.size else b'')
+        data_size = buffer_offset + array.nbytes
+
+    body_size = data_offset + data_size
+
+    # skip compression if the body is small or incompressible
+    if compression != Compression.NONE and body_size >= MIN_COMPRESSION_SIZE:
+        body = b''.join(chunks)
+        if _is_compressible(memoryview(body), compression, level):
+            compressed_body = _compress(body, compression, level)
+            if len(compressed_body) <= MAX_COMPRESSION_RATIO * body_size:
+                header = _HEADER.pack(CODEC_MAGIC, CODEC_VERSION, _COMPRESSION_IDS[compression], 0,
+                                      len(structure), data_offset, body_size)
+                return header + compressed_body
+
+    header = _HEADER.pack(CODEC_MAGIC, CODEC_VERSION, _COMPRESSION_IDS[Compression.NONE], 0,
+                          len(structure), data_offset, body_size)
+
+    return b''.join([header] + chunks)
+
+
+def _unpack_header(payload):
+    if len(payload) < _HEADER_PREFIX.size:
+        raise ValueError('Codec payload is too short!')
+
+    # the version is checked before the rest of the header is parsed, because its layout differs between the versions
+    magic, version = _HEADER_PREFIX.unpack(payload[:_HEADER_PREFIX.size])
+    if magic != CODEC_MAGIC:
+        raise ValueError('Payload was not encoded by the HyFed codec!')
+
+    if version != CODEC_VERSION:
+        raise ValueError(f'Codec version {version} is not supported (supported version: {CODEC_VERSION})!')
+
+    if len(payload) < _HEADER.size:
+        raise ValueError('Codec payload is too short!')
+
+    _, _, compression_id, _, structure_size, data_offset, body_size = _HEADER.unpack(payload[:_HEADER.size])
+
+    if compression_id not in _COMPRESSION_NAMES:
+        raise ValueError(f'Unknown compression ID {compression_id}!')
+
+    return _COMPRESSION_NAMES[compression_id], structure_size, data_offset, body_size
+
+
+def uncompressed_size(payload):
+    """ Size of the payload (in bytes) if it had been sent without compression """
+
+    _, _, _, body_size = _unpack_header(memoryview(payload).cast('B'))
+
+    return _HEADER.size + body_size
+
+
+class _Reader:
+    """ Cursor over the structure section of an encoded payload """
+
+    def __init__(self, payload, position, end, data_offset):
+        self.payload = payload
+        self.position = position
+        self.end = end
+        self.data_offset = data_offset
+
+    def take(self, size):
+        if self.position + size > self.end:
+            raise ValueError('Codec payload is truncated!')
+        chunk = self.payload[self.position:self.position + size]
+        self.position += size
+        return chunk
+
+    def unpack(self, fmt):
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+
+    def short_bytes(self):
+        size, = self.unpack('<B')
+        return bytes(self.take(size))
+
+    def long_bytes(self):
+        size, = self.unpack('<Q')
+        return self.take(size)
+
+    def read(self):
+        tag = bytes(self.take(1))
+
+        if tag == _NONE:
+            return None
+
+        if tag == _TRUE:
+            return True
+
+        if tag == _FALSE:
+            return False
+
+        if tag == _INT:
+            return self.unpack('<q')[0]
+
+        if tag == _BIG_INT:
+            return int(bytes(self.long_bytes()).decode('ascii'))
+
+        if tag == _FLOAT:
+            return self.unpack('<d')[0]
+
+        if tag == _STR:
+            return bytes(self.long_bytes()).decode('utf-8')
+
+        if tag == _BYTES:
+            return bytes(self.long_bytes())
+
+        if tag == _DICT:
+            item_count, = self.unpack('<Q')
+            value = dict()
+            for _ in range(item_count):
+                key = self.read()
+                value[key] = self.read()
+            return value
+
+        if tag == _LIST or tag == _TUPLE:
+            item_count, = self.unpack('<Q')
+            items = [self.read() for _ in range(item_count)]
+            return tuple(items) if tag == _TUPLE else items
+
+        if tag == _PARAMETER_PACK:
+            return ParameterPack.from_dict(self.read())
+
+        if tag == _SPARSE_ARRAY:
+            return SparseArray.from_dict(self.read())
+
+        if tag == _NUMPY_SCALAR:
+            dtype = np.dtype(self.short_bytes().decode('ascii'))
+            return np.frombuffer(bytes(self.long_bytes()), dtype=dtype)[0]
+
+        if tag == _NUMPY_ARRAY:
+            dtype = np.dtype(self.short_bytes().decode('ascii'))
+            ndim, = self.unpack('<B')
+            shape = self.unpack(f'<{ndim}Q')
+            buffer_offset, nbytes = self.unpack('<QQ')
+            start = self.data_offset + buffer_offset
+            if start + nbytes > len(self.payload):
+                raise ValueError('Codec payload is truncated!')
+            count = nbytes // dtype.itemsize if dtype.itemsize else 0
+            return np.frombuffer(self.payload, dtype=dtype, count=count, offset=start).reshape(shape)
+
+        raise ValueError(f'Unknown codec tag {tag}!')
+
+
+def decode(payload, max_body_size=MAX_BODY_SIZE):
+    """
+        Deserialize the bytes produced by the encode function; numpy arrays are read-only views into the body;
+        payloads whose (uncompressed) body is larger than max_body_size bytes are rejected
+    """
+
+    payload = memoryview(payload).cast('B')
+    compression, structure_size, data_offset, body_size = _unpack_header(payload)
+
+    if body_size > max_body_size:
+        raise ValueError(f'Codec payload body size {body_size} exceeds the maximum body size {max_body_size}!')
+
+    body = payload[_HEADER.size:]
+    if compression != Compression.NONE:
+        body = memoryview(_decompress(body, compression, body_size))
+
+    if len(body) != body_size:
+        raise ValueError('Codec payload is truncated!')
+
+    reader = _Reader(body, 0, structure_size, data_offset)
+    value = reader.read()
+    if reader.position != reader.end:
+        raise ValueError('Codec payload has trailing bytes in the structure section!')
+
+    return value
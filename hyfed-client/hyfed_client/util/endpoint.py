@@ -25,7 +25,19 @@ class EndPoint:
     PROJECT_STARTED = 'client/project-started/'
     MODEL_AGGREGATION = 'client/model-aggregation/'
     GLOBAL_MODEL = 'client/global-model/'
+    GLOBAL_PARAMETERS = 'client/global-parameters/'  # followed by <project_id>/<blob hash>/<capability>/
     RESULT_DOWNLOAD = 'client/result-download/'
+    PROJECT_EVENTS = 'client/project-events/'
 
     # endpoint at the compensator
     NOISE_AGGREGATION = 'client/noise-aggregation/'
+
+
+class RoutingHeader:
+    """
+        Unencrypted headers of the requests with the (hash of the) project ID, from which the server routes
+        the request to the worker of the project (see ShardRouter) without decoding the body
+    """
+
+    PROJECT_ID = 'X-HyFed-Project'  # client -> server
+    HASH_PROJECT_ID = 'X-HyFed-Project-Hash'  # compensator -> server
@@ -20,9 +20,10 @@
 class Parameter:
     """
         There are nine general categories of the parameters exchanged clients <-> server and client <-> compensator:
-        client -> server: authentication, synchronization, monitoring, and local parameters
+        client -> server: authentication, synchronization, monitoring, local, data_type, and fixed_point parameters
         server -> client: coordination, project, and global parameters
-        client -> compensator: authentication, synchronization, connection, data_type, and compensation parameters
+        client -> compensator: authentication, synchronization, connection, data_type, and compensation (or noise seed)
+        parameters
         compensator -> client: synchronization parameters
     """
 
@@ -33,9 +34,12 @@ class Parameter:
     COORDINATION = "coordination_parameter"
     CONNECTION = "connection_parameter"
     GLOBAL = "global_parameter"
+    GLOBAL_DELTA = "global_delta_parameter"
     LOCAL = "local_parameter"
     COMPENSATION = "compensation_parameter"
+    NOISE_SEED = "noise_seed_parameter"
     DATA_TYPE = "data_type_parameter"
+    FIXED_POINT = "fixed_point_parameter"  # parameter name -> (scale, ring) of the fixed-point encoded parameters
 
 
 class AuthenticationParameter:
@@ -63,10 +67,15 @@ class SyncParameter:
     # client -> server
     OPERATION_STATUS = "operation_status"
     COMPENSATOR_FLAG = "compensator_flag"
+    GLOBAL_PARAMETERS_ROUND = "global_parameters_round"  # round of the global parameters the client holds
+    LONG_POLL_TIMEOUT = "long_poll_timeout"  # seconds the server may hold the global model request; 0 disables it
 
     # compensator -> client
     SHOULD_RETRY = "should_retry"
 
+    # client -> server and compensator -> client
+    COMPRESSION = "compression"  # compression algorithms the sender can decode
+
 
 class MonitoringParameter:
     """ Client -> server parameters to breakdown the runtime  of the client """
@@ -97,6 +106,10 @@ class CoordinationParameter:
     COMM_ROUND = "communication_round"
     PROJECT_STARTED = "project_started"
     CLIENT_JOINED = "client_joined"
+    COMPRESSION = "compression"  # compression algorithms the server can decode
+    GLOBAL_BASE_ROUND = "global_base_round"  # round of the global parameters the global deltas are computed against
+    GLOBAL_PARAMETERS_HASH = "global_parameters_hash"  # content hash of the serialized (client agnostic) global parameters
+    GLOBAL_PARAMETERS_CAPABILITY = "global_parameters_capability"  # capability in the URL of the global parameters
 
 
 class ConnectionParameter:
@@ -106,3 +119,18 @@ class ConnectionParameter:
     SERVER_URL = "server_url"  # client -> compensator
     COMPENSATOR_NAME = "compensator_name"
     COMPENSATOR_URL = "compensator_url"
+
+
+class NoiseSeedParameter:
+    """
+        client -> compensator parameters to regenerate the noise values of the client (instead of sending them):
+        the secret seed of the round, the standard deviation of the Gaussian noise, and the layout of the noise values,
+        i.e. the size of each lane and the index of the packed parameters (see ParameterPack), and the shapes of the
+        parameters that are not packed (None for scalars and a list of shapes for lists of numpy arrays)
+    """
+
+    SEED = "seed"
+    GAUSSIAN_STD = "gaussian_std"
+    LANE_SIZES = "lane_sizes"
+    INDEX = "index"
+    SHAPES = "shapes"
@@ -0,0 +1,162 @@
+"""
+    Generation of the noise values to mask the local parameters, either from the global numpy random state or
+    reproducibly from a secret seed, so that the compensator can regenerate the noise instead of receiving it
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_client.util.hyfed_parameters import NoiseSeedParameter
+from hyfed_client.util.modular import largest_prime_non_negative_int54, is_non_negative_integer, \
+    is_wraparound_integer, is_float32, masked_dtype, wraparound_noise
+from hyfed_client.util.parameter_pack import ParameterPack
+import numpy as np
+import secrets
+
+# the lanes of the masked parameters (see ParameterPack) have fixed noise streams, so the noise of a lane can be
+# generated before the local parameters are known; the parameters that are not packed get the streams after them
+noise_lanes = (ParameterPack.MODULAR_LANE, ParameterPack.WRAPAROUND_LANE, ParameterPack.GAUSSIAN_LANE,
+               ParameterPack.WRAPAROUND32_LANE, ParameterPack.GAUSSIAN32_LANE)
+
+# the noise of a lane is drawn in chunks of this many values, each from its own stream, so that the chunks can be
+# filled in parallel and the noise does not depend on the number of threads
+noise_chunk_size = 1 << 18
+
+
+def new_noise_seed():
+    """ A fresh 128-bit secret seed; a new seed is drawn for each communication round """
+
+    return secrets.randbits(128)
+
+
+def noise_generator(noise_seed, *stream):
+    """
+        Counter-based (Philox) generator of the noise stream of the seed; the same seed and stream always generate the
+        same noise, and the streams of a seed are independent, so they can be generated in any order or in parallel
+    """
+
+    return np.random.Generator(np.random.Philox(np.random.SeedSequence(entropy=noise_seed, spawn_key=stream)))
+
+
+def noise_streams(parameter_names):
+    """ Stream number of each (not packed) parameter; both sides must use the same stream numbers """
+
+    return {parameter_name: len(noise_lanes) + stream for stream, parameter_name in enumerate(sorted(parameter_names))}
+
+
+def new_lane_noise(lane, size):
+    """ Uninitialized buffer for the noise of the lane """
+
+    return np.empty(size, dtype=ParameterPack.get_lane_dtype(lane))
+
+
+def fill_lane_noise(noise, lane, gaussian_std, noise_seed, executor=None):
+    """
+        Fill the (1-D) noise buffer of the lane with the noise of the seed; chunk i is drawn from the stream
+        (lane stream, i); if the executor is given, the chunks are filled in the executor and the futures are returned
+    """
+
+    data_type = ParameterPack.get_lane_data_type(lane)
+    lane_stream = noise_lanes.index(lane)
+
+    def fill_chunk(chunk):
+        chunk_noise = noise[chunk * noise_chunk_size:(chunk + 1) * noise_chunk_size]
+        generator = noise_generator(noise_seed, lane_stream, chunk)
+        if lane == ParameterPack.GAUSSIAN_LANE or lane == ParameterPack.GAUSSIAN32_LANE:
+            generator.standard_normal(out=chunk_noise, dtype=chunk_noise.dtype)
+            chunk_noise *= gaussian_std
+        else:
+            chunk_noise[:] = generate_noise(data_type, chunk_noise.shape, gaussian_std, generator)
+
+    chunks = range(-(-noise.size // noise_chunk_size))
+    if executor is None:
+        for chunk in chunks:
+            fill_chunk(chunk)
+        return []
+
+    return [executor.submit(fill_chunk, chunk) for chunk in chunks]
+
+
+def generate_noise(data_type, shape, gaussian_std, generator=None):
+    """
+        Generate noise for a value of the data type with the given shape (None for scalars and a list of shapes for
+        lists of numpy arrays) using the generator, or the global numpy random state if the generator is None;
+        integers >= 0 get integer noise in [0, largest_prime_non_negative_int54), wrap-around integers get noise
+        over all int64 (int32) values, and the others get Gaussian noise with mean of zero and standard deviation of
+        gaussian_std (drawn as float32 for the float32 data types, whose unmasked values are only accurate to about
+        client_count * gaussian_std * 2^-24, which is why the clients mask them as fixed-point integers by default)
+    """
+
+    if isinstance(shape, list):
+        return [generate_noise(data_type, array_shape, gaussian_std, generator) for array_shape in shape]
+
+    if is_non_negative_integer(data_type):
+        if generator is None:
+            return np.random.randint(low=0, high=largest_prime_non_negative_int54, size=shape)
+        return generator.integers(low=0, high=largest_prime_non_negative_int54, size=shape, dtype=np.int64)
+
+    if is_wraparound_integer(data_type):
+        return wraparound_noise(shape, generator, masked_dtype(data_type))
+
+    if is_float32(data_type):
+        if generator is None:
+            return np.float32(gaussian_std) * np.random.standard_normal(size=shape).astype(np.float32)
+        return np.float32(gaussian_std) * generator.standard_normal(size=shape, dtype=np.float32)
+
+    if generator is None:
+        return np.random.normal(loc=0, scale=gaussian_std, size=shape)
+
+    return generator.normal(loc=0, scale=gaussian_std, size=shape)
+
+
+def get_noise_shape(value):
+    """ Shape of the value as used by generate_noise """
+
+    if isinstance(value, list):
+        return [array.shape for array in value]
+
+    if isinstance(value, np.ndarray):
+        return value.shape
+
+    return None
+
+
+def regenerate_noise(noise_seed_parameters, data_type_parameters):
+    """
+        Regenerate the noise values of a client from its noise seed parameters (see NoiseSeedParameter);
+        the noise values are a ParameterPack if the local parameters of the client were packed, else a dictionary
+    """
+
+    noise_seed = noise_seed_parameters[NoiseSeedParameter.SEED]
+    gaussian_std = noise_seed_parameters[NoiseSeedParameter.GAUSSIAN_STD]
+    lane_sizes = noise_seed_parameters[NoiseSeedParameter.LANE_SIZES]
+    index = noise_seed_parameters[NoiseSeedParameter.INDEX]
+    shapes = noise_seed_parameters[NoiseSeedParameter.SHAPES]
+
+    parameter_streams = noise_streams(shapes.keys())
+
+    noise_values = dict()
+    for parameter_name, shape in shapes.items():
+        generator = noise_generator(noise_seed, parameter_streams[parameter_name])
+        noise_values[parameter_name] = generate_noise(data_type_parameters[parameter_name], shape, gaussian_std, generator)
+
+    if not lane_sizes:
+        return noise_values
+
+    buffers = dict()
+    for lane, lane_size in lane_sizes.items():
+        buffers[lane] = new_lane_noise(lane, lane_size)
+        fill_lane_noise(buffers[lane], lane, gaussian_std, noise_seed)
+
+    return ParameterPack(buffers, index, noise_values)
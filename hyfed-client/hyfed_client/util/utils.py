@@ -18,64 +18,112 @@
 
 import numpy as np
 from hyfed_client.util.data_type import DataType
+from hyfed_client.util.modular import modular_add, wraparound_add, is_non_negative_integer, is_wraparound_integer, \
+    is_float32, masked_dtype
+from hyfed_client.util.noise import generate_noise
 
 import logging
 logger = logging.getLogger(__name__)
 
-# noise values are generated in the range [0, largest_prime) for integers >= 0
-largest_prime_non_negative_int54 = 18014398509481951  # largest prime number that can fit in 54 bits
+# kinds of the delta between the global parameter values of two consecutive communication rounds
+DELTA_XOR = 'xor'  # bitwise XOR of the floating-point bit patterns
+DELTA_DIFFERENCE = 'difference'  # integer difference with wrap-around
 
-# for integers < 0 and floating-point parameters,
-# the noise is generated by Gaussian distribution with mean=0 and std=gaussian_std
+# noise values are generated in the range [0, largest_prime_non_negative_int54) for integers >= 0, and over all int64
+# values for wrap-around integers; for integers < 0 and floating-point parameters,
+# the noise is generated by Gaussian distribution with mean=0 and std=gaussian_std (see generate_noise)
 
 
-def make_noisy(original_value, data_type, gaussian_std):
+def mask_value(original_value, noise, data_type):
+    """ Add the noise (generated for the data type, see generate_noise) to the original value and return the noisy value """
+
+    if is_non_negative_integer(data_type):
+        return modular_add(original_value, noise)  # modular arithmetic
+
+    if is_wraparound_integer(data_type):
+        return wraparound_add(original_value, noise, masked_dtype(data_type))  # wrap-around arithmetic
+
+    # the float32 values are kept as float32
+    if is_float32(data_type):
+        return np.add(original_value, noise, dtype=np.float32)
+
+    return original_value + noise
+
+
+def make_noisy(original_value, data_type, gaussian_std, generator=None):
     """ Generate noise value with the same shape as the original value,
         add it to the original value, and return both noise and noisy value
-        integers >= 0 are masked with integer noise
+        integers >= 0 are masked with integer noise modulo largest_prime_non_negative_int54
+        wrap-around integers are masked with integer noise modulo 2^64 (2^32 for the 32-bit variants)
         integers < 0 or real-valued parameters are masked with Gaussian noise
-        with mean of zero and standard deviation of gaussian_std
+        with mean of zero and standard deviation of gaussian_std (float32 noise for the float32 variants)
+        the noise is drawn from the numpy generator if given (e.g. seeded so that the compensator can regenerate it)
     """
 
     try:
         if data_type == DataType.NON_NEGATIVE_INTEGER :
-            noise = np.random.randint(low=0, high=largest_prime_non_negative_int54)
-            noisy_value = (original_value + noise) % largest_prime_non_negative_int54  # modular arithmetic
+            noise = generate_noise(data_type, None, gaussian_std, generator)
+            noisy_value = modular_add(original_value, noise)  # modular arithmetic
+            return noisy_value, noise
+
+        if data_type == DataType.WRAPAROUND_INTEGER or data_type == DataType.WRAPAROUND_INTEGER32:
+            noise = generate_noise(data_type, None, gaussian_std, generator)
+            noisy_value = mask_value(original_value, noise, data_type)  # wrap-around arithmetic
             return noisy_value, noise
 
-        if data_type == DataType.NEGATIVE_INTEGER or data_type == DataType.FLOAT:
-            noise = np.random.normal(loc=0, scale=gaussian_std)
-            noisy_value = original_value + noise
+        if data_type == DataType.NEGATIVE_INTEGER or data_type == DataType.FLOAT or data_type == DataType.FLOAT32:
+            noise = generate_noise(data_type, None, gaussian_std, generator)
+            noisy_value = mask_value(original_value, noise, data_type)
             return noisy_value, noise
 
         if data_type == DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER:
-            noise = np.random.randint(low=0, high=largest_prime_non_negative_int54, size=original_value.shape)
-            noisy_value = (original_value + noise) % largest_prime_non_negative_int54  # modular arithmetic
+            noise = generate_noise(data_type, original_value.shape, gaussian_std, generator)
+            noisy_value = modular_add(original_value, noise)  # modular arithmetic
             return noisy_value, noise
 
-        if data_type == DataType.NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.NUMPY_ARRAY_FLOAT:
-                noise = np.random.normal(loc=0, scale=gaussian_std, size=original_value.shape)
-                noisy_value = original_value + noise
+        if data_type == DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER or data_type == DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32:
+            noise = generate_noise(data_type, original_value.shape, gaussian_std, generator)
+            noisy_value = mask_value(original_value, noise, data_type)  # wrap-around arithmetic
+            return noisy_value, noise
+
+        if data_type == DataType.NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.NUMPY_ARRAY_FLOAT or \
+                data_type == DataType.NUMPY_ARRAY_FLOAT32:
+                noise = generate_noise(data_type, original_value.shape, gaussian_std, generator)
+                noisy_value = mask_value(original_value, noise, data_type)
                 return noisy_value, noise
 
         if data_type == DataType.LIST_NUMPY_ARRAY_NON_NEGATIVE_INTEGER:
             noise_list = []
             noisy_values = []
             for numpy_array in original_value:
-                noise = np.random.randint(low=0, high=largest_prime_non_negative_int54, size=numpy_array.shape)
-                noisy_value = (numpy_array + noise) % largest_prime_non_negative_int54  # modular arithmetic
+                noise = generate_noise(data_type, numpy_array.shape, gaussian_std, generator)
+                noisy_value = modular_add(numpy_array, noise)  # modular arithmetic
 
                 noise_list.append(noise)
                 noisy_values.append(noisy_value)
 
             return noisy_values, noise_list
 
-        if data_type == DataType.LIST_NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_FLOAT:
+        if data_type == DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER or \
+                data_type == DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER32:
             noise_list = []
             noisy_values = []
             for numpy_array in original_value:
-                noise = np.random.normal(loc=0, scale=gaussian_std, size=numpy_array.shape)
-                noisy_value = numpy_array + noise
+                noise = generate_noise(data_type, numpy_array.shape, gaussian_std, generator)
+                noisy_value = mask_value(numpy_array, noise, data_type)  # wrap-around arithmetic
+
+                noise_list.append(noise)
+                noisy_values.append(noisy_value)
+
+            return noisy_values, noise_list
+
+        if data_type == DataType.LIST_NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_FLOAT or \
+                data_type == DataType.LIST_NUMPY_ARRAY_FLOAT32:
+            noise_list = []
+            noisy_values = []
+            for numpy_array in original_value:
+                noise = generate_noise(data_type, numpy_array.shape, gaussian_std, generator)
+                noisy_value = mask_value(numpy_array, noise, data_type)
 
                 noise_list.append(noise)
                 noisy_values.append(noisy_value)
@@ -87,3 +135,30 @@ def make_noisy(original_value, data_type, gaussian_std):
     except Exception as exp:
         print(exp)
         return None, None
+
+
+def delta_decode(delta_kind, delta_byte_planes, base_value):
+    """
+        Reconstruct the global parameter value from its delta (as byte planes) against base_value,
+        which is the value of the parameter from the previous round
+    """
+
+    if not isinstance(base_value, np.ndarray):
+        raise ValueError('The base value of the delta must be a numpy array!')
+
+    if delta_byte_planes.shape != (base_value.dtype.itemsize, base_value.size):
+        raise ValueError('The shape of the delta does not match that of the base value!')
+
+    base_values = base_value.reshape(-1)
+    delta_bytes = np.ascontiguousarray(delta_byte_planes.T).reshape(-1)
+
+    if delta_kind == DELTA_XOR:
+        unsigned_dtype = np.dtype(f'u{base_value.dtype.itemsize}')
+        value = np.bitwise_xor(base_values.view(unsigned_dtype), delta_bytes.view(unsigned_dtype)).view(base_value.dtype)
+        return value.reshape(base_value.shape)
+
+    if delta_kind == DELTA_DIFFERENCE:
+        value = base_values + delta_bytes.view(base_value.dtype)
+        return value.reshape(base_value.shape)
+
+    raise ValueError(f'Unknown delta kind {delta_kind}!')
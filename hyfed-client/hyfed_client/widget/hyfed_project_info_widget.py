@@ -19,10 +19,10 @@
 
 from hyfed_client.util.gui import add_label_and_textbox, add_button
 from hyfed_client.util.hyfed_parameters import AuthenticationParameter, Parameter, HyFedProjectParameter, ConnectionParameter
-from hyfed_client.util.endpoint import EndPoint
+from hyfed_client.util.endpoint import EndPoint, RoutingHeader
+from hyfed_client.util import codec
 
 import requests
-import pickle
 import time
 from tkinter import messagebox
 import tkinter as tk
@@ -99,14 +99,15 @@ class HyFedProjectInfoWidget(tk.Tk):
                                 }
 
                 # send a request to server to obtain the project info
-                serialized_request_body = pickle.dumps(request_body)
+                serialized_request_body = codec.encode(request_body)
                 response = requests.get(url=f'{self.server_url}/{EndPoint.PROJECT_INFO}',
                                         data=serialized_request_body,
+                                        headers={RoutingHeader.PROJECT_ID: self.project_id},
                                         timeout=60)
 
                 if response.status_code == 200:
                     # deserialize response and initialize project_parameters
-                    json_response = pickle.loads(response.content)
+                    json_response = codec.decode(response.content)
                     self.project_parameters = json_response[Parameter.PROJECT]
                     return
 
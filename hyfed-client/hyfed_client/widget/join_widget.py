@@ -20,10 +20,10 @@
 
 from hyfed_client.util.hyfed_parameters import Parameter, CoordinationParameter, AuthenticationParameter, ConnectionParameter
 from hyfed_client.util.gui import add_label_and_textbox, add_label_and_password_box, add_option_menu, add_button
-from hyfed_client.util.endpoint import EndPoint
+from hyfed_client.util.endpoint import EndPoint, RoutingHeader
+from hyfed_client.util import codec
 
 import requests
-import pickle
 from tkinter import messagebox
 import tkinter as tk
 
@@ -158,10 +158,11 @@ class JoinWidget(tk.Tk):
                                  AuthenticationParameter.TOKEN: self.token,
                                  AuthenticationParameter.PROJECT_ID: self.project_id}
                             }
-            serialized_request_body = pickle.dumps(request_body)
+            serialized_request_body = codec.encode(request_body)
 
             response = requests.post(f'{self.server_url}/{EndPoint.PROJECT_JOIN}',
                                      data=serialized_request_body,
+                                     headers={RoutingHeader.PROJECT_ID: self.project_id},
                                      timeout=60)
 
             if response.status_code != 200:
@@ -173,7 +174,7 @@ class JoinWidget(tk.Tk):
             return
 
         # check whether join was successful
-        json_response = pickle.loads(response.content)
+        json_response = codec.decode(response.content)
         self.joined = json_response[CoordinationParameter.CLIENT_JOINED]
 
         if not self.joined:
@@ -0,0 +1,63 @@
+"""
+    Test the reconstruction of the global parameters from their delta against the previous round: the value must be
+    bit-identical to the value the server encoded, and malformed deltas must be rejected
+    (run from hyfed-client with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_client.util.utils import delta_decode, DELTA_XOR, DELTA_DIFFERENCE
+
+import numpy as np
+import pytest
+
+
+def byte_planes(delta):
+    """ Byte planes of the delta elements as the server sends them (see delta_encode in hyfed_server.util.utils) """
+
+    return np.ascontiguousarray(delta.reshape(-1).view(np.uint8).reshape(-1, delta.dtype.itemsize).T)
+
+
+def test_xor_delta_is_bit_exact():
+    generator = np.random.default_rng(0)
+    base_value = generator.normal(size=(30, 4))
+    value = base_value + generator.normal(scale=1e-6, size=base_value.shape)
+
+    delta = np.bitwise_xor(value.reshape(-1).view(np.uint64), base_value.reshape(-1).view(np.uint64))
+    decoded_value = delta_decode(DELTA_XOR, byte_planes(delta), base_value)
+
+    assert decoded_value.shape == value.shape
+    assert decoded_value.tobytes() == value.tobytes()
+
+
+def test_difference_delta_wraps_around():
+    base_value = np.array([np.iinfo(np.int32).max, 5, -7], dtype=np.int32)
+    value = np.array([np.iinfo(np.int32).min, 6, -7], dtype=np.int32)
+
+    delta = value - base_value  # wraps around
+    assert np.array_equal(delta_decode(DELTA_DIFFERENCE, byte_planes(delta), base_value), value)
+
+
+def test_malformed_delta_is_rejected():
+    base_value = np.zeros(4)
+
+    with pytest.raises(ValueError):
+        delta_decode(DELTA_XOR, np.zeros((8, 5), dtype=np.uint8), base_value)
+
+    with pytest.raises(ValueError):
+        delta_decode(DELTA_XOR, np.zeros((8, 4), dtype=np.uint8), 0.0)
+
+    with pytest.raises(ValueError):
+        delta_decode('unknown', np.zeros((8, 4), dtype=np.uint8), base_value)
@@ -0,0 +1,94 @@
+"""
+    Test the masking of the float32 parameters: the aggregate of the masked values minus the aggregated noise must be
+    the plain sum of the values, and the masked values must stay 4 bytes wide (run from hyfed-client with
+    python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_client.util.data_type import DataType
+from hyfed_client.util.modular import FLOAT32_FIXED_POINT, fixed_point_encode, fixed_point_decode, \
+    fixed_point_data_type, wraparound_add
+from hyfed_client.util.parameter_pack import ParameterPack
+from hyfed_client.util.utils import make_noisy
+
+import numpy as np
+import pytest
+
+client_count = 5
+element_count = 100000
+gaussian_std = 1e6
+
+
+def unmask_float32(client_values):
+    """ Mask the float32 values of the clients as the client does, and unmask their aggregate as the server does """
+
+    scale, ring = FLOAT32_FIXED_POINT
+
+    aggregated_noisy_value = np.zeros(element_count, dtype=np.int32)
+    aggregated_noise = np.zeros(element_count, dtype=np.int32)
+    for client_value in client_values:
+        encoded_value = fixed_point_encode(client_value, scale, ring)
+        noisy_value, noise = make_noisy(encoded_value, fixed_point_data_type(client_value, ring), gaussian_std)
+        assert noisy_value.dtype == np.int32 and noise.dtype == np.int32
+        aggregated_noisy_value = wraparound_add(aggregated_noisy_value, noisy_value, np.int32)
+        aggregated_noise = wraparound_add(aggregated_noise, noise, np.int32)
+
+    aggregated_value = wraparound_add(aggregated_noisy_value, -aggregated_noise, np.int32)
+
+    return np.float32(fixed_point_decode(aggregated_value, scale, ring))
+
+
+def test_unmasked_float32_aggregate_matches_plain_sum():
+    generator = np.random.default_rng(0)
+    client_values = [generator.normal(loc=0.01, scale=0.01, size=element_count).astype(np.float32)
+                     for _ in range(client_count)]
+
+    unmasked_aggregate = unmask_float32(client_values)
+    plain_sum = np.sum(client_values, axis=0, dtype=np.float64)
+
+    assert unmasked_aggregate.dtype == np.float32
+    # the rounding to multiples of 2^-16 per client plus the final cast to float32
+    assert np.allclose(unmasked_aggregate, plain_sum, rtol=2 ** -23, atol=client_count * 2.0 ** -17)
+
+
+def test_float32_parameters_are_masked_as_int32_wraparound_integers():
+    value = np.ones(3, dtype=np.float32)
+    scale, ring = FLOAT32_FIXED_POINT
+
+    assert fixed_point_data_type(value, ring) == DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32
+    assert fixed_point_data_type([value], ring) == DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER32
+    assert fixed_point_encode(value, scale, ring).dtype == np.int32
+
+
+def test_masked_float32_lane_is_4_bytes_per_value():
+    value = np.ones(1000, dtype=np.float32)
+    scale, ring = FLOAT32_FIXED_POINT
+    data_type = fixed_point_data_type(value, ring)
+
+    noisy_value, _ = make_noisy(fixed_point_encode(value, scale, ring), data_type, gaussian_std)
+    pack = ParameterPack.pack({'value': noisy_value}, {'value': data_type})
+
+    lane, _, _, _ = pack.index['value']
+    assert lane == ParameterPack.WRAPAROUND32_LANE
+    assert pack.buffers[lane].dtype.itemsize == 4
+    assert pack.buffers[lane].nbytes == value.nbytes
+
+
+def test_out_of_range_float32_values_are_rejected():
+    scale, ring = FLOAT32_FIXED_POINT
+
+    with pytest.raises(ValueError):
+        fixed_point_encode(np.array([2.0 ** 14], dtype=np.float32), scale, ring)
@@ -0,0 +1,64 @@
+"""
+    Test the block-wise reduction of the modular sums: with modular_block_size values per block, the unreduced sums of
+    the values in [0, largest_prime_non_negative_int54) must never overflow int64 (run from hyfed-client with
+    python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_client.util.modular import largest_prime_non_negative_int54, modular_block_size, modular_fold, \
+    modular_reduce, modular_sum
+
+import numpy as np
+
+int64_max = np.iinfo(np.int64).max
+largest_value = largest_prime_non_negative_int54 - 1
+
+# more than three blocks, so that the sums are reduced several times and end in the middle of a block
+value_count = 3 * modular_block_size + 7
+
+
+def test_block_size_is_the_largest_without_overflow():
+    # a reduced sum (< largest_prime_non_negative_int54) plus a block of the largest values fits in int64 ...
+    assert largest_value + modular_block_size * largest_value <= int64_max
+
+    # ... but not with one more value per block
+    assert largest_value + (modular_block_size + 1) * largest_value > int64_max
+
+
+def test_modular_fold_of_largest_values_does_not_overflow():
+    value = np.full(4, largest_value, dtype=np.int64)
+
+    accumulated_value = np.array(value)
+    for folded_count in range(1, value_count):
+        accumulated_value = modular_fold(accumulated_value, value, folded_count)
+
+        # a wrapped-around sum would be negative
+        assert np.all(accumulated_value >= 0)
+
+    expected_sum = value_count * largest_value % largest_prime_non_negative_int54
+    assert np.all(modular_reduce(accumulated_value) == expected_sum)
+
+
+def test_modular_sum_matches_exact_sum():
+    generator = np.random.default_rng(0)
+    values = [generator.integers(largest_prime_non_negative_int54 - 1000, largest_prime_non_negative_int54,
+                                 size=16, dtype=np.int64) for _ in range(value_count)]
+
+    # the exact sums with python integers
+    expected_sum = [sum(int(value[index]) for value in values) % largest_prime_non_negative_int54
+                    for index in range(16)]
+
+    assert modular_sum(values).tolist() == expected_sum
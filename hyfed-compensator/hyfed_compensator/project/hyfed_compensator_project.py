@@ -19,13 +19,15 @@
 
 from hyfed_compensator.util.hyfed_parameters import Parameter, AuthenticationParameter, SyncParameter, ConnectionParameter, MonitoringParameter
 from hyfed_compensator.util.status import OperationStatus
-from hyfed_compensator.util.endpoint import EndPoint
-from hyfed_compensator.util.utils import aggregate
+from hyfed_compensator.util.endpoint import EndPoint, RoutingHeader
+from hyfed_compensator.util.utils import accumulate, negate
+from hyfed_compensator.util.parameter_pack import ParameterPack
+from hyfed_compensator.util.noise import regenerate_noise
 from hyfed_compensator.util.monitoring import Timer, Counter
+from hyfed_compensator.util import codec
 
-import pickle
 import numpy as np
-import time
+import threading
 import hashlib
 import requests
 from datetime import datetime
@@ -40,8 +42,11 @@ class HyFedCompensatorProject:
         and to aggregate the compensation parameters from the clients
     """
 
-    def __init__(self, project_id_hash, client_count):
-        """ Initialize the compensator project using the hash of the project ID and the number of clients """
+    def __init__(self, project_id_hash, client_count, server_compression=codec.Compression.NONE):
+        """
+            Initialize the compensator project using the hash of the project ID, the number of clients,
+            and the compression algorithm negotiated with the server
+        """
 
         # for compensator to know whether it has received compensation parameters from all clients
         self.client_count = client_count
@@ -57,11 +62,23 @@ class HyFedCompensatorProject:
         self.client_steps = list()
         self.client_comm_rounds = list()
 
-        # compensation parameters (noise values) from the clients
-        self.client_compensation_parameters = list()
+        # running sums of the compensation parameters (noise values) from the clients; each client's noise values are
+        # folded into the sums as they arrive, so that the memory usage stays at one model's worth
+        self.accumulated_compensation_parameters = dict()
+        self.accumulated_compensation_pack = None  # running sums of the lane buffers of the packed noise values
 
-        # data type parameters from clients
-        self.client_data_type_parameters = list()
+        # data type parameters from the first client; the other clients must have the same parameter names and data types
+        self.compensation_data_types = dict()
+
+        # number of clients whose noise values are folded into the sums (or failed to be folded); uploads are folded
+        # concurrently, and the clients are counted with the accumulation lock held only after their noise values
+        # are folded, so that aggregate_and_send is triggered exactly once (aggregation_triggered) and only after
+        # the noise values of all clients are in the sums
+        self.accumulated_client_count = 0
+        self.failed_client_count = 0
+        self.aggregation_triggered = False
+        self.round_started = False
+        self.accumulation_lock = threading.Lock()
 
         # clients tell compensator where to send the aggregated noise values
         self.server_urls = list()
@@ -81,31 +98,54 @@ class HyFedCompensatorProject:
 
         self.upload_parameters_timeout = 600
 
+        # the failed sends to the server are retried (at most max_send_tries times) after send_retry_delay seconds by
+        # the aggregation executor (see set_aggregation_executor), instead of sleeping in a thread of the executor
+        self.aggregation_executor = None
+        self.max_send_tries = 10
+        self.send_retry_delay = 30  # in seconds
+
+        # compression of the payload sent to the server (None level means the default level of the algorithm)
+        self.server_compression = server_compression
+        self.compression_level = None
+
         # used for garbage collection purposes
         self.last_updated_date = datetime.now().timestamp()
 
-    def add_client_parameters(self, request):
-        """ Append client's authentication, sync, connection, and compensation parameters to the corresponding lists """
+    def add_client_parameters(self, request, request_body):
+        """
+            Fold the client's compensation parameters into the running sums and append its authentication, sync, and
+            connection parameters to the corresponding lists; request_body is the body of the request already decoded
+            by the view, so the (large) noise upload is not decompressed and decoded twice; return True if
+            the parameters of all clients have been folded, which happens exactly once per round, so that only one
+            request triggers aggregate_and_send
+        """
 
+        client_parameters = None
+        compensation_parameters = None
+        data_type_parameters = None
         try:
-            # new communication round starts for compensator if the parameters from the first client is received
-            if len(self.client_compensation_parameters) == 0:
+            # new communication round starts for compensator if the parameters from the first client is received;
+            # not decided by the client lists, which are only appended after the (slow) folding of the noise values
+            with self.accumulation_lock:
+                new_round = not self.round_started
+                self.round_started = True
+
+            if new_round:
                 self.computation_timer.new_round()
                 self.network_send_timer.new_round()
 
             # add traffic size to client -> compensator traffic counter
             traffic_size = int(request.headers['Content-Length'])
-            self.client_compensator_traffic.increment(traffic_size)
+            self.client_compensator_traffic.increment(traffic_size, codec.uncompressed_size(request.body))
             logger.debug(f'Project {self.project_id_hash}: {traffic_size} bytes added to client -> compensator traffic.')
 
             self.computation_timer.start()
 
             # extract client parameters from the request body
-            request_body = pickle.loads(request.body)
-
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             sync_parameters = request_body[Parameter.SYNCHRONIZATION]
             compensation_parameters = request_body[Parameter.COMPENSATION]
+            noise_seed_parameters = request_body.get(Parameter.NOISE_SEED)
             connection_parameters = request_body[Parameter.CONNECTION]
             data_type_parameters = request_body[Parameter.DATA_TYPE]
 
@@ -120,25 +160,51 @@ class HyFedCompensatorProject:
             # connection parameter
             server_url = connection_parameters[ConnectionParameter.SERVER_URL]
 
-            # add the parameters to the lists
-            self.client_username_hashes.append(hash_username)
-            self.client_token_hashes.append(hash_token)
-            self.client_steps.append(step)
-            self.client_comm_rounds.append(comm_round)
-            self.server_urls.append(server_url)
-            self.client_compensation_parameters.append(compensation_parameters)
-            self.client_data_type_parameters.append(data_type_parameters)
-
-            self.computation_timer.stop()
+            client_parameters = (hash_username, hash_token, step, comm_round, server_url)
 
-            logger.debug(f'Project {self.project_id_hash}: Client parameters added!')
+            # in the seed-based compensation mode, regenerate the noise values of the client from its seed; this runs in
+            # the request thread of the client without the accumulation lock, so the noise values of the clients are
+            # regenerated in parallel; the client is only counted after its regenerated noise values are folded
+            if noise_seed_parameters:
+                compensation_parameters = regenerate_noise(noise_seed_parameters, data_type_parameters)
 
         except Exception as add_parameter_exp:
             logger.error(f'Project {self.project_id_hash}: Adding client parameters was failed!')
             logger.error(f'Project {self.project_id_hash}: The exception is: {add_parameter_exp}')
-            self.computation_timer.stop()
+            compensation_parameters = None
             self.set_operation_status_failed()
 
+        with self.accumulation_lock:
+
+            # fold the noise values into the running sums; if it fails (e.g. inconsistent parameter names), the
+            # operation status is set to failed, which is shared with the server after receiving from all clients
+            try:
+                if compensation_parameters is None:
+                    raise ValueError('No compensation parameters to fold!')
+                self.accumulate_compensation_parameters(compensation_parameters, data_type_parameters)
+                self.accumulated_client_count += 1
+
+            except Exception as accumulate_exp:
+                logger.error(f'Project {self.project_id_hash}: Folding client parameters was failed!')
+                logger.error(f'Project {self.project_id_hash}: The exception is: {accumulate_exp}')
+                self.failed_client_count += 1
+                self.set_operation_status_failed()
+
+            # add the parameters to the lists
+            if client_parameters is not None:
+                hash_username, hash_token, step, comm_round, server_url = client_parameters
+                self.client_username_hashes.append(hash_username)
+                self.client_token_hashes.append(hash_token)
+                self.client_steps.append(step)
+                self.client_comm_rounds.append(comm_round)
+                self.server_urls.append(server_url)
+
+            self.computation_timer.stop()
+
+            logger.debug(f'Project {self.project_id_hash}: Client parameters added!')
+
+            return self.should_aggregate_and_send()
+
     def aggregate_client_parameters(self):
         """ Aggregate client parameters including the compensation parameters from all clients """
 
@@ -161,19 +227,18 @@ class HyFedCompensatorProject:
                 self.set_operation_status_failed()
                 return
 
-            # make sure compensator parameter names are the same across the clients
-            if not self.is_client_compensation_parameters_ok():
-                logger.error(f'Project {self.project_id_hash}: Compensation parameter names are different across clients!')
-                self.computation_timer.stop()
-                self.set_operation_status_failed()
-                return
+            # the noise values are already aggregated as they arrived (parameter names and data types are validated
+            # at the same time), so just negate the aggregated noise values; the packed ones with one negation per lane
+            if self.accumulated_compensation_pack is not None:
+                self.aggregated_compensation_parameters = self.accumulated_compensation_pack.map_buffers(
+                    lambda lane, buffer: negate(buffer, ParameterPack.get_lane_data_type(lane)), extras=dict())
 
-            # aggregate the compensation parameters
-            for parameter_name in self.client_compensation_parameters[0].keys():
-                compensation_values = self.compensation_parameter_to_list(parameter_name)
-                parameter_data_type = self.client_data_type_parameters[0][parameter_name]
-                aggregated_compensation_value = aggregate(compensation_values, parameter_data_type)
-                self.aggregated_compensation_parameters[parameter_name] = -aggregated_compensation_value
+            for parameter_name, accumulated_compensation_value in self.accumulated_compensation_parameters.items():
+                negated_compensation_value = negate(accumulated_compensation_value, self.compensation_data_types[parameter_name])
+                if self.accumulated_compensation_pack is not None:
+                    self.aggregated_compensation_parameters.extras[parameter_name] = negated_compensation_value
+                else:
+                    self.aggregated_compensation_parameters[parameter_name] = negated_compensation_value
 
             self.computation_timer.stop()
 
@@ -183,38 +248,48 @@ class HyFedCompensatorProject:
             self.computation_timer.stop()
             self.set_operation_status_failed()
 
-    def send_to_server(self):
-        """ Send aggregated authentication, sync, monitoring, and compensation parameters to the server """
+    def send_to_server(self, server_url, parameters_serialized, try_count=1):
+        """
+            Send the serialized authentication, sync, monitoring, and compensation parameters to the server;
+            if sending fails, it is scheduled to be retried after send_retry_delay seconds
+        """
 
-        # create and serialize request body
-        parameters_serialized = self.prepare_server_parameters()
+        try:
 
-        max_tries = 10
-        for _ in range(max_tries):
-            try:
+            logger.debug(f"Project {self.project_id_hash}: Sending the aggregated parameters to the server ...")
+
+            self.network_send_timer.start()
+            response = requests.post(url=f'{server_url}/{EndPoint.MODEL_COMPENSATION}',
+                                     data=parameters_serialized,
+                                     headers={RoutingHeader.HASH_PROJECT_ID: self.project_id_hash},
+                                     timeout=self.upload_parameters_timeout)
+
+            if response.status_code == 200:
+                logger.debug(f"Project {self.project_id_hash}: Sending done!")
+                self.network_send_timer.stop()
+                return
 
-                logger.debug(f"Project {self.project_id_hash}: Sending the aggregated parameters to the server ...")
+            logger.error(f"Project {self.project_id_hash}: Sending failed, got {response.status_code} status code from the server!")
+            self.network_send_timer.stop()
 
-                self.network_send_timer.start()
-                response = requests.post(url=f'{self.server_urls[0]}/{EndPoint.MODEL_COMPENSATION}',
-                                         data=parameters_serialized,
-                                         timeout=self.upload_parameters_timeout)
+        except Exception as send_server_exp:
+            logger.error(f"Project {self.project_id_hash}: Sending failed!")
+            logger.error(f'Project {self.project_id_hash}: The exception is: {send_server_exp}')
+            self.network_send_timer.stop()
 
-                if response.status_code == 200:
-                    logger.debug(f"Project {self.project_id_hash}: Sending done!")
-                    self.network_send_timer.stop()
-                    return
+        if try_count >= self.max_send_tries:
+            logger.error(f"Project {self.project_id_hash}: Sending given up after {try_count} tries!")
+            return
 
-                logger.error(f"Project {self.project_id_hash}: Sending failed, got {response.status_code} status code from the server!")
-                self.network_send_timer.stop()
+        if self.aggregation_executor is None:
+            retry_timer = threading.Timer(self.send_retry_delay, self.send_to_server,
+                                          args=(server_url, parameters_serialized, try_count + 1))
+            retry_timer.daemon = True
+            retry_timer.start()
+            return
 
-                time.sleep(30)
-                continue
-            except Exception as send_server_exp:
-                logger.error(f"Project {self.project_id_hash}: Sending failed!")
-                logger.error(f'Project {self.project_id_hash}: The exception is: {send_server_exp}')
-                self.network_send_timer.stop()
-                time.sleep(30)
+        self.aggregation_executor.schedule(self.send_retry_delay, self.project_id_hash, self.send_to_server,
+                                           server_url, parameters_serialized, try_count + 1)
 
     def aggregate_and_send(self):
         """ First aggregate, and then, send aggregated parameters to the server """
@@ -222,18 +297,29 @@ class HyFedCompensatorProject:
         # aggregate client parameters including compensation parameters
         self.aggregate_client_parameters()
 
-        # send the aggregated parameters to the server
-        self.send_to_server()
+        # create and serialize the request body
+        parameters_serialized = self.prepare_server_parameters()
+        server_url = self.server_urls[0]
+
+        # empty the lists/dictionaries for the next round before sending, because the clients can upload
+        # the parameters of the next round as soon as the server received the aggregated parameters
+        with self.accumulation_lock:
+            self.client_token_hashes = list()
+            self.client_username_hashes = list()
+            self.client_steps = list()
+            self.client_comm_rounds = list()
+            self.server_urls = list()
+            self.aggregated_compensation_parameters = dict()
+            self.accumulated_compensation_parameters = dict()
+            self.accumulated_compensation_pack = None
+            self.compensation_data_types = dict()
+            self.accumulated_client_count = 0
+            self.failed_client_count = 0
+            self.aggregation_triggered = False
+            self.round_started = False
 
-        # empty the lists/dictionaries for the next round
-        self.client_token_hashes = list()
-        self.client_username_hashes = list()
-        self.client_steps = list()
-        self.client_comm_rounds = list()
-        self.client_compensation_parameters = list()
-        self.client_data_type_parameters = list()
-        self.server_urls = list()
-        self.aggregated_compensation_parameters = dict()
+        # send the aggregated parameters to the server
+        self.send_to_server(server_url, parameters_serialized)
 
     # ########## setter/getter functions
     def set_operation_status_done(self):
@@ -263,6 +349,9 @@ class HyFedCompensatorProject:
     def get_last_updated_date(self):
         return self.last_updated_date
 
+    def set_aggregation_executor(self, aggregation_executor):
+        self.aggregation_executor = aggregation_executor
+
     # ########## Helper functions
     def is_client_sync_ok(self):
         """ Ensure the project step and communication round of all clients is the same """
@@ -292,57 +381,60 @@ class HyFedCompensatorProject:
             logger.error(f'Project {self.project_id_hash}: The exception is: {server_url_exp}')
             return False
 
-    def is_client_compensation_parameters_ok(self):
-        """ Make sure the names of the compensation parameters are consistent across clients """
-        try:
-            logger.debug(f"Project {self.project_id_hash}: checking whether compensation parameter names are consistent across all clients ...")
-            client1_compensation_parameter_names = self.client_compensation_parameters[0].keys()
-            for client_parameters in self.client_compensation_parameters:
-
-                if client_parameters.keys() != client1_compensation_parameter_names:
-                    return False
-
-            return True
-        except Exception as compensation_param_exp:
-            logger.error(f'Project {self.project_id_hash}: Checking compensation parameter names was failed!')
-            logger.error(f'Project {self.project_id_hash}: The exception is: {compensation_param_exp}')
-            return False
+    def should_aggregate_and_send(self):
+        """
+            Check whether the compensation parameters of all clients have been folded and the aggregation has not
+            been triggered yet, and if so, mark it as triggered; the accumulation lock must be held
+        """
 
-    def is_client_data_type_parameters_ok(self):
-        """ Make sure the names of the data type parameters are consistent across clients """
-        try:
-            logger.debug(f"Project {self.project_id_hash}: checking whether data type parameter names are consistent across all clients ...")
-            client1_data_type_parameter_names = self.client_data_type_parameters[0].keys()
-            for client_parameters in self.client_data_type_parameters:
-                if client_parameters.keys() != client1_data_type_parameter_names:
-                    return False
-
-            return True
-        except Exception as compensation_param_exp:
-            logger.error(f'Project {self.project_id_hash}: Checking data type parameter names was failed!')
-            logger.error(f'Project {self.project_id_hash}: The exception is: {compensation_param_exp}')
+        if self.aggregation_triggered or self.accumulated_client_count + self.failed_client_count != self.client_count:
             return False
 
-    def should_aggregate_and_send(self):
-        """ Check whether compensation parameters from all clients received """
-
-        return len(self.client_username_hashes) == self.client_count
+        self.aggregation_triggered = True
+        return True
 
-    def compensation_parameter_to_list(self, parameter_name):
+    def accumulate_compensation_parameters(self, compensation_parameters, data_type_parameters):
         """
-            Extract the compensation parameter of the clients specified with parameter_name as a list
+            Fold the compensation parameters of a client into the running sums; the parameter names and data types
+            must be the same as those from the first client; the accumulation lock must be held
         """
 
-        compensation_parameter_list = []
-        try:
-            for compensation_parameter in self.client_compensation_parameters:
-                compensation_parameter_list.append(compensation_parameter[parameter_name])
-        except Exception as convert_exp:
-            logger.error(f'Project {self.project_id_hash}: Converting compensation parameters to list was failed!')
-            logger.error(f'Project {self.project_id_hash}: The exception is: {convert_exp}')
-            self.set_operation_status_failed()
-
-        return compensation_parameter_list
+        if self.accumulated_client_count == 0:
+            if compensation_parameters.keys() != data_type_parameters.keys():
+                raise ValueError('Compensation and data type parameter names are different!')
+            self.compensation_data_types = dict(data_type_parameters)
+
+        elif compensation_parameters.keys() != self.compensation_data_types.keys():
+            raise ValueError('Compensation parameter names are different across clients!')
+
+        elif data_type_parameters != self.compensation_data_types:
+            raise ValueError('Data types of the compensation parameters are different across clients!')
+
+        # the packed noise values are folded with one addition per lane, and the values that are not packed one by one
+        if isinstance(compensation_parameters, ParameterPack):
+            if self.accumulated_client_count == 0:
+                self.accumulated_compensation_pack = compensation_parameters.copy()
+            elif self.accumulated_compensation_pack is None or \
+                    not self.accumulated_compensation_pack.is_compatible(compensation_parameters):
+                raise ValueError('The layouts of the packed compensation parameters are different across clients!')
+            else:
+                for lane, noise_buffer in compensation_parameters.buffers.items():
+                    self.accumulated_compensation_pack.buffers[lane] = accumulate(
+                        self.accumulated_compensation_pack.buffers[lane],
+                        noise_buffer,
+                        ParameterPack.get_lane_data_type(lane),
+                        self.accumulated_client_count)
+            compensation_parameters = compensation_parameters.extras
+
+        elif self.accumulated_compensation_pack is not None:
+            raise ValueError('The layouts of the packed compensation parameters are different across clients!')
+
+        for parameter_name, noise_value in compensation_parameters.items():
+            self.accumulated_compensation_parameters[parameter_name] = accumulate(
+                self.accumulated_compensation_parameters.get(parameter_name),
+                noise_value,
+                self.compensation_data_types[parameter_name],
+                self.accumulated_client_count)
 
     def prepare_server_parameters(self):
         """ Prepare the parameters shared with the server """
@@ -370,6 +462,8 @@ class HyFedCompensatorProject:
             monitoring_parameters[MonitoringParameter.COMPUTATION_TIME] = self.computation_timer.get_total_duration()
             monitoring_parameters[MonitoringParameter.NETWORK_SEND_TIME] = self.network_send_timer.get_total_duration()
             monitoring_parameters[MonitoringParameter.CLIENT_COMPENSATOR_TRAFFIC] = self.client_compensator_traffic.total_count
+            monitoring_parameters[MonitoringParameter.CLIENT_COMPENSATOR_TRAFFIC_UNCOMPRESSED] = \
+                self.client_compensator_traffic.total_uncompressed_count
 
             # server parameters in json
             server_parameters_json = {Parameter.AUTHENTICATION: authentication_parameters,
@@ -377,7 +471,7 @@ class HyFedCompensatorProject:
                                       Parameter.MONITORING: monitoring_parameters,
                                       Parameter.COMPENSATION: self.aggregated_compensation_parameters
                                      }
-            server_parameters_serialized = pickle.dumps(server_parameters_json)
+            server_parameters_serialized = codec.encode(server_parameters_json, self.server_compression, self.compression_level)
 
             self.computation_timer.stop()
 
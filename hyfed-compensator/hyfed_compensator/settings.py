@@ -126,6 +126,15 @@ STATIC_URL = '/static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5368709120
 
+# maximum size (in bytes) of a decoded (decompressed) request body; a compressed body is never decompressed beyond it
+CODEC_MAX_BODY_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
+
+# aggregation executor: number of the threads running the aggregation tasks (None: based on the CPU count), and
+# number of the processes to which the CPU-heavy aggregation functions are offloaded (0: no process pool);
+# an aggregation waiting for the compensator parameters holds its thread, so leave room for the waiting projects
+AGGREGATION_THREAD_COUNT = None
+AGGREGATION_PROCESS_COUNT = 0
+
 # logging configuration
 LOG_LEVEL = 'DEBUG'
 logging.config.dictConfig({
@@ -19,9 +19,10 @@ from django.urls import path
 from django.conf.urls import url
 
 from hyfed_compensator.util.endpoint import EndPoint
-from hyfed_compensator.views import NoiseAggregationView
+from hyfed_compensator.views import NoiseAggregationView, AggregationMetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     url(r'^' + EndPoint.NOISE_AGGREGATION, NoiseAggregationView.as_view()),
+    url(r'^metrics/aggregation/', AggregationMetricsView.as_view()),
 ]
@@ -22,3 +22,13 @@ class EndPoint:
     MODEL_COMPENSATION = 'compensator/model-compensation/'  # endpoint at the server
     PROJECT_AUTHENTICATION = 'compensator/project-authentication/'  # endpoint at the server
     NOISE_AGGREGATION = 'client/noise-aggregation/'  # endpoint at the compensator
+
+
+class RoutingHeader:
+    """
+        Unencrypted headers of the requests with the (hash of the) project ID, from which the server routes
+        the request to the worker of the project (see ShardRouter) without decoding the body
+    """
+
+    PROJECT_ID = 'X-HyFed-Project'  # client -> server
+    HASH_PROJECT_ID = 'X-HyFed-Project-Hash'  # compensator -> server
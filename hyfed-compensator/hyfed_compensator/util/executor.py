@@ -0,0 +1,169 @@
+"""
+    A bounded executor of the aggregation tasks of the projects
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import deque
+import multiprocessing
+import itertools
+import threading
+import heapq
+import time
+import os
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class AggregationExecutor:
+    """
+        Runs the aggregation tasks of the projects in a fixed number of threads instead of a new thread per task;
+        the tasks of the same project run one at a time in the order they were submitted, and the tasks of different
+        projects run concurrently (up to the number of threads); the aggregation of a project mutates the project
+        in the memory, so the tasks run in threads, and the CPU-heavy functions whose arguments and result can be
+        pickled can be offloaded to a process pool using run_in_process; the tasks that must wait for an external event
+        (e.g. a timeout or a retry) are scheduled to be submitted later instead of sleeping in a thread of the pool
+    """
+
+    def __init__(self, thread_count=None, process_count=0):
+        self.thread_count = thread_count or min(32, (os.cpu_count() or 1) + 4)
+        self.process_count = process_count  # no process pool if 0
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.thread_count, thread_name_prefix='aggregation')
+        self.process_pool = None  # created on the first use
+
+        # the pending tasks of each project with a running task; a project is in the dictionary as long as
+        # one of its tasks is running, so that its next task is only started after the running one finished
+        self.executor_lock = threading.Lock()
+        self.project_queues = dict()
+
+        # the scheduled tasks as a heap of (due time, sequence number, project_key, function, args, kwargs), submitted
+        # by the scheduler thread when they are due
+        self.scheduler_condition = threading.Condition()
+        self.scheduled_tasks = list()
+        self.scheduled_task_sequence = itertools.count()
+        self.scheduler_thread = None  # started on the first scheduled task
+
+        # metrics
+        self.queued_task_count = 0
+        self.max_queued_task_count = 0
+        self.running_task_count = 0
+        self.completed_task_count = 0
+        self.failed_task_count = 0
+
+    def submit(self, project_key, function, *args, **kwargs):
+        """ Run function(*args, **kwargs) after the previously submitted tasks of the project identified by project_key """
+
+        with self.executor_lock:
+            self.queued_task_count += 1
+            self.max_queued_task_count = max(self.max_queued_task_count, self.queued_task_count)
+
+            if project_key in self.project_queues.keys():
+                self.project_queues[project_key].append((function, args, kwargs))
+                return
+
+            self.project_queues[project_key] = deque()
+
+        self.thread_pool.submit(self.run_task, project_key, function, args, kwargs)
+
+    def run_task(self, project_key, function, args, kwargs):
+        """ Run the task of the project and then schedule the next pending task of the project, if any """
+
+        with self.executor_lock:
+            self.queued_task_count -= 1
+            self.running_task_count += 1
+
+        task_failed = False
+        try:
+            function(*args, **kwargs)
+        except Exception as task_exp:
+            logger.error(f'Project {project_key}: {task_exp}')
+            task_failed = True
+
+        with self.executor_lock:
+            self.running_task_count -= 1
+            self.completed_task_count += 1
+            if task_failed:
+                self.failed_task_count += 1
+
+            pending_tasks = self.project_queues[project_key]
+            if not pending_tasks:
+                del self.project_queues[project_key]
+                return
+
+            next_function, next_args, next_kwargs = pending_tasks.popleft()
+
+        # the next task is submitted to the back of the thread pool queue, so that the projects with many tasks
+        # do not hold a thread while the tasks of the other projects wait
+        self.thread_pool.submit(self.run_task, project_key, next_function, next_args, next_kwargs)
+
+    def schedule(self, delay, project_key, function, *args, **kwargs):
+        """ Submit function(*args, **kwargs) as a task of the project after delay seconds """
+
+        with self.scheduler_condition:
+            heapq.heappush(self.scheduled_tasks, (time.monotonic() + delay, next(self.scheduled_task_sequence),
+                                                  project_key, function, args, kwargs))
+
+            if self.scheduler_thread is None:
+                self.scheduler_thread = threading.Thread(target=self.run_scheduler, daemon=True)
+                self.scheduler_thread.start()
+            self.scheduler_condition.notify()
+
+    def run_scheduler(self):
+        """ Submit the scheduled tasks when they are due; runs in the scheduler thread """
+
+        while True:
+            with self.scheduler_condition:
+                while not self.scheduled_tasks or self.scheduled_tasks[0][0] > time.monotonic():
+                    wait_time = self.scheduled_tasks[0][0] - time.monotonic() if self.scheduled_tasks else None
+                    self.scheduler_condition.wait(wait_time)
+
+                _, _, project_key, function, args, kwargs = heapq.heappop(self.scheduled_tasks)
+
+            self.submit(project_key, function, *args, **kwargs)
+
+    def run_in_process(self, function, *args):
+        """
+            Run the CPU-heavy function in the process pool and return its result; the function and its arguments
+            must be picklable; runs the function in the calling thread if there is no process pool
+        """
+
+        if self.process_count <= 0:
+            return function(*args)
+
+        with self.executor_lock:
+            if self.process_pool is None:
+                # the worker processes are not forked from the (multi-threaded) server process, whose locks might be
+                # held by other threads at the time of the fork
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self.process_pool = ProcessPoolExecutor(max_workers=self.process_count,
+                                                        mp_context=multiprocessing.get_context(start_method))
+
+        return self.process_pool.submit(function, *args).result()
+
+    def get_metrics(self):
+        """ Get the queue depth and task counters of the executor """
+
+        with self.executor_lock:
+            return {'thread_count': self.thread_count,
+                    'process_count': self.process_count,
+                    'queued_task_count': self.queued_task_count,
+                    'max_queued_task_count': self.max_queued_task_count,
+                    'running_task_count': self.running_task_count,
+                    'completed_task_count': self.completed_task_count,
+                    'failed_task_count': self.failed_task_count,
+                    'active_project_count': len(self.project_queues),
+                    'scheduled_task_count': len(self.scheduled_tasks)}
@@ -20,7 +20,7 @@
 class Parameter:
     """
         There are six general categories of the parameters exchanged client <-> compensator and compensator <-> server:
-        client -> compensator: authentication, synchronization, connection, and compensation parameters
+        client -> compensator: authentication, synchronization, connection, and compensation (or noise seed) parameters
         compensator -> client: synchronization parameters
         compensator -> server: authentication, synchronization, monitoring, and compensation parameters
         server -> compensator: project parameters
@@ -31,6 +31,7 @@ class Parameter:
     CONNECTION = "connection_parameter"
     PROJECT = "project_parameter"
     COMPENSATION = "compensation_parameter"
+    NOISE_SEED = "noise_seed_parameter"
     MONITORING = "monitoring_parameter"
     DATA_TYPE = "data_type_parameter"
 
@@ -66,6 +67,7 @@ class SyncParameter:
 
     # compensator -> client
     SHOULD_RETRY = "should_retry"
+    COMPRESSION = "compression"  # compression algorithms the compensator can decode
 
 
 class ConnectionParameter:
@@ -78,6 +80,7 @@ class HyFedProjectParameter:
     """ Server -> compensator project parameters """
 
     CLIENT_COUNT = "client_count"
+    COMPRESSION = "compression"  # compression algorithms the server can decode
 
 
 class MonitoringParameter:
@@ -86,3 +89,19 @@ class MonitoringParameter:
     COMPUTATION_TIME = "computation_time"
     NETWORK_SEND_TIME = "network_send_time"
     CLIENT_COMPENSATOR_TRAFFIC = "client_compensator_traffic"
+    CLIENT_COMPENSATOR_TRAFFIC_UNCOMPRESSED = "client_compensator_traffic_uncompressed"
+
+
+class NoiseSeedParameter:
+    """
+        client -> compensator parameters to regenerate the noise values of the client (instead of sending them):
+        the secret seed of the round, the standard deviation of the Gaussian noise, and the layout of the noise values,
+        i.e. the size of each lane and the index of the packed parameters (see ParameterPack), and the shapes of the
+        parameters that are not packed (None for scalars and a list of shapes for lists of numpy arrays)
+    """
+
+    SEED = "seed"
+    GAUSSIAN_STD = "gaussian_std"
+    LANE_SIZES = "lane_sizes"
+    INDEX = "index"
+    SHAPES = "shapes"
@@ -0,0 +1,236 @@
+"""
+    Modular arithmetic to mask and aggregate the integer parameter values
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_compensator.util.data_type import DataType
+import numpy as np
+
+# non-negative integers are masked and aggregated modulo this prime
+largest_prime_non_negative_int54 = 18014398509481951  # largest prime number that can fit in 54-bit integer
+
+# rings in which the fixed-point encoded parameters are masked and aggregated
+PRIME_RING = 'prime'  # modulo largest_prime_non_negative_int54 (as non-negative integers)
+WRAPAROUND_RING = 'wraparound'  # modulo 2^64 (as int64 wrap-around integers)
+WRAPAROUND32_RING = 'wraparound32'  # modulo 2^32 (as int32 wrap-around integers)
+
+# (scale, ring) of the float32 parameters, which are masked as fixed-point integers rather than with float32 Gaussian
+# noise (at gaussian_std=1e6, the ulp of float32 is ~0.06, which wipes out the values after unmasking); the encoded
+# values are int32, so they take 4 bytes per value like float32; the values are rounded to multiples of 2^-16, so the
+# aggregated value is within client_count * 2^-17 of the exact sum, and the aggregated value must be in (-2^15, 2^15)
+FLOAT32_FIXED_POINT = (2 ** 16, WRAPAROUND32_RING)
+
+# bound of the absolute value of the encoded values in each ring, far enough from the bounds of the ring that the sum of
+# the encoded values of the clients does not wrap around either
+fixed_point_bounds = {PRIME_RING: largest_prime_non_negative_int54 // 2, WRAPAROUND_RING: 2 ** 62,
+                      WRAPAROUND32_RING: 2 ** 30}
+
+# the sum of this many values in [0, largest_prime_non_negative_int54) fits in int64, so the (partial) sums are
+# reduced once per block of values instead of after each addition
+modular_block_size = 511
+
+
+def is_non_negative_integer(data_type):
+    """ Check whether the values of the data type are masked and aggregated modulo largest_prime_non_negative_int54 """
+
+    return data_type == DataType.NON_NEGATIVE_INTEGER or data_type == DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER or \
+        data_type == DataType.LIST_NUMPY_ARRAY_NON_NEGATIVE_INTEGER
+
+
+def is_wraparound_integer(data_type):
+    """
+        Check whether the values of the data type are masked and aggregated with wrap-around, i.e. modulo 2^64
+        (int64) or modulo 2^32 (int32) for the 32-bit variants
+    """
+
+    return data_type == DataType.WRAPAROUND_INTEGER or data_type == DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER or \
+        data_type == DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER or data_type == DataType.WRAPAROUND_INTEGER32 or \
+        data_type == DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32 or data_type == DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER32
+
+
+def is_float32(data_type):
+    """ Check whether the values of the data type are float32, masked with float32 Gaussian noise """
+
+    return data_type == DataType.FLOAT32 or data_type == DataType.NUMPY_ARRAY_FLOAT32 or \
+        data_type == DataType.LIST_NUMPY_ARRAY_FLOAT32
+
+
+def masked_dtype(data_type):
+    """ numpy dtype of the masked values (and their noise and aggregate) of the data type """
+
+    if data_type == DataType.WRAPAROUND_INTEGER32 or data_type == DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32 or \
+            data_type == DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER32:
+        return np.dtype(np.int32)
+
+    if is_non_negative_integer(data_type) or is_wraparound_integer(data_type):
+        return np.dtype(np.int64)
+
+    if is_float32(data_type):
+        return np.dtype(np.float32)
+
+    return np.dtype(np.float64)
+
+
+# ########## modulo largest_prime_non_negative_int54
+def modular_reduce(value):
+    """ Reduce the value (scalar, numpy array, or list of numpy arrays) modulo largest_prime_non_negative_int54 """
+
+    if isinstance(value, list):
+        return [modular_reduce(array) for array in value]
+
+    # reduce the writable numpy arrays in place
+    if isinstance(value, np.ndarray) and value.ndim > 0 and value.flags.writeable:
+        return np.remainder(value, largest_prime_non_negative_int54, out=value)
+
+    return np.remainder(value, largest_prime_non_negative_int54)
+
+
+def modular_add(first_value, second_value):
+    """ Add two values (scalars or numpy arrays) modulo largest_prime_non_negative_int54 """
+
+    return np.remainder(np.add(first_value, second_value), largest_prime_non_negative_int54)
+
+
+def modular_sum(values):
+    """
+        Sum the values (scalars or numpy arrays with the same shape) in [0, largest_prime_non_negative_int54)
+        modulo largest_prime_non_negative_int54; the values are added in place into a single copy of the first value
+        and the sum is only reduced once per block of values, so it never overflows int64 regardless of the number of
+        values
+    """
+
+    aggregated_value = np.array(values[0])
+    for value_index in range(1, len(values)):
+        aggregated_value = modular_fold(aggregated_value, values[value_index], value_index)
+
+    return modular_reduce(aggregated_value)
+
+
+def modular_fold(accumulated_value, value, folded_count):
+    """
+        Add the value (scalar or numpy array) to accumulated_value, which is the (not necessarily reduced) sum of
+        folded_count values; numpy arrays are added in place, and the sum is reduced once per modular_block_size values
+    """
+
+    if isinstance(accumulated_value, np.ndarray) and accumulated_value.flags.writeable and \
+            accumulated_value.shape == np.shape(value):
+        np.add(accumulated_value, value, out=accumulated_value)
+    else:
+        accumulated_value = np.add(accumulated_value, value)
+
+    if (folded_count + 1) % modular_block_size == 0:
+        accumulated_value = modular_reduce(accumulated_value)
+
+    return accumulated_value
+
+
+# ########## modulo 2^64 (int64 wrap-around) or 2^32 (int32 wrap-around)
+def wraparound_noise(shape=None, generator=None, dtype=np.int64):
+    """ Generate noise uniformly distributed over all values of the integer dtype (using the numpy generator if given) """
+
+    int_info = np.iinfo(dtype)
+
+    if generator is not None:
+        return generator.integers(low=int_info.min, high=int_info.max, size=shape, dtype=dtype, endpoint=True)
+
+    return np.random.randint(low=int_info.min, high=int_info.max + 1, size=shape, dtype=dtype)
+
+
+def wraparound_add(first_value, second_value, dtype=np.int64):
+    """ Add two values (scalars or numpy arrays) modulo 2^64 as int64 (or 2^32 as int32); overflow simply wraps around """
+
+    return np.add(np.asarray(first_value, dtype=dtype), np.asarray(second_value, dtype=dtype))
+
+
+def wraparound_negate(value, dtype=np.int64):
+    """ Negate the value (scalar, numpy array, or list of numpy arrays) modulo 2^64 as int64 (or 2^32 as int32) """
+
+    if isinstance(value, list):
+        return [wraparound_negate(array, dtype) for array in value]
+
+    return np.negative(np.asarray(value, dtype=dtype))
+
+
+def wraparound_sum(values, dtype=np.int64):
+    """ Sum the values (scalars or numpy arrays with the same shape) modulo 2^64 as int64 (or 2^32 as int32) """
+
+    aggregated_value = np.array(values[0], dtype=dtype)
+    for value_index in range(1, len(values)):
+        np.add(aggregated_value, values[value_index], out=aggregated_value, casting='unsafe')
+
+    return aggregated_value
+
+
+# ########## fixed-point encoding
+def fixed_point_encode(value, scale, ring=PRIME_RING):
+    """
+        Encode the real value (scalar, numpy array, or list of numpy arrays) as the integers round(value * scale)
+        in the ring; negative integers are represented by their additive inverse in the prime ring
+    """
+
+    if isinstance(value, list):
+        return [fixed_point_encode(array, scale, ring) for array in value]
+
+    scaled_value = np.rint(np.multiply(value, scale))
+
+    if np.any(np.abs(scaled_value) >= fixed_point_bounds[ring]):
+        raise ValueError(f'Fixed-point value out of range of the {ring} ring (scale: {scale})!')
+
+    if ring == WRAPAROUND32_RING:
+        return scaled_value.astype(np.int32)
+
+    encoded_value = scaled_value.astype(np.int64)
+    if ring == PRIME_RING:
+        return np.remainder(encoded_value, largest_prime_non_negative_int54)
+
+    return encoded_value
+
+
+def fixed_point_decode(value, scale, ring=PRIME_RING):
+    """ Decode the (aggregated) fixed-point value (scalar, numpy array, or list of numpy arrays) encoded in the ring """
+
+    if isinstance(value, list):
+        return [fixed_point_decode(array, scale, ring) for array in value]
+
+    if ring == PRIME_RING:
+        value = np.remainder(value, largest_prime_non_negative_int54)
+        value = np.where(value > largest_prime_non_negative_int54 // 2, value - largest_prime_non_negative_int54, value)
+
+    decoded_value = np.divide(value, scale)
+
+    return decoded_value if np.ndim(decoded_value) else decoded_value.item()
+
+
+def fixed_point_data_type(value, ring=PRIME_RING):
+    """ Data type (see DataType) of the value (scalar, numpy array, or list of numpy arrays) encoded in the ring """
+
+    if ring == PRIME_RING:
+        scalar_type, array_type, list_type = DataType.NON_NEGATIVE_INTEGER, DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER, \
+            DataType.LIST_NUMPY_ARRAY_NON_NEGATIVE_INTEGER
+    elif ring == WRAPAROUND_RING:
+        scalar_type, array_type, list_type = DataType.WRAPAROUND_INTEGER, DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER, \
+            DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER
+    else:
+        scalar_type, array_type, list_type = DataType.WRAPAROUND_INTEGER32, DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32, \
+            DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER32
+
+    if isinstance(value, list):
+        return list_type
+
+    if isinstance(value, np.ndarray):
+        return array_type
+
+    return scalar_type
@@ -88,32 +88,45 @@ class Counter:
 
         self.total_count = 0
 
-    def increment(self, value):
-        """ Increase total_count by value """
+        # the traffic if the payloads had been sent without compression
+        self.total_uncompressed_count = 0
+
+    def increment(self, value, uncompressed_value=None):
+        """ Increase total_count by value and total_uncompressed_count by uncompressed_value (value if not given) """
         self.total_count += value
+        self.total_uncompressed_count += value if uncompressed_value is None else uncompressed_value
 
     def get_total_count(self):
         """ Return total count (in string) in human readable format """
+        return self.to_human_readable(self.total_count)
+
+    def get_total_uncompressed_count(self):
+        """ Return total uncompressed count (in string) in human readable format """
+        return self.to_human_readable(self.total_uncompressed_count)
+
+    @staticmethod
+    def to_human_readable(count):
+        """ Convert count (in bytes) to a human readable string """
 
         kilo = 1024
         mega = kilo * kilo
         giga = mega * kilo
         tera = giga * kilo
 
-        if self.total_count < 999:
-            return f'{self.total_count} Bytes'
+        if count < 999:
+            return f'{count} Bytes'
 
-        if self.total_count < kilo * 999:
-            return f'{self.total_count / kilo:.2f} KB'
+        if count < kilo * 999:
+            return f'{count / kilo:.2f} KB'
 
-        if self.total_count < mega * 999:
-            return f'{self.total_count / mega:.2f} MB'
+        if count < mega * 999:
+            return f'{count / mega:.2f} MB'
 
-        if self.total_count < giga * 999:
-            return f'{self.total_count / giga:.2f} GB'
+        if count < giga * 999:
+            return f'{count / giga:.2f} GB'
 
-        if self.total_count < tera * 999:
-            return f'{self.total_count / tera:.2f} TB'
+        if count < tera * 999:
+            return f'{count / tera:.2f} TB'
 
         return -1
 
@@ -0,0 +1,114 @@
+"""
+    Sparse numpy arrays in the coordinate (COO) format, sent and summed in time/space proportional to the non-zeros
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_compensator.util.data_type import DataType
+import numpy as np
+import math
+
+
+class SparseArray:
+    """
+        Sparse numpy array of any shape in the coordinate (COO) format: the flat (row-major) indices of the non-zero
+        elements in increasing order, their values, and the shape of the dense array;
+        only applicable to the parameters that are NOT masked (i.e. the compensator is not used), because the noise
+        would make the values dense
+    """
+
+    def __init__(self, shape, indices, values):
+        self.shape = tuple(shape)
+        self.indices = indices  # sorted and unique flat indices (int64)
+        self.values = values  # values at the indices
+
+    @classmethod
+    def from_dense(cls, array):
+        """ Sparse array with the non-zero elements of the (dense) numpy array """
+
+        flat_array = np.asarray(array).reshape(-1)
+        indices = np.flatnonzero(flat_array).astype(np.int64)
+
+        return cls(np.shape(array), indices, flat_array[indices])
+
+    @classmethod
+    def from_coordinates(cls, shape, coordinates, values):
+        """
+            Sparse array from the coordinates of the elements, i.e. a tuple of index arrays, one per dimension
+            (e.g. (rows, columns)), and their values; the values of the duplicate coordinates are summed
+        """
+
+        indices = np.ravel_multi_index(coordinates, shape).astype(np.int64)
+
+        return coalesce(shape, indices, np.asarray(values))
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nnz(self):
+        """ Number of the stored (non-zero) elements """
+
+        return self.values.size
+
+    def to_dense(self):
+        """ The dense numpy array """
+
+        dense_array = np.zeros(math.prod(self.shape), dtype=self.values.dtype)
+        dense_array[self.indices] = self.values
+
+        return dense_array.reshape(self.shape)
+
+    def to_dict(self):
+        return {'shape': self.shape, 'indices': self.indices, 'values': self.values}
+
+    @classmethod
+    def from_dict(cls, sparse_dict):
+        return cls(sparse_dict['shape'], sparse_dict['indices'], sparse_dict['values'])
+
+
+def is_sparse(data_type):
+    """ Check whether the values of the data type are sparse arrays (or lists of them) """
+
+    return data_type == DataType.SPARSE_ARRAY or data_type == DataType.LIST_SPARSE_ARRAY
+
+
+def coalesce(shape, indices, values):
+    """ Sparse array of the (unsorted) flat indices and values, with the values of the duplicate indices summed """
+
+    if indices.size == 0:
+        return SparseArray(shape, indices.astype(np.int64), values)
+
+    order = np.argsort(indices, kind='stable')
+    indices = indices[order]
+    values = values[order]
+
+    # the first position of each run of equal indices
+    run_starts = np.flatnonzero(np.concatenate(([True], indices[1:] != indices[:-1])))
+
+    return SparseArray(shape, indices[run_starts], np.add.reduceat(values, run_starts))
+
+
+def sparse_sum(values):
+    """ Sum the sparse arrays with the same shape; the cost is proportional to the total number of non-zeros """
+
+    shape = values[0].shape
+    if any(value.shape != shape for value in values):
+        raise ValueError('The shapes of the sparse arrays do not match!')
+
+    return coalesce(shape,
+                    np.concatenate([value.indices for value in values]),
+                    np.concatenate([value.values for value in values]))
@@ -16,33 +16,67 @@
     limitations under the License.
 """
 
-from hyfed_compensator.util.data_type import DataType
+from hyfed_compensator.util.modular import is_non_negative_integer, is_wraparound_integer, modular_fold, \
+    modular_reduce, wraparound_add, wraparound_negate, masked_dtype
 import numpy as np
 
 import logging
 logger = logging.getLogger(__name__)
 
-largest_prime_non_negative_int54 = 18014398509481951  # largest prime number that can fit in 54-bit integer
 
+def accumulate(accumulated_noise, noise_value, data_type, folded_count=0):
+    """
+        Fold the noise value (scalar, numpy array, or list of numpy arrays) of a client into accumulated_noise,
+        i.e. the sum of the folded_count noise values folded so far (None for the first value), and return the new sum;
+        numpy arrays are summed in place; modular arithmetic is used for non-negative integers (the sum is reduced once
+        per block of values) and wrap-around arithmetic for wrap-around integers
+    """
 
-def aggregate(noise_values, data_type):
-    """ Aggregate the noise values from the clients """
+    if isinstance(noise_value, list):
+        if accumulated_noise is None:
+            accumulated_noise = [None] * len(noise_value)
 
-    # if noise_values is not a list or is an empty list
-    if not type(noise_values) == list or not noise_values:
-        return None
+        if len(accumulated_noise) != len(noise_value):
+            raise ValueError('The number of numpy arrays in the noise values do not match!')
 
-    if data_type == DataType.NON_NEGATIVE_INTEGER:
-        return np.sum(noise_values) % largest_prime_non_negative_int54  # modular arithmetic
+        return [accumulate(accumulated_array, noise_array, data_type, folded_count)
+                for accumulated_array, noise_array in zip(accumulated_noise, noise_value)]
 
-    if data_type == DataType.NEGATIVE_INTEGER or data_type == DataType.FLOAT:
-        return np.sum(noise_values)
+    # the first value might be a read-only view of the request body, so copy it
+    if accumulated_noise is None:
+        if is_wraparound_integer(data_type):
+            wraparound_dtype = masked_dtype(data_type)
+            return np.array(noise_value, dtype=wraparound_dtype) if isinstance(noise_value, np.ndarray) else wraparound_dtype.type(noise_value)
+        return np.array(noise_value) if isinstance(noise_value, np.ndarray) else noise_value
 
-    if data_type == DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_NON_NEGATIVE_INTEGER:
-        return np.sum(noise_values, axis=0) % largest_prime_non_negative_int54
+    if is_non_negative_integer(data_type):
+        return modular_fold(accumulated_noise, noise_value, folded_count)
 
-    if data_type == DataType.NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.NUMPY_ARRAY_FLOAT or \
-            data_type == DataType.LIST_NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_FLOAT:
-        return np.sum(noise_values, axis=0)
+    if is_wraparound_integer(data_type):
+        if isinstance(accumulated_noise, np.ndarray) and accumulated_noise.shape == np.shape(noise_value):
+            return np.add(accumulated_noise, noise_value, out=accumulated_noise, casting='unsafe')
+        return wraparound_add(accumulated_noise, noise_value, masked_dtype(data_type))
 
-    return None
+    if isinstance(accumulated_noise, np.ndarray) and accumulated_noise.shape == np.shape(noise_value) and \
+            np.can_cast(np.result_type(noise_value), accumulated_noise.dtype):
+        return np.add(accumulated_noise, noise_value, out=accumulated_noise)
+
+    return accumulated_noise + noise_value
+
+
+def negate(value, data_type=None):
+    """
+        Negate the value (scalar, numpy array, or list of numpy arrays); the (partially reduced) sums of the
+        non-negative integers are reduced first, and wrap-around integers are negated modulo 2^64 (2^32)
+    """
+
+    if is_wraparound_integer(data_type):
+        return wraparound_negate(value, masked_dtype(data_type))
+
+    if is_non_negative_integer(data_type):
+        value = modular_reduce(value)
+
+    if isinstance(value, list):
+        return [-array for array in value]
+
+    return -value
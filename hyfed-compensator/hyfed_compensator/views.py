@@ -17,14 +17,17 @@
 """
 
 from hyfed_compensator.util.hyfed_parameters import Parameter, AuthenticationParameter, ConnectionParameter, HyFedProjectParameter, SyncParameter
-from hyfed_compensator.util.endpoint import EndPoint
+from hyfed_compensator.util.endpoint import EndPoint, RoutingHeader
 from hyfed_compensator.project.hyfed_compensator_project import HyFedCompensatorProject
+from hyfed_compensator.util.executor import AggregationExecutor
+from hyfed_compensator.util import codec
 
 from django.http import HttpResponse, HttpResponseBadRequest
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
-import pickle
 import threading
 import time
 import requests
@@ -35,6 +38,7 @@ logger = logging.getLogger(__name__)
 
 project_pool = dict()  # a pool of authenticated projects; indexed by project_id_hash
 auth_in_progress = set()  # set of projects whose authentication is in progress
+aggregation_executor = AggregationExecutor(settings.AGGREGATION_THREAD_COUNT, settings.AGGREGATION_PROCESS_COUNT)
 
 
 def clean_up_projects():
@@ -55,7 +59,7 @@ def authenticate_project(hash_project_id, server_url):
 
     # create and serialize request body
     request_body = {Parameter.AUTHENTICATION: {AuthenticationParameter.HASH_PROJECT_ID: hash_project_id}}
-    serialized_request_body = pickle.dumps(request_body)
+    serialized_request_body = codec.encode(request_body)
 
     # send a request to server to authenticate the project
     max_tries = 10
@@ -64,6 +68,7 @@ def authenticate_project(hash_project_id, server_url):
             logger.debug(f"Project {hash_project_id}: Sending project authentication request to the server ...")
             response = requests.get(url=f'{server_url}/{EndPoint.PROJECT_AUTHENTICATION}',
                                     data=serialized_request_body,
+                                    headers={RoutingHeader.HASH_PROJECT_ID: hash_project_id},
                                     timeout=60)
 
             if response.status_code == 200:
@@ -72,9 +77,10 @@ def authenticate_project(hash_project_id, server_url):
                 auth_in_progress.discard(hash_project_id)
 
                 # deserialize response
-                json_response = pickle.loads(response.content)
+                json_response = codec.decode(response.content)
                 project_authenticated = json_response[AuthenticationParameter.PROJECT_AUTHENTICATED]
                 client_count = json_response[HyFedProjectParameter.CLIENT_COUNT]
+                server_compression = codec.negotiate_compression(json_response[HyFedProjectParameter.COMPRESSION])
 
                 # if project does not exist on the server, then return
                 if not project_authenticated:
@@ -84,7 +90,9 @@ def authenticate_project(hash_project_id, server_url):
                 # if project exists on the server, then create the corresponding compensator project and put it into project_pool
                 logger.debug(f"Project {hash_project_id}: Project authenticated!")
 
-                project_pool[hash_project_id] = HyFedCompensatorProject(hash_project_id, client_count)
+                compensator_project = HyFedCompensatorProject(hash_project_id, client_count, server_compression)
+                compensator_project.set_aggregation_executor(aggregation_executor)
+                project_pool[hash_project_id] = compensator_project
                 logger.debug(f"Project {hash_project_id}: Project added to the pool!")
 
                 # remove old projects from the pool
@@ -111,7 +119,7 @@ class NoiseAggregationView(APIView):
         try:
 
             # extract server URL and the hash of project ID from the request body
-            request_body = pickle.loads(request.body)
+            request_body = codec.decode(request.body, settings.CODEC_MAX_BODY_SIZE)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             connection_parameters = request_body[Parameter.CONNECTION]
             hash_project_id = authentication_parameters[AuthenticationParameter.HASH_PROJECT_ID]
@@ -123,27 +131,23 @@ class NoiseAggregationView(APIView):
                 # update the last day the project accessed
                 project_pool[hash_project_id].set_last_updated_date()
 
-                # add the client parameters to the corresponding attributes
-                project_pool[hash_project_id].add_client_parameters(request)
-
-                # aggregate client parameters including noise values if they are received from all clients
-                if project_pool[hash_project_id].should_aggregate_and_send():
-                    aggregate_send_thread = threading.Thread(target=project_pool[hash_project_id].aggregate_and_send)
-                    aggregate_send_thread.setDaemon(True)
-                    aggregate_send_thread.start()
+                # add the client parameters to the corresponding attributes, and aggregate client parameters
+                # including noise values if they have been received from all clients (exactly once per round)
+                if project_pool[hash_project_id].add_client_parameters(request, request_body):
+                    aggregation_executor.submit(hash_project_id, project_pool[hash_project_id].aggregate_and_send)
 
                 # tell the client not to retry
                 should_retry = False
-                response = {SyncParameter.SHOULD_RETRY: should_retry}
-                serialized_response = pickle.dumps(response)
+                response = {SyncParameter.SHOULD_RETRY: should_retry, SyncParameter.COMPRESSION: codec.available_compressions()}
+                serialized_response = codec.encode(response)
                 return HttpResponse(content=serialized_response)
 
             # if the project authentication is in progress, tell the client to retry later
             if hash_project_id in auth_in_progress:
                 logger.debug(f"Project {hash_project_id}: Project authentication is in progress!")
                 should_retry = True
-                response = {SyncParameter.SHOULD_RETRY: should_retry}
-                serialized_response = pickle.dumps(response)
+                response = {SyncParameter.SHOULD_RETRY: should_retry, SyncParameter.COMPRESSION: codec.available_compressions()}
+                serialized_response = codec.encode(response)
                 return HttpResponse(content=serialized_response)
 
             # if the project has not been authenticated yet, then initiate the authentication
@@ -154,10 +158,17 @@ class NoiseAggregationView(APIView):
 
             # tell the client to retry
             should_retry = True
-            response = {SyncParameter.SHOULD_RETRY: should_retry}
-            serialized_response = pickle.dumps(response)
+            response = {SyncParameter.SHOULD_RETRY: should_retry, SyncParameter.COMPRESSION: codec.available_compressions()}
+            serialized_response = codec.encode(response)
             return HttpResponse(content=serialized_response)
 
         except Exception as view_exception:
             logger.error(view_exception)
             return HttpResponseBadRequest()
+
+
+class AggregationMetricsView(APIView):
+    """ Provide the queue depth and task counters of the aggregation executor """
+
+    def get(self, request):
+        return Response(aggregation_executor.get_metrics())
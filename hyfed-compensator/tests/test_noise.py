@@ -0,0 +1,100 @@
+"""
+    Test the seed-based noise: the noise regenerated from a seed must be the same every time and independent of
+    the number of threads that fill it, and must have the range and dtype of the lane
+    (run from hyfed-compensator with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_compensator.util.noise import new_noise_seed, new_lane_noise, fill_lane_noise, regenerate_noise, \
+    noise_chunk_size
+from hyfed_compensator.util.hyfed_parameters import NoiseSeedParameter
+from hyfed_compensator.util.modular import largest_prime_non_negative_int54
+from hyfed_compensator.util.parameter_pack import ParameterPack
+from hyfed_compensator.util.data_type import DataType
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+gaussian_std = 1e6
+
+# more than two chunks, the last one partial
+lane_size = 2 * noise_chunk_size + 1000
+
+
+def lane_noise(lane, noise_seed, executor=None):
+    noise = new_lane_noise(lane, lane_size)
+    for future in fill_lane_noise(noise, lane, gaussian_std, noise_seed, executor):
+        future.result()
+
+    return noise
+
+
+@pytest.mark.parametrize('lane', [ParameterPack.MODULAR_LANE, ParameterPack.WRAPAROUND32_LANE,
+                                  ParameterPack.GAUSSIAN_LANE])
+def test_lane_noise_is_independent_of_threads(lane):
+    noise_seed = new_noise_seed()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        parallel_noise = lane_noise(lane, noise_seed, executor)
+
+    assert np.array_equal(lane_noise(lane, noise_seed), parallel_noise)
+    assert not np.array_equal(lane_noise(lane, new_noise_seed()), parallel_noise)
+
+
+def test_lane_noise_range_and_dtype():
+    noise_seed = new_noise_seed()
+
+    modular_noise = lane_noise(ParameterPack.MODULAR_LANE, noise_seed)
+    assert modular_noise.dtype == np.int64
+    assert modular_noise.min() >= 0 and modular_noise.max() < largest_prime_non_negative_int54
+
+    assert lane_noise(ParameterPack.WRAPAROUND32_LANE, noise_seed).dtype == np.int32
+
+    gaussian_noise = lane_noise(ParameterPack.GAUSSIAN_LANE, noise_seed)
+    assert gaussian_noise.dtype == np.float64
+    assert abs(gaussian_noise.std() / gaussian_std - 1) < 0.01
+
+    # the chunks are drawn from different streams
+    assert not np.array_equal(modular_noise[:1000], modular_noise[noise_chunk_size:noise_chunk_size + 1000])
+
+
+def test_regenerated_noise_is_deterministic():
+    parameters = {'weights': np.zeros((10, 10)), 'counts': np.zeros(5, dtype=np.int64), 'label': 'unpacked'}
+    data_types = {'weights': DataType.NUMPY_ARRAY_FLOAT, 'counts': DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER}
+    pack = ParameterPack.pack({name: parameters[name] for name in data_types.keys()}, data_types)
+
+    noise_seed_parameters = {
+        NoiseSeedParameter.SEED: new_noise_seed(),
+        NoiseSeedParameter.GAUSSIAN_STD: gaussian_std,
+        NoiseSeedParameter.LANE_SIZES: {lane: buffer.size for lane, buffer in pack.buffers.items()},
+        NoiseSeedParameter.INDEX: pack.index,
+        NoiseSeedParameter.SHAPES: {'scalar': None, 'layers': [(2, 3), (4,)]}
+    }
+    noise_data_types = {'scalar': DataType.FLOAT, 'layers': DataType.LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER}
+
+    first_noise = regenerate_noise(noise_seed_parameters, noise_data_types)
+    second_noise = regenerate_noise(noise_seed_parameters, noise_data_types)
+
+    assert isinstance(first_noise, ParameterPack)
+    assert first_noise.keys() == {'weights', 'counts', 'scalar', 'layers'}
+    for lane, buffer in first_noise.buffers.items():
+        assert np.array_equal(buffer, second_noise.buffers[lane])
+    assert first_noise.get('weights').shape == (10, 10)
+    assert first_noise.get('scalar') == second_noise.get('scalar')
+    assert [array.shape for array in first_noise.get('layers')] == [(2, 3), (4,)]
+    assert all(np.array_equal(first_array, second_array) and first_array.dtype == np.int64
+               for first_array, second_array in zip(first_noise.get('layers'), second_noise.get('layers')))
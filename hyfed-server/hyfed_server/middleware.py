@@ -1,5 +1,5 @@
 """
-    JWT token configuration
+    JWT token configuration and routing of the requests to the server worker process owning the project
 
     Copyright 2021 Julian Matschinske. All Rights Reserved.
 
@@ -44,3 +44,20 @@ def jwt_token_middleware(get_response):
         return response
 
     return middleware
+
+
+def shard_routing_middleware(get_response):
+    """ Forward the requests of the projects owned by another server worker process to that worker (see ShardRouter) """
+
+    from hyfed_server.util.shard import shard_router
+
+    def middleware(request):
+
+        if shard_router.is_sharded() and not request.headers.get(shard_router.FORWARDED_HEADER):
+            shard = shard_router.route(request)
+            if not shard_router.is_local(shard):
+                return shard_router.forward(request, shard)
+
+        return get_response(request)
+
+    return middleware
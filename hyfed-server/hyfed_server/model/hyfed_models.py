@@ -49,6 +49,8 @@ class HyFedProjectModel(models.Model):
     timer = models.ForeignKey('TimerModel', on_delete=models.CASCADE)
     traffic = models.ForeignKey('TrafficModel', on_delete=models.CASCADE)
     result_dir = models.CharField(max_length=1000, default="")
+    shard = models.PositiveIntegerField(default=0)  # the server worker process keeping the project in its pool
+    hash_id = models.CharField(max_length=64, default="", db_index=True)  # sha256 of the ID, to route the compensator
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -90,7 +92,10 @@ class TimerModel(models.Model):
 
 
 class TrafficModel(models.Model):
-    """ Network traffic statistics client <-> server and client -> compensator  """
+    """
+        Network traffic statistics client <-> server and client -> compensator;
+        the *_uncompressed fields are the traffic if the payloads had been sent without compression
+    """
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     client_server = models.CharField(max_length=32, default='0.00 KB')
@@ -98,4 +103,67 @@ class TrafficModel(models.Model):
     client_compensator = models.CharField(max_length=32, default='0.00 KB')
     compensator_server = models.CharField(max_length=32, default='0.00 KB')
     traffic_total = models.CharField(max_length=32, default='0.00 KB')
+    client_server_uncompressed = models.CharField(max_length=32, default='0.00 KB')
+    server_client_uncompressed = models.CharField(max_length=32, default='0.00 KB')
+    client_compensator_uncompressed = models.CharField(max_length=32, default='0.00 KB')
+    compensator_server_uncompressed = models.CharField(max_length=32, default='0.00 KB')
+    traffic_total_uncompressed = models.CharField(max_length=32, default='0.00 KB')
+
+
+
+class RoundMetricsModel(models.Model):
+    """
+        Runtime (in seconds) and traffic (in bytes) statistics of a communication round of the project as numbers;
+        client statistics are averaged over the clients; the clients report their times up to the previous round,
+        so the client times of a row are those of the previous round
+    """
 
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey('HyFedProjectModel', on_delete=models.CASCADE, related_name='round_metrics')
+    comm_round = models.PositiveIntegerField()
+    step = models.CharField(max_length=255)
+    client_count = models.PositiveIntegerField(default=0)  # number of the clients whose parameters were aggregated
+    round_duration = models.FloatField(default=0.0)  # wall-clock time since the previous round was aggregated
+    client_computation = models.FloatField(default=0.0)
+    client_network_send = models.FloatField(default=0.0)
+    client_network_receive = models.FloatField(default=0.0)
+    client_idle = models.FloatField(default=0.0)
+    compensator_computation = models.FloatField(default=0.0)
+    compensator_network_send = models.FloatField(default=0.0)
+    server_aggregation = models.FloatField(default=0.0)  # up to recording the metrics in post_aggregate
+    client_server = models.BigIntegerField(default=0)
+    server_client = models.BigIntegerField(default=0)
+    client_compensator = models.BigIntegerField(default=0)
+    compensator_server = models.BigIntegerField(default=0)
+    client_server_uncompressed = models.BigIntegerField(default=0)
+    server_client_uncompressed = models.BigIntegerField(default=0)
+    client_compensator_uncompressed = models.BigIntegerField(default=0)
+    compensator_server_uncompressed = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('project', 'comm_round')
+        ordering = ('comm_round',)
+
+
+class ClientRoundMetricsModel(models.Model):
+    """
+        Runtime statistics (in seconds) of a client in a communication round of the project, to find the clients
+        holding up the rounds; the clients report their times up to the previous round, so the computation/network/idle
+        times of a row are those of the previous round, whereas the upload order and delay are those of the round
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey('HyFedProjectModel', on_delete=models.CASCADE, related_name='client_round_metrics')
+    comm_round = models.PositiveIntegerField()
+    username = models.CharField(max_length=150)
+    upload_order = models.PositiveIntegerField(default=0)  # 1 for the first upload of the round
+    upload_delay = models.FloatField(default=0.0)  # from the start of the round until the upload was received
+    computation = models.FloatField(default=0.0)
+    network_send = models.FloatField(default=0.0)
+    network_receive = models.FloatField(default=0.0)
+    idle = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('project', 'comm_round', 'username')
+        ordering = ('comm_round', 'upload_order')
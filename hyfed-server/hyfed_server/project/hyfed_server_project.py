@@ -21,12 +21,20 @@
 from hyfed_server.util.status import ProjectStatus, OperationStatus
 from hyfed_server.util.hyfed_parameters import Parameter, SyncParameter, MonitoringParameter, AuthenticationParameter, CoordinationParameter
 from hyfed_server.util.monitoring import Timer, Counter
-from hyfed_server.model.hyfed_models import HyFedProjectModel, TimerModel, TrafficModel
-from hyfed_server.util.utils import client_parameters_to_list, aggregate_parameters
+from hyfed_server.model.hyfed_models import HyFedProjectModel, TimerModel, TrafficModel, RoundMetricsModel, \
+    ClientRoundMetricsModel
+from hyfed_server.util.utils import client_parameters_to_list, aggregate_parameters, delta_encode, accumulate_parameter, \
+    global_parameters_capability
+from hyfed_server.util.modular import is_non_negative_integer, is_float32, modular_reduce, fixed_point_decode
+from hyfed_server.util.parameter_pack import ParameterPack
+from hyfed_server.util.sparse import is_sparse
+from hyfed_server.util.shared_aggregation import create_shared_array, release_shared_memory, sum_shared_rows
+from hyfed_server.util.model_writer import model_writer
 from hyfed_server.util.hyfed_steps import HyFedProjectStep
 from hyfed_server.models import UserModel
 from hyfed_server.util.hyfed_parameters import HyFedProjectParameter
 from hyfed_server.util.data_type import DataType
+from hyfed_server.util import codec
 
 from pathlib import Path
 import copy
@@ -34,7 +42,7 @@ import os
 import numpy as np
 import time
 import hashlib
-import pickle
+import threading
 
 import logging
 logger = logging.getLogger(__name__)
@@ -50,6 +58,57 @@ class HyFedServerProject:
         destroyed when the project is completed/failed/aborted.
     """
 
+    # the coordination attributes and global parameters that are saved in the snapshots of the project (see
+    # get_snapshot); the derived classes extend it with their own coordination and global attributes, e.g.
+    # snapshot_attributes = HyFedServerProject.snapshot_attributes | {'global_mean'}
+    snapshot_attributes = frozenset({
+        'project_id', 'hash_project_id', 'algorithm', 'status', 'step', 'comm_round', 'result_dir', 'start_time',
+        'participants_clicked_run', 'client_tokens', 'hash_client_tokens', 'hash_client_usernames', 'client_steps',
+        'client_comm_rounds', 'client_operation_stats', 'client_compensator_flags', 'compensator_flag',
+        'compensator_timeout', 'max_long_poll_timeout', 'streaming_aggregation', 'process_aggregation',
+        'compression_level', 'global_parameters', 'global_parameters_client_agnostic', 'clean_up_flag',
+        'clean_up_time', 'time_before_clean_up', 'timer_id', 'traffic_id', 'computation_timer', 'client_computation',
+        'client_network_send', 'client_network_receive', 'client_idle', 'compensator_computation',
+        'compensator_network_send', 'client_server_traffic', 'compensator_server_traffic',
+        'client_compensator_traffic', 'round_end_time', 'round_metric_totals', 'client_timer_totals'
+    })
+
+    # the attributes that are NOT saved in the snapshots of the project and their initial values on restore:
+    # the threading primitives and callbacks, the local and compensator parameters, which are NEVER saved,
+    # and the per-round aggregation state and caches; the derived classes extend it with their own such attributes;
+    # a project with an attribute in neither snapshot_attributes nor transient_attributes is not saved at all (see
+    # get_snapshot), so per-client data added by a derived class never reaches the disk by omission
+    transient_attributes = {
+        'round_lock': threading.Lock,
+        'aggregation_lock': threading.Lock,
+        'round_condition': threading.Condition,
+        'aggregation_started': lambda: False,
+        'reserved_client_uploads': set,
+        'written_status': lambda: None,
+        'clean_up_scheduler': lambda: None,
+        'aggregation_executor': lambda: None,
+        'snapshot_store': lambda: None,
+        'local_parameters': dict,
+        'client_monitoring_parameters': dict,
+        'client_upload_times': dict,
+        'aggregated_parameters': dict,
+        'aggregated_parameter_counts': dict,
+        'aggregated_parameter_data_types': dict,
+        'aggregated_parameter_pack': lambda: None,
+        'aggregated_parameter_pack_count': lambda: 0,
+        'shared_pack': lambda: None,
+        'shared_lanes': dict,
+        'shared_rows': dict,
+        'shared_sum_ready': lambda: False,
+        'fixed_point_parameters': dict,
+        'compensator_parameters': dict,
+        'previous_global_parameters': dict,
+        'previous_global_parameters_round': lambda: -1,  # no delta against the global parameters before the restore
+        'global_parameter_deltas': dict,
+        'global_parameter_blobs': dict,
+        'global_parameter_blob_hashes': dict
+    }
+
     def __init__(self, creation_request, project_model):
         """ Initialize the base project based on the project parameters from the creation request """
 
@@ -79,8 +138,13 @@ class HyFedServerProject:
         self.status = project_instance.status
         self.step = project_instance.step
         self.comm_round = project_instance.comm_round
+        self.written_status = self.status  # the last status written to the project model (see update_project_model)
         logger.debug(f"Project {project_instance.id}: Project coordination and sync attributes initialized!")
 
+        # the timer and traffic model instances of the project, updated in each round (see update_timer_model)
+        self.timer_id = timer.id
+        self.traffic_id = traffic.id
+
         # base dir to save the results of the project; re-initialized in the derived class
         self.result_dir = result_dir
 
@@ -102,18 +166,79 @@ class HyFedServerProject:
         # indexed by the client username; re-initialized in ModelAggregationView in each communication round.
         self.client_monitoring_parameters = dict()
 
+        # the time at which the parameters of each client were received in this round, in the order of the uploads;
+        # indexed by the client username; re-initialized in post_aggregate in each communication round.
+        self.client_upload_times = dict()
+
+        # the monitoring timer values of the clients as of the previous round, from which the per-client per-round
+        # times are computed (see record_client_round_metrics); indexed by the client username
+        self.client_timer_totals = dict()
+
         # the value of the (noisy) local model parameters from the clients; indexed by the client's username;
         # re-initialized in ModelAggregationView in each communication round.
         self.local_parameters = dict()
 
+        # in the streaming aggregation mode, the local parameter values are folded into running per-parameter sums
+        # as they arrive (instead of being kept in self.local_parameters), so that the memory usage is O(model size)
+        # rather than O(clients x model size); only applicable if the aggregation is the sum of the parameter values.
+        # the sums, number of folded values, and data types (of the masked parameters, declared by the clients) are
+        # indexed by the parameter name and re-initialized in each communication round.
+        self.streaming_aggregation = False
+        self.aggregated_parameters = dict()
+        self.aggregated_parameter_counts = dict()
+        self.aggregated_parameter_data_types = dict()
+        self.aggregated_parameter_pack = None  # running sums of the lane buffers of the packed local parameters
+        self.aggregated_parameter_pack_count = 0
+        self.aggregation_lock = threading.Lock()  # uploads of the clients are folded concurrently
+
+        # in the process aggregation mode (only applicable if the aggregation is NOT streaming), the lane buffers of
+        # the packed local parameters are copied into shared memory as they arrive, one row per client (and the
+        # compensator), and summed in a worker process of the aggregation executor (see set_aggregation_executor),
+        # so that the summation does not compete with the request threads for the GIL; the shared lanes are
+        # released in each communication round
+        self.process_aggregation = False
+        self.aggregation_executor = None
+        self.shared_pack = None  # index and extras of the packed local parameters; buffers are the summed rows
+        self.shared_lanes = dict()  # lane -> (shared memory block, numpy array of the rows on top of it)
+        self.shared_rows = dict()  # username -> row of its lane buffers
+        self.shared_sum_ready = False
+
+        # (scale, ring) of the real-valued parameters that the clients encoded as fixed-point integers before masking;
+        # their sums are aggregated with the integer data types declared by the clients and decoded back to floats
+        # in compute_aggregated_parameter; re-initialized in each communication round
+        self.fixed_point_parameters = dict()
+
         # the parameter values from the compensator such as aggregated noise, operation status, and etc """
         self.compensator_parameters = dict()
 
+        # the uploads of the clients and compensator are handled by concurrent request threads; the round lock makes
+        # recording an upload and deciding whether it completes the round atomic, and aggregation_started ensures that
+        # the aggregation of a communication round is triggered exactly once, by the last of the client and compensator
+        # uploads (see claim_aggregation), so that no aggregation thread waits for the compensator; the per-round state
+        # is only cleared (in post_aggregate) with the round lock held; the parameters of the clients are extracted and
+        # folded without the round lock (see add_client_upload), once per client (reserved_client_uploads)
+        self.round_lock = threading.Lock()
+        self.aggregation_started = False
+        self.reserved_client_uploads = set()
+
         # the value of the global model parameters shared with the clients;
         # computed in aggregate function of the DERIVED class in each communication round.
         self.global_parameters = dict()
 
-        # to identify to which communication round the current value of the self.global_parameters
+        # the value of the global model parameters shared with the clients in the previous communication round and
+        # the round in which they were shared; used to send the global parameters as delta against the previous value
+        self.previous_global_parameters = dict()
+        self.previous_global_parameters_round = 0
+
+        # global parameters delta-encoded against the previous global parameters; indexed by the client's username
+        # (or None if the global parameters are client agnostic); re-initialized in each communication round
+        self.global_parameter_deltas = dict()
+
+        # client agnostic global parameters serialized once per communication round and fetched by the clients using
+        # the content (sha256) hash of the blob; the hash of each blob is indexed by (compression, delta flag);
+        # both re-initialized in each communication round
+        self.global_parameter_blobs = dict()
+        self.global_parameter_blob_hashes = dict()
 
         # determine whether or not global parameter values are the same for all clients
         self.global_parameters_client_agnostic = True
@@ -138,15 +263,40 @@ class HyFedServerProject:
         self.compensator_computation = 0.0
         self.compensator_network_send = 0.0
 
+        # the cumulative times and traffic as of the previous round, from which the per-round metrics are computed,
+        # and the time at which the previous round was aggregated (see record_round_metrics)
+        self.round_metric_totals = dict()
+        self.round_end_time = 0.0
+
         # counters to track the traffic (in terms of bytes)
         self.client_server_traffic = Counter("client->server")
         self.server_client_traffic = Counter("server->client")
         self.compensator_server_traffic = Counter("compensator->server")
         self.client_compensator_traffic = Counter("client->compensator")  # will be provided by the compensator
 
+        # compression level of the payloads sent to the clients (None means the default level of the algorithm);
+        # the algorithm itself is negotiated with each client in prepare_client_parameters
+        self.compression_level = None
+
+        # condition notified whenever the status or communication round of the project changes; GlobalModelView
+        # waits on it to hold the (long polling) requests of the clients until the global parameters are ready and
+        # ProjectEventsView to push the project events to the clients
+        self.round_condition = threading.Condition()
+        self.max_long_poll_timeout = 60  # in seconds; 0 disables long polling
+
+        # maximum time (in seconds) to wait for the compensator parameters after the parameters of all clients have been
+        # received; the project fails if they do not arrive in time (see compensator_timed_out)
+        self.compensator_timeout = 600
+
         # attributes to clean up the project
         self.time_before_clean_up = 300  # in seconds
         self.clean_up_flag = False  # will be set to True if project fails/aborted/completed
+        self.clean_up_time = 0.0  # the time (in seconds since the epoch) after which the project can be removed
+        self.clean_up_scheduler = None  # function(project_id, clean_up_time) set by the project pool
+
+        # the snapshots of the project are saved in the snapshot store (set by the project pool, None disables them)
+        # after each communication round, so that the project can be restored after the server restarts
+        self.snapshot_store = None
 
         # attributes to authenticate the compensator; re-initialized in set_hashes function
         self.hash_project_id = ''
@@ -255,7 +405,12 @@ class HyFedServerProject:
         logger.debug(f'Project {self.project_id}: #### step {self.step}')
         logger.debug(f'Project {self.project_id}: ## pre-aggregate')
 
-        # clear the global parameters from the previous round
+        # keep the global parameters from the previous round as the base of the deltas and clear them
+        self.previous_global_parameters = self.global_parameters
+        self.previous_global_parameters_round = self.comm_round
+        self.global_parameter_deltas = dict()
+        self.global_parameter_blobs = dict()
+        self.global_parameter_blob_hashes = dict()
         self.global_parameters = dict()
 
         # check clients' operation status as well as ensure clients are synced with the server
@@ -266,14 +421,13 @@ class HyFedServerProject:
         # if compensator is used to hide model parameter values
         if self.compensator_flag:
 
-            # to inform clients and coordinator that server is waiting for compensator
+            # the aggregation only starts without the compensator parameters if they did not arrive in time
+            # (e.g. the compensator gave up sending them)
             if not self.is_compensator_parameters_received():
-                self.set_status(ProjectStatus.WAITING_FOR_COMPENSATOR)
-                self.update_project_model()
-
-            # wait until compensator parameters received
-            while not self.is_compensator_parameters_received():
-                time.sleep(1)
+                logger.error(f'Project {self.project_id}: compensator parameters not received within '
+                             f'{self.compensator_timeout} seconds!')
+                self.project_failed()
+                return
 
             # check whether sync and operation status was OK in compensator
             if not self.is_compensator_sync_and_operation_ok():
@@ -328,14 +482,18 @@ class HyFedServerProject:
 
         logger.debug(f'Project {self.project_id}: ## post-aggregate')
 
-        # clear the client-related dictionaries except monitoring parameters
-        self.client_operation_stats = dict()
-        self.client_steps = dict()
-        self.client_comm_rounds = dict()
-        self.local_parameters = dict()
-        self.compensator_flag = False
-        self.compensator_parameters = dict()
-        self.client_compensator_flags = dict()
+        # clear the client-related dictionaries except monitoring parameters, and accept the uploads of the next round
+        with self.round_lock:
+            self.client_operation_stats = dict()
+            self.client_steps = dict()
+            self.client_comm_rounds = dict()
+            self.local_parameters = dict()
+            self.clear_aggregated_parameters()
+            self.compensator_flag = False
+            self.compensator_parameters = dict()
+            self.client_compensator_flags = dict()
+            self.aggregation_started = False
+            self.reserved_client_uploads = set()
 
         # if project failed/aborted, mark the project for clean-up
         if self.status != ProjectStatus.AGGREGATING:
@@ -350,8 +508,12 @@ class HyFedServerProject:
         self.client_network_receive = self.compute_client_average_time(MonitoringParameter.NETWORK_RECEIVE_TIME)
         self.client_idle = self.compute_client_average_time(MonitoringParameter.IDLE_TIME)
 
-        # clear client monitoring parameters
+        # add the runtime and traffic statistics of this round to the per-round metrics
+        self.record_round_metrics()
+
+        # clear client monitoring parameters and upload times
         self.client_monitoring_parameters = dict()
+        self.client_upload_times = dict()
 
         # update average timer values and aggregation time in the database
         self.update_timer_model()
@@ -388,6 +550,10 @@ class HyFedServerProject:
 
         self.computation_timer.stop()
 
+        # checkpoint the project, so that the clients can resume from this round if the server restarts
+        if self.status == ProjectStatus.PARAMETERS_READY:
+            self.save_snapshot()
+
     def result_step(self):
         """
            FINISHED project status directs post_aggregate function to
@@ -397,6 +563,43 @@ class HyFedServerProject:
         self.set_step(HyFedProjectStep.FINISHED)
 
     def compute_aggregated_parameter(self, parameter_name, parameter_data_type):
+
+        # the fixed-point parameters are aggregated as the integers declared by the clients, and then decoded
+        fixed_point = self.fixed_point_parameters.get(parameter_name)
+        float32_parameter = is_float32(parameter_data_type)
+        if fixed_point is not None:
+            parameter_data_type = self.aggregated_parameter_data_types.get(parameter_name, parameter_data_type)
+
+        if self.streaming_aggregation:
+            aggregated_value = self.get_streamed_aggregated_parameter(parameter_name, parameter_data_type)
+        else:
+            aggregated_value = self.sum_local_parameters(parameter_name, parameter_data_type)
+
+        if fixed_point is None or aggregated_value is None:
+            return aggregated_value
+
+        try:
+            scale, ring = fixed_point
+            decoded_value = fixed_point_decode(aggregated_value, scale, ring)
+
+            # the float32 parameters (see FLOAT32_FIXED_POINT) are cast back to float32
+            if float32_parameter:
+                if isinstance(decoded_value, list):
+                    return [np.float32(decoded_array) for decoded_array in decoded_value]
+                return np.float32(decoded_value)
+
+            return decoded_value
+
+        except Exception as exp:
+            logger.error(f'Project {self.project_id}: {exp}')
+            return None
+
+    def sum_local_parameters(self, parameter_name, parameter_data_type):
+        """ Aggregate the local parameter values of the clients (and the aggregated noise from the compensator) """
+
+        if self.shared_pack is not None and parameter_name in self.shared_pack.index.keys():
+            return self.get_shared_aggregated_parameter(parameter_name)
+
         clients_parameters = []
         try:
             for username in self.client_tokens.keys():
@@ -416,7 +619,10 @@ class HyFedServerProject:
                 aggregated_value = aggregate_parameters([aggregated_noisy_parameters, aggregated_noise], parameter_data_type)
 
             else:
-                if parameter_data_type == DataType.NON_NEGATIVE_INTEGER or \
+                if is_sparse(parameter_data_type):
+                    aggregated_value = aggregate_parameters(clients_parameters, parameter_data_type)
+
+                elif parameter_data_type == DataType.NON_NEGATIVE_INTEGER or \
                    parameter_data_type == DataType.NEGATIVE_INTEGER or parameter_data_type == DataType.FLOAT:
                         aggregated_value = np.sum(clients_parameters)
 
@@ -429,6 +635,168 @@ class HyFedServerProject:
             logger.error(exp)
             return None
 
+    def get_streamed_aggregated_parameter(self, parameter_name, parameter_data_type):
+        """
+            Get the aggregated value of the parameter from the running sum of the streaming aggregation mode;
+            the sum already includes the aggregated noise from the compensator if the compensator is used
+        """
+
+        try:
+            # the values of all clients (and the compensator) must have been folded into the sum
+            expected_count = len(self.client_tokens) + (1 if self.compensator_flag else 0)
+            if self.aggregated_parameter_counts.get(parameter_name, 0) != expected_count:
+                logger.error(f'Project {self.project_id}: {self.aggregated_parameter_counts.get(parameter_name, 0)} '
+                             f'values folded into {parameter_name} instead of {expected_count}!')
+                return None
+
+            if self.aggregated_parameter_pack is not None and parameter_name in self.aggregated_parameter_pack.index.keys():
+                aggregated_value = self.aggregated_parameter_pack.get(parameter_name)
+            else:
+                aggregated_value = self.aggregated_parameters[parameter_name]
+
+            # modular arithmetic for non-negative integers masked by the compensator; the sum is only reduced
+            # once per block of values while folding, so reduce it here
+            if self.compensator_flag and is_non_negative_integer(parameter_data_type):
+                aggregated_value = modular_reduce(aggregated_value)
+
+            return aggregated_value
+
+        except Exception as exp:
+            logger.error(exp)
+            return None
+
+    def fold_local_parameters(self, local_parameters, data_type_parameters):
+        """ Fold the local parameter values of a client (or the compensator) into the running per-parameter sums """
+
+        with self.aggregation_lock:
+            # the packed parameters are folded with one addition per lane; the values that are not packed are
+            # folded one by one
+            if isinstance(local_parameters, ParameterPack):
+                self.fold_parameter_pack(local_parameters, data_type_parameters)
+                local_parameters = local_parameters.extras
+
+            for parameter_name, parameter_value in local_parameters.items():
+                if parameter_name in data_type_parameters.keys():
+                    self.aggregated_parameter_data_types[parameter_name] = data_type_parameters[parameter_name]
+
+                folded_count = self.aggregated_parameter_counts.get(parameter_name, 0)
+                self.aggregated_parameters[parameter_name] = accumulate_parameter(self.aggregated_parameters.get(parameter_name),
+                                                                                  parameter_value,
+                                                                                  self.aggregated_parameter_data_types.get(parameter_name),
+                                                                                  folded_count)
+                self.aggregated_parameter_counts[parameter_name] = folded_count + 1
+
+    def fold_parameter_pack(self, parameter_pack, data_type_parameters):
+        """
+            Fold the lane buffers of the packed local parameters into the running sums of the lane buffers;
+            all packs must have the same layout; MUST be called with the aggregation lock held
+        """
+
+        if self.aggregated_parameter_pack is None:
+            self.aggregated_parameter_pack = parameter_pack.copy()
+        elif not self.aggregated_parameter_pack.is_compatible(parameter_pack):
+            raise ValueError('The layouts of the packed local parameters do not match!')
+        else:
+            for lane, buffer in parameter_pack.buffers.items():
+                self.aggregated_parameter_pack.buffers[lane] = accumulate_parameter(self.aggregated_parameter_pack.buffers[lane],
+                                                                                    buffer,
+                                                                                    ParameterPack.get_lane_data_type(lane),
+                                                                                    self.aggregated_parameter_pack_count)
+        self.aggregated_parameter_pack_count += 1
+
+        for parameter_name in parameter_pack.index.keys():
+            if parameter_name in data_type_parameters.keys():
+                self.aggregated_parameter_data_types[parameter_name] = data_type_parameters[parameter_name]
+            self.aggregated_parameter_counts[parameter_name] = self.aggregated_parameter_pack_count
+
+    def share_parameter_pack(self, username, parameter_pack):
+        """ Copy the lane buffers of the packed local parameters of the client into its row of the shared lanes """
+
+        with self.aggregation_lock:
+            if self.shared_pack is None:
+                # a row per client, a row for the compensator, and a row for the sum
+                row_count = len(self.client_tokens) + 2
+                self.shared_pack = ParameterPack(dict(), parameter_pack.index, dict())
+                for lane, buffer in parameter_pack.buffers.items():
+                    self.shared_lanes[lane] = create_shared_array((row_count, buffer.size), buffer.dtype)
+
+            elif parameter_pack.index != self.shared_pack.index or \
+                    any(self.shared_lanes[lane][1].shape[1] != buffer.size for lane, buffer in parameter_pack.buffers.items()):
+                raise ValueError('The layouts of the packed local parameters do not match!')
+
+            row = self.shared_rows.setdefault(username, len(self.shared_rows))
+            shared_arrays = [(self.shared_lanes[lane][1], buffer) for lane, buffer in parameter_pack.buffers.items()]
+
+        for shared_array, buffer in shared_arrays:
+            shared_array[row] = buffer
+
+    def get_shared_aggregated_parameter(self, parameter_name):
+        """
+            Get the aggregated value of the parameter from the shared lanes; the rows of all lanes are summed once per
+            communication round, in a worker process if the aggregation executor has a process pool; the aggregation
+            lock is not held while the rows are summed, since the lanes are only summed by the aggregation of
+            the round, after the uploads of all clients have been shared
+        """
+
+        try:
+            with self.aggregation_lock:
+                sum_arguments = list()
+                if not self.shared_sum_ready:
+                    rows = list(self.shared_rows.values())
+                    for lane, (shared_memory, shared_array) in self.shared_lanes.items():
+                        sum_arguments.append((lane, shared_memory.name, shared_array.shape, shared_array.dtype.str,
+                                              ParameterPack.get_lane_data_type(lane), rows, shared_array.shape[0] - 1))
+
+            for lane, *lane_sum_arguments in sum_arguments:
+                if self.aggregation_executor is not None:
+                    self.aggregation_executor.run_in_process(sum_shared_rows, *lane_sum_arguments)
+                else:
+                    sum_shared_rows(*lane_sum_arguments)
+
+            with self.aggregation_lock:
+                if sum_arguments:
+                    for lane, (_, shared_array) in self.shared_lanes.items():
+                        self.shared_pack.buffers[lane] = shared_array[-1]
+                    self.shared_sum_ready = True
+
+                # copy the value, because the shared lanes are released at the end of the round
+                aggregated_value = self.shared_pack.get(parameter_name)
+
+            if isinstance(aggregated_value, list):
+                return [np.array(array) for array in aggregated_value]
+
+            return np.array(aggregated_value) if isinstance(aggregated_value, np.ndarray) else aggregated_value
+
+        except Exception as exp:
+            logger.error(f'Project {self.project_id}: {exp}')
+            return None
+
+    def release_shared_lanes(self):
+        """ Release the shared memory of the shared lanes; MUST be called with the aggregation lock held """
+
+        shared_memories = [shared_memory for shared_memory, _ in self.shared_lanes.values()]
+
+        # the numpy arrays on top of the shared memory must be deleted before it is released
+        self.shared_pack = None
+        self.shared_lanes = dict()
+        self.shared_rows = dict()
+        self.shared_sum_ready = False
+
+        for shared_memory in shared_memories:
+            release_shared_memory(shared_memory)
+
+    def clear_aggregated_parameters(self):
+        """ Clear the running sums of the streaming aggregation mode and the shared lanes of the process aggregation mode """
+
+        with self.aggregation_lock:
+            self.aggregated_parameters = dict()
+            self.aggregated_parameter_counts = dict()
+            self.aggregated_parameter_data_types = dict()
+            self.aggregated_parameter_pack = None
+            self.aggregated_parameter_pack_count = 0
+            self.fixed_point_parameters = dict()
+            self.release_shared_lanes()
+
     # ########## clean-up|failure|abort function(s)
     def clean_up_project(self):
         """
@@ -436,19 +804,26 @@ class HyFedServerProject:
         """
         # clear dictionaries
         self.global_parameters = dict()
+        self.previous_global_parameters = dict()
+        self.global_parameter_deltas = dict()
+        self.global_parameter_blobs = dict()
+        self.global_parameter_blob_hashes = dict()
         self.client_operation_stats = dict()
         self.client_steps = dict()
         self.client_comm_rounds = dict()
         self.client_monitoring_parameters = dict()
+        self.client_upload_times = dict()
         self.local_parameters = dict()
+        self.clear_aggregated_parameters()
         self.compensator_parameters = dict()
         self.client_compensator_flags = dict()
 
-        # wait for time_before_clean_up seconds before marking the project as clean-up
-        time.sleep(self.time_before_clean_up)
-
-        # the project will be removed from the pool
+        # the project will be removed from the pool after time_before_clean_up seconds by the clean-up reaper of
+        # the project pool, so that the aggregation thread is not blocked in the meantime
+        self.clean_up_time = time.time() + self.time_before_clean_up
         self.clean_up_flag = True
+        if self.clean_up_scheduler is not None:
+            self.clean_up_scheduler(self.project_id, self.clean_up_time)
 
         logger.debug(f'Project {self.project_id}: project marked for clean-up!')
 
@@ -466,43 +841,91 @@ class HyFedServerProject:
         self.set_status(ProjectStatus.ABORTED)
         self.update_project_model()
 
+    # ########## snapshot functions
+    def get_snapshot(self):
+        """
+            The coordination attributes and global parameters of the project, i.e. its snapshot_attributes;
+            raise ValueError if the project has an attribute that is neither a snapshot nor a transient attribute
+        """
+
+        unknown_attributes = vars(self).keys() - self.snapshot_attributes - self.transient_attributes.keys()
+        if unknown_attributes:
+            raise ValueError(f'Attributes {sorted(unknown_attributes)} are neither snapshot nor transient attributes!')
+
+        return {attribute_name: attribute_value for attribute_name, attribute_value in vars(self).items()
+                if attribute_name in self.snapshot_attributes}
+
+    def save_snapshot(self):
+        """ Append the snapshot of the project to its snapshot file; the project does NOT fail if saving failed """
+
+        if self.snapshot_store is None:
+            return
+
+        try:
+            # the uploads of the next round are recorded with the round lock held
+            with self.round_lock:
+                snapshot_record = self.snapshot_store.encode(type(self), self.get_snapshot())
+
+            self.snapshot_store.append(self.project_id, snapshot_record)
+
+            logger.debug(f'Project {self.project_id}: snapshot of round {self.comm_round} saved!')
+
+        except Exception as snapshot_exp:
+            logger.error(f'Project {self.project_id}: failed to save the snapshot: {snapshot_exp}')
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """ Re-create the project from its snapshot without touching the database; used to restore the project pool """
+
+        project = cls.__new__(cls)
+        for attribute_name, initial_value in cls.transient_attributes.items():
+            setattr(project, attribute_name, initial_value())
+        project.__dict__.update({attribute_name: attribute_value for attribute_name, attribute_value in snapshot.items()
+                                 if attribute_name in cls.snapshot_attributes})
+
+        logger.debug(f'Project {project.project_id}: restored from the snapshot of round {project.comm_round}!')
+
+        return project
+
     # ########## model update functions
     def update_project_model(self):
         """
-            Update status, step, and comm_round of the project model
+            Update status, step, and comm_round of the project model; the update is written behind (see ModelWriter),
+            except that the status transitions (e.g. to DONE/FAILED/ABORTED) are written right away, so that
+            the webapp sees them even if it is served by another server worker
         """
 
         try:
-            project_instance = HyFedProjectModel.objects.get(id=self.project_id)
-            project_instance.status = self.status
-            project_instance.step = self.step
-            project_instance.comm_round = self.comm_round
-            project_instance.save()
+            model_writer.update(HyFedProjectModel, self.project_id,
+                                status=self.status, step=self.step, comm_round=self.comm_round)
+
+            if self.status != self.written_status:
+                model_writer.flush()
+                self.written_status = self.status
 
             logger.debug(f'Project {self.project_id}: HyFedProject model updated!')
 
         except Exception as model_exception:
             logger.error(f'Project {self.project_id}: {model_exception}')
-            self.project_failed()
+
+            # the failed status itself could not be written
+            if self.status != ProjectStatus.FAILED:
+                self.project_failed()
 
     def update_timer_model(self):
         """ Update computation/network/idle/aggregation times in the database """
 
         try:
 
-            project_instance = HyFedProjectModel.objects.get(id=self.project_id)
-            timer_instance = TimerModel.objects.get(id=project_instance.timer.id)
-
-            timer_instance.client_computation = np.round(self.client_computation, 2)
-            timer_instance.client_network_send = np.round(self.client_network_send, 2)
-            timer_instance.client_network_receive = np.round(self.client_network_receive, 2)
-            timer_instance.client_idle = np.round(self.client_idle, 2)
-            timer_instance.compensator_computation = np.round(self.compensator_computation, 2)
-            timer_instance.compensator_network_send = np.round(self.compensator_network_send, 2)
-            timer_instance.server_computation = np.round(self.computation_timer.get_total_duration(), 2)
-            timer_instance.runtime_total = np.round(time.time() - self.start_time, 2)
-
-            timer_instance.save()
+            model_writer.update(TimerModel, self.timer_id,
+                                client_computation=np.round(self.client_computation, 2),
+                                client_network_send=np.round(self.client_network_send, 2),
+                                client_network_receive=np.round(self.client_network_receive, 2),
+                                client_idle=np.round(self.client_idle, 2),
+                                compensator_computation=np.round(self.compensator_computation, 2),
+                                compensator_network_send=np.round(self.compensator_network_send, 2),
+                                server_computation=np.round(self.computation_timer.get_total_duration(), 2),
+                                runtime_total=np.round(time.time() - self.start_time, 2))
 
             logger.debug(f'Project {self.project_id}: Timer model updated!')
 
@@ -515,21 +938,31 @@ class HyFedServerProject:
 
         try:
 
-            project_instance = HyFedProjectModel.objects.get(id=self.project_id)
-            traffic_instance = TrafficModel.objects.get(id=project_instance.traffic.id)
-
-            traffic_instance.client_server = self.client_server_traffic.get_total_count()
-            traffic_instance.server_client = self.server_client_traffic.get_total_count()
-            traffic_instance.compensator_server = self.compensator_server_traffic.get_total_count()
-            traffic_instance.client_compensator = self.client_compensator_traffic.get_total_count()
+            traffic_fields = dict()
+            traffic_fields['client_server'] = self.client_server_traffic.get_total_count()
+            traffic_fields['server_client'] = self.server_client_traffic.get_total_count()
+            traffic_fields['compensator_server'] = self.compensator_server_traffic.get_total_count()
+            traffic_fields['client_compensator'] = self.client_compensator_traffic.get_total_count()
 
             total_traffic = self.client_server_traffic.total_count + self.server_client_traffic.total_count + \
                             self.compensator_server_traffic.total_count + self.client_compensator_traffic.total_count
             total_traffic_counter = Counter("Total")
             total_traffic_counter.increment(total_traffic)
-            traffic_instance.traffic_total = total_traffic_counter.get_total_count()
+            traffic_fields['traffic_total'] = total_traffic_counter.get_total_count()
+
+            # traffic stats if the payloads had been sent without compression
+            traffic_fields['client_server_uncompressed'] = self.client_server_traffic.get_total_uncompressed_count()
+            traffic_fields['server_client_uncompressed'] = self.server_client_traffic.get_total_uncompressed_count()
+            traffic_fields['compensator_server_uncompressed'] = self.compensator_server_traffic.get_total_uncompressed_count()
+            traffic_fields['client_compensator_uncompressed'] = self.client_compensator_traffic.get_total_uncompressed_count()
 
-            traffic_instance.save()
+            total_uncompressed_traffic = self.client_server_traffic.total_uncompressed_count + \
+                                         self.server_client_traffic.total_uncompressed_count + \
+                                         self.compensator_server_traffic.total_uncompressed_count + \
+                                         self.client_compensator_traffic.total_uncompressed_count
+            traffic_fields['traffic_total_uncompressed'] = Counter.to_human_readable(total_uncompressed_traffic)
+
+            model_writer.update(TrafficModel, self.traffic_id, **traffic_fields)
 
             logger.debug(f'Project {self.project_id}: Traffic model updated!')
 
@@ -537,6 +970,97 @@ class HyFedServerProject:
             logger.error(f'Project {self.project_id}: {model_exception}')
             self.project_failed()
 
+    def record_round_metrics(self):
+        """
+            Insert the runtime and traffic statistics of this round, i.e. the increase of the cumulative statistics
+            since the previous round, in the round metrics (written behind with bulk_create, see ModelWriter)
+        """
+
+        try:
+            current_time = time.time()
+
+            # cumulative statistics; the traffic in bytes
+            metric_totals = {'client_computation': self.client_computation,
+                             'client_network_send': self.client_network_send,
+                             'client_network_receive': self.client_network_receive,
+                             'client_idle': self.client_idle,
+                             'compensator_computation': self.compensator_computation,
+                             'compensator_network_send': self.compensator_network_send,
+                             'client_server': self.client_server_traffic.total_count,
+                             'server_client': self.server_client_traffic.total_count,
+                             'client_compensator': self.client_compensator_traffic.total_count,
+                             'compensator_server': self.compensator_server_traffic.total_count,
+                             'client_server_uncompressed': self.client_server_traffic.total_uncompressed_count,
+                             'server_client_uncompressed': self.server_client_traffic.total_uncompressed_count,
+                             'client_compensator_uncompressed': self.client_compensator_traffic.total_uncompressed_count,
+                             'compensator_server_uncompressed': self.compensator_server_traffic.total_uncompressed_count}
+
+            round_metrics = dict()
+            for metric_name, metric_total in metric_totals.items():
+                round_metric = metric_total - self.round_metric_totals.get(metric_name, 0)
+                round_metrics[metric_name] = int(round_metric) if isinstance(round_metric, (int, np.integer)) \
+                    else np.round(float(round_metric), 4)
+
+            # the previous round ended when it was aggregated; the first round starts when all clients clicked on Run
+            round_start_time = self.round_end_time or self.start_time
+            round_duration = current_time - round_start_time if round_start_time else 0.0
+
+            # the aggregation timer is still running
+            server_aggregation = self.computation_timer.this_round_duration
+            if self.computation_timer.in_progress:
+                server_aggregation += current_time - self.computation_timer.start_time
+
+            model_writer.create(RoundMetricsModel(project_id=self.project_id,
+                                                  comm_round=self.comm_round,
+                                                  step=self.step,
+                                                  client_count=len(self.client_monitoring_parameters),
+                                                  round_duration=np.round(round_duration, 4),
+                                                  server_aggregation=np.round(server_aggregation, 4),
+                                                  **round_metrics))
+
+            self.record_client_round_metrics(round_start_time)
+
+            self.round_metric_totals = metric_totals
+            self.round_end_time = current_time
+
+            logger.debug(f'Project {self.project_id}: round metrics recorded!')
+
+        except Exception as metrics_exp:
+            logger.error(f'Project {self.project_id}: failed to record the round metrics: {metrics_exp}')
+
+    def record_client_round_metrics(self, round_start_time):
+        """
+            Insert the times of each client in this round, i.e. the increase of its monitoring timers since
+            the previous round, as well as the order and delay (since round_start_time) of its upload
+        """
+
+        timer_names = {'computation': MonitoringParameter.COMPUTATION_TIME,
+                       'network_send': MonitoringParameter.NETWORK_SEND_TIME,
+                       'network_receive': MonitoringParameter.NETWORK_RECEIVE_TIME,
+                       'idle': MonitoringParameter.IDLE_TIME}
+
+        # python dictionaries keep the insertion order, i.e. the order of the uploads
+        for upload_order, (username, upload_time) in enumerate(self.client_upload_times.items(), start=1):
+            monitoring_parameters = self.client_monitoring_parameters.get(username, dict())
+            previous_totals = self.client_timer_totals.get(username, dict())
+
+            client_times = dict()
+            for metric_name, timer_name in timer_names.items():
+                client_times[metric_name] = np.round(float(monitoring_parameters.get(timer_name, 0.0)) -
+                                                     previous_totals.get(timer_name, 0.0), 4)
+
+            upload_delay = upload_time - round_start_time if round_start_time else 0.0
+
+            model_writer.create(ClientRoundMetricsModel(project_id=self.project_id,
+                                                        comm_round=self.comm_round,
+                                                        username=username,
+                                                        upload_order=upload_order,
+                                                        upload_delay=np.round(upload_delay, 4),
+                                                        **client_times))
+
+            self.client_timer_totals[username] = {timer_name: float(monitoring_parameters.get(timer_name, 0.0))
+                                                  for timer_name in timer_names.values()}
+
     # ########## result preparation function(s)
     def create_result_dir(self):
         """
@@ -557,6 +1081,104 @@ class HyFedServerProject:
         return result_base_dir
 
     # ########## Helper functions
+    def add_client_upload(self, username, request_body):
+        """
+            Record the parameters of the client from the request body; return whether the upload was accepted and
+            whether the aggregation can start (see is_aggregation_ready), which is True for exactly one upload per
+            round; the round lock is only held to reserve the upload of the client and to count it after its
+            parameters have been extracted (and folded, under the aggregation lock), so that the uploads of
+            the clients are folded concurrently; a repeated upload of the client in the same round is accepted but
+            ignored, and the uploads received after the aggregation started are rejected
+        """
+
+        with self.round_lock:
+            if username in self.reserved_client_uploads:
+                logger.debug(f'Project {self.project_id}: client {username} parameters ignored because '
+                             f'they have been already received!')
+                return True, False
+
+            if self.aggregation_started:
+                logger.debug(f'Project {self.project_id}: client {username} parameters rejected because '
+                               f'the aggregation has already started!')
+                return False, False
+
+            self.reserved_client_uploads.add(username)
+
+        self.extract_client_parameters(username, request_body)
+
+        with self.round_lock:
+            self.client_upload_times[username] = time.time()
+
+            if self.is_aggregation_ready():
+                self.aggregation_started = True
+                return True, True
+
+            # to inform clients and coordinator that server is waiting for compensator, which must upload its
+            # parameters within compensator_timeout seconds
+            waiting_for_compensator = self.is_client_parameters_received()
+            if waiting_for_compensator:
+                self.set_status(ProjectStatus.WAITING_FOR_COMPENSATOR)
+
+        if waiting_for_compensator:
+            self.update_project_model()
+            if self.aggregation_executor is not None:
+                self.aggregation_executor.schedule(self.compensator_timeout, self.project_id,
+                                                   self.compensator_timed_out, self.comm_round)
+
+        return True, False
+
+    def add_compensator_upload(self, compensator_parameters):
+        """ Set the compensator parameters unless they have already been received; return whether they were set """
+
+        with self.round_lock:
+            if self.is_compensator_parameters_received():
+                return False
+
+            self.set_compensator_parameters(compensator_parameters)
+            return True
+
+    def claim_aggregation(self):
+        """
+            Return True if the aggregation can start (see is_aggregation_ready), which happens exactly once per
+            communication round, so that only one of the client and compensator uploads starts the aggregation
+        """
+
+        with self.round_lock:
+            if not self.is_aggregation_ready():
+                return False
+
+            self.aggregation_started = True
+            return True
+
+    def is_aggregation_ready(self):
+        """
+            Check whether the aggregation has not started yet and the parameters of all clients, and of the compensator
+            if the clients use it, have been received; the round lock must be held
+        """
+
+        if self.aggregation_started or not self.is_client_parameters_received():
+            return False
+
+        # the clients disagreeing on the compensator flag fail the sync check of pre_aggregate right away
+        if all(self.client_compensator_flags.values()) and not self.is_compensator_parameters_received():
+            return False
+
+        return True
+
+    def compensator_timed_out(self, comm_round):
+        """
+            Aggregate (and fail) the communication round if the compensator parameters have not been received within
+            compensator_timeout seconds; scheduled on the aggregation executor when the last client uploaded
+        """
+
+        with self.round_lock:
+            if self.comm_round != comm_round or self.aggregation_started:
+                return
+
+            self.aggregation_started = True
+
+        self.aggregate()
+
     def extract_client_parameters(self, username, request_body):
         """
             Extract the sync, monitoring, and local parameters of the clients from the request body;
@@ -576,8 +1198,10 @@ class HyFedServerProject:
             # monitoring parameters of the clients containing timer values
             monitoring_parameters = request_body[Parameter.MONITORING]
 
-            # local parameters
+            # local parameters and the data types of the masked ones
             local_parameters = request_body[Parameter.LOCAL]
+            data_type_parameters = request_body[Parameter.DATA_TYPE]
+            fixed_point_parameters = request_body.get(Parameter.FIXED_POINT, dict())
 
             logger.debug(f'Project {self.project_id}: client {username} parameters extracted from the request!')
 
@@ -592,7 +1216,8 @@ class HyFedServerProject:
         self.add_client_comm_round(username, client_comm_round)
         self.add_client_compensator_flag(username, client_compensator_flag)
         self.add_client_monitoring_parameter(username, monitoring_parameters)
-        self.add_local_parameter(username, local_parameters)
+        self.add_fixed_point_parameter(fixed_point_parameters)
+        self.add_local_parameter(username, local_parameters, data_type_parameters)
 
     def compute_client_average_time(self, timer_name):
         try:
@@ -607,26 +1232,34 @@ class HyFedServerProject:
             self.project_failed()
             return -1
 
-    def add_to_client_server_traffic(self, traffic_size):
+    def add_to_client_server_traffic(self, traffic_size, uncompressed_traffic_size=None):
         """ Update the client -> server traffic counter """
 
-        self.client_server_traffic.increment(traffic_size)
+        self.client_server_traffic.increment(traffic_size, uncompressed_traffic_size)
         logger.debug(f'Project {self.project_id}: {traffic_size} bytes added to client -> server traffic.')
 
-    def add_to_server_client_traffic(self, traffic_size):
+    def add_to_server_client_traffic(self, traffic_size, uncompressed_traffic_size=None):
         """ Update the server -> client traffic counter """
 
-        self.server_client_traffic.increment(traffic_size)
+        self.server_client_traffic.increment(traffic_size, uncompressed_traffic_size)
         logger.debug(f'Project {self.project_id}: {traffic_size} bytes added to server -> client traffic.')
 
-    def add_to_compensator_server_traffic(self, traffic_size):
+    def add_to_compensator_server_traffic(self, traffic_size, uncompressed_traffic_size=None):
         """ Update the compensator -> server traffic counter """
 
-        self.compensator_server_traffic.increment(traffic_size)
+        self.compensator_server_traffic.increment(traffic_size, uncompressed_traffic_size)
         logger.debug(f'Project {self.project_id}: {traffic_size} bytes added to compensator -> server traffic.')
 
-    def prepare_client_parameters(self, client_username, client_comm_round):
-        """ Prepare the parameters shared with the clients """
+    def prepare_client_parameters(self, client_username, client_comm_round, client_compressions=None,
+                                  client_global_parameters_round=None):
+        """
+            Prepare the parameters shared with the clients;
+            the payload is compressed with the preferred algorithm supported by both the server and client;
+            if the client holds the global parameters of the previous round (client_global_parameters_round),
+            the global parameters are sent as delta against them wherever the delta is cheaper;
+            client agnostic global parameters are not included in the payload but their content hash, with which
+            the client fetches them from the (cacheable) global parameters endpoint
+        """
         try:
 
             # the number of participants who clicked on the 'Run' button is the same as the number of times the
@@ -645,24 +1278,136 @@ class HyFedServerProject:
             coordination_parameters[CoordinationParameter.PROJECT_STATUS] = self.status
             coordination_parameters[CoordinationParameter.PROJECT_STEP] = self.step
             coordination_parameters[CoordinationParameter.COMM_ROUND] = self.comm_round
+            coordination_parameters[CoordinationParameter.COMPRESSION] = codec.available_compressions()
+
+            compression = codec.negotiate_compression(client_compressions)
 
             # based on client_comm_round decide whether global parameters already shared by the client
+            global_parameters = dict()
+            global_parameter_deltas = dict()
             if client_comm_round != self.comm_round:
+
+                # the delta is only worth sending if the payload is compressed
+                delta_flag = client_global_parameters_round == self.previous_global_parameters_round and \
+                    compression != codec.Compression.NONE
+                if delta_flag:
+                    coordination_parameters[CoordinationParameter.GLOBAL_BASE_ROUND] = self.previous_global_parameters_round
+
                 if self.is_global_parameters_client_agnostic():
-                    global_parameters = self.global_parameters
+                    blob_hash = self.get_global_parameters_blob_hash(compression, delta_flag)
+                    coordination_parameters[CoordinationParameter.GLOBAL_PARAMETERS_HASH] = blob_hash
+                    coordination_parameters[CoordinationParameter.GLOBAL_PARAMETERS_CAPABILITY] = \
+                        global_parameters_capability(self.project_id, blob_hash)
+                elif delta_flag:
+                    global_parameters, global_parameter_deltas = self.get_global_parameter_deltas(client_username)
                 else:
                     global_parameters = self.global_parameters[client_username]
-            else:
-                global_parameters = dict()
 
-            parameters_json = {Parameter.COORDINATION: coordination_parameters, Parameter.GLOBAL: global_parameters}
-            parameters_serialized = pickle.dumps(parameters_json)
+            parameters_json = {Parameter.COORDINATION: coordination_parameters,
+                               Parameter.GLOBAL: ParameterPack.pack(global_parameters),
+                               Parameter.GLOBAL_DELTA: global_parameter_deltas}
+            parameters_serialized = codec.encode(parameters_json, compression, self.compression_level)
 
             return parameters_serialized
         except Exception as prep_exp:
             logger.error(f'Project {self.project_id}: {prep_exp}')
             self.project_failed()
 
+    def get_global_parameters_blob_hash(self, compression, delta_flag):
+        """
+            Serialize the client agnostic global parameters (as delta against the previous round if delta_flag is True)
+            once per communication round, compression, and delta flag, and return the content hash of the blob
+        """
+
+        blob_key = (compression, delta_flag)
+        if blob_key in self.global_parameter_blob_hashes.keys():
+            return self.global_parameter_blob_hashes[blob_key]
+
+        if delta_flag:
+            global_parameters, global_parameter_deltas = self.get_global_parameter_deltas(client_username=None)
+        else:
+            global_parameters, global_parameter_deltas = self.global_parameters, dict()
+
+        blob_json = {Parameter.GLOBAL: ParameterPack.pack(global_parameters), Parameter.GLOBAL_DELTA: global_parameter_deltas}
+        blob = codec.encode(blob_json, compression, self.compression_level)
+        blob_hash = hashlib.sha256(blob).hexdigest()
+
+        self.global_parameter_blobs[blob_hash] = blob
+        self.global_parameter_blob_hashes[blob_key] = blob_hash
+
+        logger.debug(f'Project {self.project_id}: global parameters serialized into blob {blob_hash} ({len(blob)} bytes)')
+
+        return blob_hash
+
+    def get_global_parameter_deltas(self, client_username):
+        """
+            Split the global parameters of the client into those sent as they are and those sent as delta against
+            the global parameters of the previous round; computed once per round and client (or once per round
+            if the global parameters are client agnostic)
+        """
+
+        delta_key = None if self.is_global_parameters_client_agnostic() else client_username
+        if delta_key in self.global_parameter_deltas.keys():
+            return self.global_parameter_deltas[delta_key]
+
+        if self.is_global_parameters_client_agnostic():
+            global_parameters = self.global_parameters
+            previous_global_parameters = self.previous_global_parameters
+        else:
+            global_parameters = self.global_parameters[client_username]
+            previous_global_parameters = self.previous_global_parameters.get(client_username, dict())
+
+        full_parameters = dict()
+        delta_parameters = dict()
+        for parameter_name, parameter_value in global_parameters.items():
+            delta = None
+            if parameter_name in previous_global_parameters.keys():
+                delta = delta_encode(parameter_value, previous_global_parameters[parameter_name])
+
+            if delta is None:
+                full_parameters[parameter_name] = parameter_value
+            else:
+                delta_parameters[parameter_name] = delta
+
+        self.global_parameter_deltas[delta_key] = (full_parameters, delta_parameters)
+
+        return full_parameters, delta_parameters
+
+    # ########## long polling functions
+    def wait_for_comm_round_change(self, client_comm_round, timeout):
+        """
+            Block until the communication round of the project is different from client_comm_round (i.e. the global
+            parameters are ready for the client) or the project is failed/aborted, or timeout seconds (capped by
+            max_long_poll_timeout) elapsed
+        """
+
+        timeout = min(timeout, self.max_long_poll_timeout)
+        if timeout <= 0:
+            return
+
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: self.comm_round != client_comm_round or
+                                          self.status in (ProjectStatus.FAILED, ProjectStatus.ABORTED),
+                                          timeout=timeout)
+
+    def wait_for_project_event(self, project_status, comm_round, timeout):
+        """
+            Block until the status or communication round of the project is different from project_status or
+            comm_round, or timeout seconds elapsed; return the current status and communication round of the project
+        """
+
+        with self.round_condition:
+            self.round_condition.wait_for(lambda: self.status != project_status or self.comm_round != comm_round,
+                                          timeout=timeout)
+
+            return self.status, self.comm_round
+
+    def notify_round_waiters(self):
+        """ Wake up the requests waiting for the communication round or status of the project to change """
+
+        with self.round_condition:
+            self.round_condition.notify_all()
+
     # ########## setter functions
     # def set_global_parameters(self, parameter_name, parameter_value):
     #     self.global_parameters[parameter_name] = parameter_value
@@ -670,6 +1415,7 @@ class HyFedServerProject:
     def set_status(self, status):
         self.status = status
         logger.debug(f'Project {self.project_id}: project status set to {status}')
+        self.notify_round_waiters()
 
     def set_step(self, step):
         self.step = step
@@ -678,6 +1424,7 @@ class HyFedServerProject:
     def increment_comm_round(self):
         self.comm_round += 1
         logger.debug(f'Project {self.project_id}: communication round incremented to {self.comm_round+1}!')
+        self.notify_round_waiters()
 
     def set_client_tokens(self, tokens):
         self.client_tokens = copy.deepcopy(tokens)
@@ -717,8 +1464,10 @@ class HyFedServerProject:
         self.compensator_network_send = self.compensator_parameters[Parameter.MONITORING][MonitoringParameter.NETWORK_SEND_TIME]
 
         client_compensator_traffic = self.compensator_parameters[Parameter.MONITORING][MonitoringParameter.CLIENT_COMPENSATOR_TRAFFIC]
+        client_compensator_traffic_uncompressed = \
+            self.compensator_parameters[Parameter.MONITORING][MonitoringParameter.CLIENT_COMPENSATOR_TRAFFIC_UNCOMPRESSED]
         self.client_compensator_traffic = Counter("Client->Compensator")
-        self.client_compensator_traffic.increment(client_compensator_traffic)
+        self.client_compensator_traffic.increment(client_compensator_traffic, client_compensator_traffic_uncompressed)
 
     def add_compensation_parameters(self):
         """ Add compensation parameters (similar to local parameters) to self.local_parameters to be considered in aggregation"""
@@ -748,10 +1497,65 @@ class HyFedServerProject:
         logger.debug(f'Project {self.project_id}: adding client {username} monitoring parameters ...')
         self.client_monitoring_parameters[username] = client_monitoring_parameter
 
-    def add_local_parameter(self, username, local_parameter):
+    def add_local_parameter(self, username, local_parameter, data_type_parameter=None):
         logger.debug(f'Project {self.project_id}: adding client {username} local parameters ...')
+
+        # in the streaming aggregation mode, only record that the client's values are folded into the sums
+        if self.streaming_aggregation:
+            self.fold_local_parameters(local_parameter, data_type_parameter or dict())
+            self.local_parameters[username] = dict()
+            return
+
+        # the packed local parameters are unpacked into views of the lane buffers; in the process aggregation mode,
+        # the lane buffers are copied into the shared lanes, and only the values that are not packed are kept
+        if isinstance(local_parameter, ParameterPack):
+            if self.process_aggregation:
+                self.share_parameter_pack(username, local_parameter)
+                local_parameter = local_parameter.extras
+            else:
+                local_parameter = local_parameter.unpack()
+
+        # the data types of the fixed-point parameters are only declared by the clients
+        with self.aggregation_lock:
+            for parameter_name in self.fixed_point_parameters.keys() & (data_type_parameter or dict()).keys():
+                self.aggregated_parameter_data_types[parameter_name] = data_type_parameter[parameter_name]
+
         self.local_parameters[username] = local_parameter
 
+    def add_fixed_point_parameter(self, fixed_point_parameter):
+        with self.aggregation_lock:
+            for parameter_name, (scale, ring) in fixed_point_parameter.items():
+                self.fixed_point_parameters[parameter_name] = (scale, ring)
+
+    def set_streaming_aggregation(self, streaming_aggregation):
+        logger.debug(f'Project {self.project_id}: setting streaming_aggregation to {streaming_aggregation} ...')
+        self.streaming_aggregation = streaming_aggregation
+
+    def set_process_aggregation(self, process_aggregation):
+        logger.debug(f'Project {self.project_id}: setting process_aggregation to {process_aggregation} ...')
+        self.process_aggregation = process_aggregation
+
+    def set_aggregation_executor(self, aggregation_executor):
+        self.aggregation_executor = aggregation_executor
+
+    def set_compression_level(self, compression_level):
+        logger.debug(f'Project {self.project_id}: setting compression_level to {compression_level} ...')
+        self.compression_level = compression_level
+
+    def set_max_long_poll_timeout(self, max_long_poll_timeout):
+        logger.debug(f'Project {self.project_id}: setting max_long_poll_timeout to {max_long_poll_timeout} ...')
+        self.max_long_poll_timeout = max_long_poll_timeout
+
+    def set_clean_up_scheduler(self, clean_up_scheduler):
+        self.clean_up_scheduler = clean_up_scheduler
+
+    def set_snapshot_store(self, snapshot_store):
+        self.snapshot_store = snapshot_store
+
+    def set_compensator_timeout(self, compensator_timeout):
+        logger.debug(f'Project {self.project_id}: setting compensator_timeout to {compensator_timeout} ...')
+        self.compensator_timeout = compensator_timeout
+
     def set_time_before_clean_up(self, time_before_clean_up):
         logger.debug(f'Project {self.project_id}: setting time_before_clean_up to {time_before_clean_up} ...')
         self.time_before_clean_up = time_before_clean_up
@@ -772,6 +1576,11 @@ class HyFedServerProject:
     def get_global_parameters(self):
         return self.global_parameters
 
+    def get_global_parameters_blob(self, blob_hash):
+        """ Get the serialized global parameters with the content hash blob_hash (None if no such blob exists) """
+
+        return self.global_parameter_blobs.get(blob_hash)
+
     def get_local_parameters(self):
         return self.local_parameters
 
@@ -800,7 +1609,10 @@ class HyFedServerProject:
         return self.global_parameters_client_agnostic
 
     def clean_me_up(self):
-        return self.clean_up_flag
+        return self.clean_up_flag and time.time() >= self.clean_up_time
 
     def is_compensator_parameters_received(self):
         return bool(self.compensator_parameters)
+
+    def is_client_parameters_received(self):
+        return len(self.local_parameters) == len(self.client_tokens)
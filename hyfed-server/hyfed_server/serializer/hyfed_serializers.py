@@ -19,7 +19,8 @@
 
 from rest_framework import serializers
 from hyfed_server.models import UserModel
-from hyfed_server.model.hyfed_models import TokenModel, HyFedProjectModel, TimerModel, TrafficModel
+from hyfed_server.model.hyfed_models import TokenModel, HyFedProjectModel, TimerModel, TrafficModel, RoundMetricsModel, \
+    ClientRoundMetricsModel
 
 
 # ############### Serializer classes to serve WEBAPP requests ####################
@@ -73,6 +74,13 @@ class HyFedProjectSerializer(serializers.ModelSerializer):
     compensator_server = serializers.SerializerMethodField()
     traffic_total = serializers.SerializerMethodField()
 
+    # traffic stats if the payloads had been sent without compression
+    client_server_uncompressed = serializers.SerializerMethodField()
+    server_client_uncompressed = serializers.SerializerMethodField()
+    client_compensator_uncompressed = serializers.SerializerMethodField()
+    compensator_server_uncompressed = serializers.SerializerMethodField()
+    traffic_total_uncompressed = serializers.SerializerMethodField()
+
     def get_id(self, instance):
         """ Convert id from UUID type to string """
         return str(instance.id)
@@ -138,12 +146,29 @@ class HyFedProjectSerializer(serializers.ModelSerializer):
     def get_traffic_total(self, instance):
         return instance.traffic.traffic_total
 
+    def get_client_server_uncompressed(self, instance):
+        return instance.traffic.client_server_uncompressed
+
+    def get_server_client_uncompressed(self, instance):
+        return instance.traffic.server_client_uncompressed
+
+    def get_client_compensator_uncompressed(self, instance):
+        return instance.traffic.client_compensator_uncompressed
+
+    def get_compensator_server_uncompressed(self, instance):
+        return instance.traffic.compensator_server_uncompressed
+
+    def get_traffic_total_uncompressed(self, instance):
+        return instance.traffic.traffic_total_uncompressed
+
     class Meta:
         model = HyFedProjectModel
         fields = ('id', 'coordinator', 'tool', 'algorithm', 'name', 'description', 'status', 'step', 'comm_round',
                   'roles', 'created_at', 'client_computation', 'client_network_send', 'client_network_receive', 'client_idle',
                   'compensator_computation', 'compensator_network_send', 'server_computation', 'runtime_total',
-                  'client_server', 'server_client', 'client_compensator', 'compensator_server', 'traffic_total')
+                  'client_server', 'server_client', 'client_compensator', 'compensator_server', 'traffic_total',
+                  'client_server_uncompressed', 'server_client_uncompressed', 'client_compensator_uncompressed',
+                  'compensator_server_uncompressed', 'traffic_total_uncompressed')
 
         read_only_fields = ('id', 'created_at',)
 
@@ -192,3 +217,28 @@ class TrafficSerializer(serializers.ModelSerializer):
     class Meta:
         model = TrafficModel
         fields = ('id', 'client_server', 'server_client')
+
+
+class RoundMetricsSerializer(serializers.ModelSerializer):
+    """
+        Serializes the per-round runtime (in seconds) and traffic (in bytes) statistics of the project
+    """
+
+    class Meta:
+        model = RoundMetricsModel
+        fields = ('comm_round', 'step', 'client_count', 'round_duration', 'client_computation', 'client_network_send',
+                  'client_network_receive', 'client_idle', 'compensator_computation', 'compensator_network_send',
+                  'server_aggregation', 'client_server', 'server_client', 'client_compensator', 'compensator_server',
+                  'client_server_uncompressed', 'server_client_uncompressed', 'client_compensator_uncompressed',
+                  'compensator_server_uncompressed', 'created_at')
+
+
+class ClientRoundMetricsSerializer(serializers.ModelSerializer):
+    """
+        Serializes the per-client per-round runtime statistics (in seconds) of the project
+    """
+
+    class Meta:
+        model = ClientRoundMetricsModel
+        fields = ('comm_round', 'username', 'upload_order', 'upload_delay', 'computation', 'network_send',
+                  'network_receive', 'idle')
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 import logging.config
+import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -61,6 +62,7 @@ MIDDLEWARE = [
 
     'corsheaders.middleware.CorsMiddleware',
     'hyfed_server.middleware.jwt_token_middleware',
+    'hyfed_server.middleware.shard_routing_middleware',
 
 ]
 
@@ -176,6 +178,42 @@ SIMPLE_JWT = {
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5368709120
 
+# maximum size (in bytes) of a decoded (decompressed) request body; a compressed body is never decompressed beyond it
+CODEC_MAX_BODY_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
+
+# aggregation executor: number of the threads running the aggregation tasks (None: based on the CPU count), and
+# number of the processes to which the CPU-heavy aggregation functions are offloaded (0: no process pool);
+# an aggregation waiting for the compensator parameters holds its thread, so leave room for the waiting projects
+AGGREGATION_THREAD_COUNT = None
+AGGREGATION_PROCESS_COUNT = 0
+
+# multi-worker deployment: the base URLs of the server worker processes (shards), each owning the projects created on
+# it; the requests of a project received by another worker are forwarded to the owner (see ShardRouter);
+# the index of this worker in SHARD_URLS is taken from the HYFED_SHARD_INDEX environment variable;
+# single-process deployment if SHARD_URLS has at most one URL
+SHARD_URLS = []
+SHARD_INDEX = int(os.environ.get('HYFED_SHARD_INDEX', 0))
+SHARD_FORWARD_TIMEOUT = None  # in seconds; None because the event channels of the clients are long-lived (see below)
+
+# project event channel (see ProjectEventsView): while open, each channel holds one server worker thread (two if the
+# request is forwarded to another shard), so the WSGI server needs at least (clients per project) x (running projects)
+# threads (twice that with shards) on top of those serving the other requests; disabled by default, in which case
+# the clients poll the server; an open channel is closed by the server after PROJECT_EVENTS_MAX_HEARTBEATS heartbeat
+# periods (15 seconds each) and re-opened by the client, so that the threads are not held for the whole project
+PROJECT_EVENTS_ENABLED = False
+PROJECT_EVENTS_MAX_HEARTBEATS = 20
+
+# snapshots of the projects: the coordination attributes and global parameters (never the local parameters) of each
+# project are appended to its snapshot file after each communication round, and the projects are restored from
+# the snapshot files when the server (worker) restarts; None disables the snapshots; the snapshot file of a project
+# is compacted to its last snapshot after PROJECT_SNAPSHOT_COMPACTION_RECORDS snapshots
+PROJECT_SNAPSHOT_DIR = BASE_DIR / 'hyfed_server' / 'snapshot' / f'shard-{SHARD_INDEX}'
+PROJECT_SNAPSHOT_COMPACTION_RECORDS = 16
+
+# the project, timer, and traffic model updates of the projects are coalesced and written to the database in
+# the background every MODEL_WRITE_BEHIND_INTERVAL milliseconds (see ModelWriter); 0 writes them synchronously
+MODEL_WRITE_BEHIND_INTERVAL = 200
+
 # logging configuration
 LOG_LEVEL = 'DEBUG'
 logging.config.dictConfig({
@@ -24,9 +24,11 @@ from django.conf.urls import url
 from rest_framework_simplejwt.views import TokenVerifyView, TokenRefreshView, TokenObtainPairView
 from rest_framework import routers
 
-from hyfed_server.view.hyfed_views import SignupView, TokenBlacklistView, UserInfo, UserViewSet, ProjectViewSet, TokenViewSet
-from hyfed_server.view.hyfed_views import ProjectJoinView, ProjectInfoView, ProjectStartedView, \
-    ModelAggregationView, GlobalModelView, ResultDownloadView, ProjectAuthenticationView, ModelCompensationView
+from hyfed_server.view.hyfed_views import SignupView, TokenBlacklistView, UserInfo, UserViewSet, ProjectViewSet, TokenViewSet, \
+    ProjectPoolMetricsView, AggregationMetricsView, ModelWriterMetricsView
+from hyfed_server.view.hyfed_views import ProjectJoinView, ProjectInfoView, ProjectStartedView, ProjectEventsView, \
+    ModelAggregationView, GlobalModelView, GlobalParametersView, ResultDownloadView, ProjectAuthenticationView, \
+    ModelCompensationView
 from hyfed_server.model.hyfed_models import TokenModel, HyFedProjectModel
 from hyfed_server.util.endpoint import EndPoint
 
@@ -45,6 +47,9 @@ urlpatterns = [  # generated by Django 3.1.7.
     url(r'^auth/token/refresh/$', TokenRefreshView.as_view()),
     url(r'^auth/token/verify/$', TokenVerifyView.as_view()),
     url(r'^user/info/', UserInfo.as_view()),
+    url(r'^metrics/project-pool/', ProjectPoolMetricsView.as_view()),
+    url(r'^metrics/aggregation/', AggregationMetricsView.as_view()),
+    url(r'^metrics/model-writer/', ModelWriterMetricsView.as_view()),
 
     # webapp-server communication: project/token creation/list
     url(r'^', include(router.urls)),
@@ -55,7 +60,10 @@ urlpatterns = [  # generated by Django 3.1.7.
     url(r'^' + EndPoint.PROJECT_STARTED, ProjectStartedView.as_view()),
     url(r'^' + EndPoint.MODEL_AGGREGATION, ModelAggregationView.as_view()),
     url(r'^' + EndPoint.GLOBAL_MODEL, GlobalModelView.as_view()),
+    url(r'^' + EndPoint.GLOBAL_PARAMETERS + r'(?P<project_id>[^/]+)/(?P<blob_hash>[0-9a-f]{64})/(?P<capability>[0-9a-f]{64})/$',
+        GlobalParametersView.as_view()),
     url(r'^' + EndPoint.RESULT_DOWNLOAD, ResultDownloadView.as_view()),
+    url(r'^' + EndPoint.PROJECT_EVENTS, ProjectEventsView.as_view()),
 
     # compensator-server communication
     url(r'^' + EndPoint.PROJECT_AUTHENTICATION, ProjectAuthenticationView.as_view()),
@@ -29,4 +29,25 @@ class DataType:
 
     LIST_NUMPY_ARRAY_NON_NEGATIVE_INTEGER = 7
     LIST_NUMPY_ARRAY_NEGATIVE_INTEGER = 8
-    LIST_NUMPY_ARRAY_FLOAT = 9
\ No newline at end of file
+    LIST_NUMPY_ARRAY_FLOAT = 9
+
+    # integers (of any sign) masked with uniform 64-bit noise and aggregated modulo 2^64 using the native int64
+    # wrap-around; exact as long as the aggregated value fits in int64, and no modular reduction is needed
+    WRAPAROUND_INTEGER = 10
+    NUMPY_ARRAY_WRAPAROUND_INTEGER = 11
+    LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER = 12
+    # 32-bit variants that keep their numpy dtype end to end (noise, encoding, and aggregation), so that
+    # float32/int32 parameters are not upcast to 64 bits: real values masked with float32 Gaussian noise, and
+    # integers masked with uniform 32-bit noise and aggregated modulo 2^32 using the native int32 wrap-around
+    FLOAT32 = 13
+    NUMPY_ARRAY_FLOAT32 = 14
+    LIST_NUMPY_ARRAY_FLOAT32 = 15
+
+    WRAPAROUND_INTEGER32 = 16
+    NUMPY_ARRAY_WRAPAROUND_INTEGER32 = 17
+    LIST_NUMPY_ARRAY_WRAPAROUND_INTEGER32 = 18
+
+    # sparse arrays (see SparseArray), sent as their non-zero elements and summed without densifying them;
+    # only for the parameters that are NOT masked, i.e. when the compensator is not used
+    SPARSE_ARRAY = 19
+    LIST_SPARSE_ARRAY = 20
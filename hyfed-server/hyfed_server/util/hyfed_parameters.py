@@ -21,7 +21,7 @@ class Parameter:
     """
          There are eight general categories of the parameters exchanged server <-> clients , server <-> webapp, and
          compensator <-> server
-         client -> server: authentication, synchronization, monitoring, and local parameters
+         client -> server: authentication, synchronization, monitoring, local, data type, and fixed-point parameters
          server -> client: coordination, project, global parameters
          webapp -> server: authentication and project parameters
          server -> webapp: project parameters
@@ -33,9 +33,12 @@ class Parameter:
     SYNCHRONIZATION = "synchronization_parameter"
     MONITORING = "monitoring_parameter"
     LOCAL = "local_parameter"
+    DATA_TYPE = "data_type_parameter"
+    FIXED_POINT = "fixed_point_parameter"  # parameter name -> (scale, ring) of the fixed-point encoded parameters
     PROJECT = "project_parameter"
     COORDINATION = "coordination_parameter"
     GLOBAL = "global_parameter"
+    GLOBAL_DELTA = "global_delta_parameter"
     COMPENSATION = "compensation_parameter"
 
 
@@ -67,6 +70,9 @@ class SyncParameter:
 
     # client -> server
     COMPENSATOR_FLAG = "compensator_flag"
+    COMPRESSION = "compression"  # compression algorithms the client can decode
+    GLOBAL_PARAMETERS_ROUND = "global_parameters_round"  # round of the global parameters the client holds
+    LONG_POLL_TIMEOUT = "long_poll_timeout"  # seconds the server may hold the global model request; 0 disables it
 
 
 class MonitoringParameter:
@@ -82,6 +88,7 @@ class MonitoringParameter:
 
     # compensator -> server
     CLIENT_COMPENSATOR_TRAFFIC = "client_compensator_traffic"
+    CLIENT_COMPENSATOR_TRAFFIC_UNCOMPRESSED = "client_compensator_traffic_uncompressed"
 
 
 class HyFedProjectParameter:
@@ -99,6 +106,7 @@ class HyFedProjectParameter:
 
     # server -> compensator
     CLIENT_COUNT = "client_count"
+    COMPRESSION = "compression"  # compression algorithms the server can decode
 
 
 class CoordinationParameter:
@@ -110,3 +118,7 @@ class CoordinationParameter:
     COMM_ROUND = "communication_round"
     PROJECT_STARTED = "project_started"
     CLIENT_JOINED = "client_joined"
+    COMPRESSION = "compression"  # compression algorithms the server can decode
+    GLOBAL_BASE_ROUND = "global_base_round"  # round of the global parameters the global deltas are computed against
+    GLOBAL_PARAMETERS_HASH = "global_parameters_hash"  # content hash of the serialized (client agnostic) global parameters
+    GLOBAL_PARAMETERS_CAPABILITY = "global_parameters_capability"  # capability in the URL of the global parameters
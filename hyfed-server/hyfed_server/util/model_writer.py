@@ -0,0 +1,189 @@
+"""
+    Write-behind batching of the model updates of the projects
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ModelWriter:
+    """
+        Coalesces the updates of the model instances (e.g. HyFedProjectModel, TimerModel, and TrafficModel) and writes
+        them in the background every flush_interval milliseconds, with a single update() of the changed fields per
+        instance and a single transaction per flush, so that the projects do not wait for the database write lock
+        in each round; the readers of the models (e.g. the webapp) call flush first to see the latest values, and
+        the writers flush right away the updates that the other server workers must see (e.g. the status transitions
+        of the projects), because flush only writes the updates of this worker; the updates are written synchronously
+        if flush_interval is 0; the new model instances (e.g. RoundMetricsModel) are inserted in the same flush with
+        a single bulk_create per model class; the updates of a failed flush are not retried, but the next update of
+        each of its instances raises the error, as a synchronous write would have, so that the project fails
+    """
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval / 1000  # in seconds
+
+        # the pending field values of each instance; indexed by (model class, instance id)
+        self.writer_condition = threading.Condition()
+        self.pending_updates = dict()
+        self.pending_creates = list()  # new model instances in the order they were created
+        self.writer_thread = None  # started on the first update
+
+        # the error of the failed flush of each instance whose updates were lost; indexed by (model class, instance id)
+        self.failed_instances = dict()
+
+        self.flush_lock = threading.Lock()  # the updates are written by one flush at a time, in order
+
+        # metrics
+        self.requested_update_count = 0
+        self.written_update_count = 0
+        self.created_instance_count = 0
+        self.flush_count = 0
+        self.failed_flush_count = 0
+
+    def update(self, model_class, instance_id, **field_values):
+        """ Set the fields of the model instance to the values in the next flush """
+
+        instance_key = (model_class, str(instance_id))
+
+        with self.writer_condition:
+            flush_exp = self.failed_instances.pop(instance_key, None)
+            if flush_exp is not None:
+                raise RuntimeError(f'Failed to write the {model_class.__name__} {instance_id} updates: {flush_exp}')
+
+            self.requested_update_count += 1
+            self.pending_updates.setdefault(instance_key, dict()).update(field_values)
+
+            if self.flush_interval > 0:
+                self.start_writer()
+                return
+
+        try:
+            self.flush()
+        except Exception:
+            # the error is raised to the caller right away
+            with self.writer_condition:
+                self.failed_instances.pop(instance_key, None)
+            raise
+
+    def create(self, model_instance):
+        """ Insert the (unsaved) model instance in the next flush """
+
+        with self.writer_condition:
+            self.pending_creates.append(model_instance)
+
+            if self.flush_interval > 0:
+                self.start_writer()
+                return
+
+        self.flush()
+
+    def start_writer(self):
+        """ Start the writer thread if not started yet and wake it up; the writer condition must be held """
+
+        if self.writer_thread is None:
+            self.writer_thread = threading.Thread(target=self.write_behind, daemon=True)
+            self.writer_thread.start()
+        self.writer_condition.notify()
+
+    def flush(self):
+        """
+            Write the pending updates to the database; if the flush fails, the error is raised, and recorded for
+            the next update of each updated instance
+        """
+
+        with self.flush_lock:
+            with self.writer_condition:
+                pending_updates, self.pending_updates = self.pending_updates, dict()
+                pending_creates, self.pending_creates = self.pending_creates, list()
+
+            if not pending_updates and not pending_creates:
+                return
+
+            # the instances of each model class in their creation order
+            model_instances = dict()
+            for model_instance in pending_creates:
+                model_instances.setdefault(type(model_instance), list()).append(model_instance)
+
+            try:
+                with transaction.atomic():
+                    for model_class, instances in model_instances.items():
+                        # a round recorded again after the project was restored from its snapshot is skipped
+                        model_class.objects.bulk_create(instances, ignore_conflicts=True)
+
+                    # update() does not set the auto_now fields (e.g. updated_at) as save() does, so they are set here
+                    update_time = timezone.now()
+                    for (model_class, instance_id), field_values in pending_updates.items():
+                        auto_now_fields = {field.name: update_time for field in model_class._meta.concrete_fields
+                                           if getattr(field, 'auto_now', False)}
+                        model_class.objects.filter(id=instance_id).update(**field_values, **auto_now_fields)
+
+            except Exception as flush_exp:
+                logger.error(f'Model writer: failed to write {len(pending_updates)} model updates and '
+                             f'{len(pending_creates)} new model instances: {flush_exp}')
+
+                with self.writer_condition:
+                    self.failed_flush_count += 1
+                    for instance_key in pending_updates.keys():
+                        self.failed_instances[instance_key] = flush_exp
+                raise
+
+            with self.writer_condition:
+                self.flush_count += 1
+                self.written_update_count += len(pending_updates)
+                self.created_instance_count += len(pending_creates)
+
+        logger.debug(f'Model writer: {len(pending_updates)} model updates and {len(pending_creates)} new model instances '
+                     f'written!')
+
+    def write_behind(self):
+        """ Flush the pending updates every flush_interval; runs in the writer thread """
+
+        while True:
+            with self.writer_condition:
+                while not self.pending_updates and not self.pending_creates:
+                    self.writer_condition.wait()
+
+            # collect the updates of the other projects in the meantime
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass  # logged and recorded for the next update of the instances by flush
+
+    def get_metrics(self):
+        """ Get the number of the requested and written updates, created instances, and pending instances """
+
+        with self.writer_condition:
+            return {'flush_interval': self.flush_interval * 1000,
+                    'pending_instance_count': len(self.pending_updates),
+                    'pending_create_count': len(self.pending_creates),
+                    'failed_instance_count': len(self.failed_instances),
+                    'requested_update_count': self.requested_update_count,
+                    'written_update_count': self.written_update_count,
+                    'created_instance_count': self.created_instance_count,
+                    'flush_count': self.flush_count,
+                    'failed_flush_count': self.failed_flush_count}
+
+
+model_writer = ModelWriter(settings.MODEL_WRITE_BEHIND_INTERVAL)
@@ -0,0 +1,229 @@
+"""
+    Packed representation of the local/global parameters: one contiguous buffer per lane plus an offset/shape index
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.util.data_type import DataType
+from hyfed_server.util.modular import is_non_negative_integer, is_wraparound_integer, is_float32, masked_dtype
+import numpy as np
+import math
+
+
+class ParameterPack:
+    """
+        Parameters (scalars, numpy arrays, and lists of numpy arrays) packed into one contiguous 1-D buffer per lane,
+        plus an index with the offset and shape(s) of each parameter in the buffer of its lane;
+        the masked parameters are packed by how they are masked (modular, wrap-around, or Gaussian lane, the latter two
+        with 32-bit variants) and the others by their numpy dtype, so masking, encoding, and summing the parameters are one numpy operation per lane;
+        the values that cannot be packed (e.g. strings) are kept as they are in the extras
+    """
+
+    MODULAR_LANE = 'modular'
+    WRAPAROUND_LANE = 'wraparound'
+    GAUSSIAN_LANE = 'gaussian'
+    WRAPAROUND32_LANE = 'wraparound32'
+    GAUSSIAN32_LANE = 'gaussian32'
+
+    # kinds of the packed parameters
+    SCALAR = 's'
+    ARRAY = 'a'
+    LIST = 'l'
+
+    def __init__(self, buffers=None, index=None, extras=None):
+        self.buffers = dict() if buffers is None else buffers  # lane -> 1-D numpy array
+        self.index = dict() if index is None else index  # parameter name -> (lane, offset, kind, shape(s))
+        self.extras = dict() if extras is None else extras  # parameter name -> value that is not packed
+
+    @classmethod
+    def pack(cls, parameters, data_types=None):
+        """ Pack the parameters; data_types contains the data types (see DataType) of the masked parameters """
+
+        data_types = data_types or dict()
+
+        lane_arrays = dict()
+        lane_sizes = dict()
+        index = dict()
+        extras = dict()
+        for parameter_name, parameter_value in parameters.items():
+            lane = cls.get_lane(parameter_value, data_types.get(parameter_name))
+            if lane is None:
+                extras[parameter_name] = parameter_value
+                continue
+
+            if isinstance(parameter_value, list):
+                kind, shapes, arrays = cls.LIST, tuple(array.shape for array in parameter_value), parameter_value
+            elif isinstance(parameter_value, np.ndarray):
+                kind, shapes, arrays = cls.ARRAY, parameter_value.shape, [parameter_value]
+            else:
+                kind, shapes, arrays = cls.SCALAR, (), [parameter_value]
+
+            offset = lane_sizes.get(lane, 0)
+            index[parameter_name] = (lane, offset, kind, shapes)
+            lane_arrays.setdefault(lane, []).extend(arrays)
+            lane_sizes[lane] = offset + sum(np.size(array) for array in arrays)
+
+        buffers = dict()
+        for lane, arrays in lane_arrays.items():
+            buffer = np.empty(lane_sizes[lane], dtype=cls.get_lane_dtype(lane))
+            position = 0
+            for array in arrays:
+                size = np.size(array)
+                buffer[position:position + size] = np.ravel(array)
+                position += size
+            buffers[lane] = buffer
+
+        return cls(buffers, index, extras)
+
+    @classmethod
+    def get_lane(cls, value, data_type=None):
+        """ Lane of the parameter value with the given data type; None if the value cannot be packed """
+
+        if isinstance(value, list):
+            if len(value) == 0 or not all(isinstance(array, np.ndarray) for array in value):
+                return None
+            dtypes = {array.dtype for array in value}
+        elif isinstance(value, np.ndarray):
+            dtypes = {value.dtype}
+        elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            dtypes = {np.asarray(value).dtype}
+        else:
+            return None
+
+        # only numeric values are packed
+        if any(dtype.kind not in 'biuf' for dtype in dtypes):
+            return None
+
+        # the unmasked arrays of a list must have the same dtype so that they are unpacked with their own dtype
+        if data_type is None:
+            return dtypes.pop().str if len(dtypes) == 1 else None
+
+        if is_non_negative_integer(data_type):
+            return cls.MODULAR_LANE
+
+        if is_wraparound_integer(data_type):
+            return cls.WRAPAROUND32_LANE if masked_dtype(data_type) == np.int32 else cls.WRAPAROUND_LANE
+
+        if is_float32(data_type):
+            return cls.GAUSSIAN32_LANE
+
+        return cls.GAUSSIAN_LANE
+
+    @classmethod
+    def get_lane_dtype(cls, lane):
+        """ numpy dtype of the buffer of the lane """
+
+        if lane == cls.MODULAR_LANE or lane == cls.WRAPAROUND_LANE:
+            return np.dtype(np.int64)
+
+        if lane == cls.GAUSSIAN_LANE:
+            return np.dtype(np.float64)
+
+        if lane == cls.WRAPAROUND32_LANE:
+            return np.dtype(np.int32)
+
+        if lane == cls.GAUSSIAN32_LANE:
+            return np.dtype(np.float32)
+
+        return np.dtype(lane)
+
+    @classmethod
+    def get_lane_data_type(cls, lane):
+        """ Data type (see DataType) with which the buffer of the lane is masked and aggregated; None if unmasked """
+
+        if lane == cls.MODULAR_LANE:
+            return DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER
+
+        if lane == cls.WRAPAROUND_LANE:
+            return DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER
+
+        if lane == cls.GAUSSIAN_LANE:
+            return DataType.NUMPY_ARRAY_FLOAT
+
+        if lane == cls.WRAPAROUND32_LANE:
+            return DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32
+
+        if lane == cls.GAUSSIAN32_LANE:
+            return DataType.NUMPY_ARRAY_FLOAT32
+
+        return None
+
+    def get(self, parameter_name):
+        """ Value of the parameter; numpy arrays are views into the buffer of the lane """
+
+        if parameter_name in self.extras.keys():
+            return self.extras[parameter_name]
+
+        lane, offset, kind, shapes = self.index[parameter_name]
+        buffer = self.buffers[lane]
+
+        if kind == self.SCALAR:
+            return buffer[offset].item()
+
+        if kind == self.ARRAY:
+            return buffer[offset:offset + math.prod(shapes)].reshape(shapes)
+
+        arrays = list()
+        for shape in shapes:
+            size = math.prod(shape)
+            arrays.append(buffer[offset:offset + size].reshape(shape))
+            offset += size
+
+        return arrays
+
+    def unpack(self):
+        """ Unpack the parameters into a dictionary """
+
+        return {parameter_name: self.get(parameter_name) for parameter_name in list(self.index) + list(self.extras)}
+
+    def keys(self):
+        """ Names of the parameters (packed or not) as a set """
+
+        return self.index.keys() | self.extras.keys()
+
+    def is_compatible(self, other):
+        """ Check whether the other pack has the same layout, i.e. its lane buffers can be added to those of this pack """
+
+        return self.index == other.index and self.extras.keys() == other.extras.keys() and \
+            all(buffer.dtype == other.buffers[lane].dtype and buffer.size == other.buffers[lane].size
+                for lane, buffer in self.buffers.items())
+
+    def map_buffers(self, function, extras=None):
+        """ New pack with the same index whose lane buffers are function(lane, buffer) """
+
+        buffers = {lane: function(lane, buffer) for lane, buffer in self.buffers.items()}
+
+        return ParameterPack(buffers, self.index, dict(self.extras) if extras is None else extras)
+
+    def copy(self):
+        """ Copy of the pack with writable buffers """
+
+        return self.map_buffers(lambda lane, buffer: np.array(buffer))
+
+    def to_dict(self):
+        return {'buffers': self.buffers, 'index': self.index, 'extras': self.extras}
+
+    @classmethod
+    def from_dict(cls, pack_dict):
+        return cls(pack_dict['buffers'], pack_dict['index'], pack_dict['extras'])
+
+
+def unpack_parameters(parameters):
+    """ The parameters as a dictionary, whether they are packed or not """
+
+    if isinstance(parameters, ParameterPack):
+        return parameters.unpack()
+
+    return dict(parameters)
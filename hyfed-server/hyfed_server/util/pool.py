@@ -16,6 +16,9 @@
     limitations under the License.
 """
 import hashlib
+import heapq
+import threading
+import time
 
 from hyfed_server.model.hyfed_models import HyFedProjectModel, TokenModel
 from hyfed_server.util.status import ProjectStatus
@@ -27,9 +30,23 @@ logger = logging.getLogger(__name__)
 class ProjectPool:
     """ A pool of projects in the main memory """
 
-    def __init__(self):
+    def __init__(self, snapshot_store=None):
         self.project_pool = dict()  # indexed by project_id
         self.hash_to_plain_id = dict()  # project_id_hash -> project_id
+        self.pool_lock = threading.Lock()  # to remove projects from the pool atomically
+
+        # heap of (clean-up time, project_id) of the projects scheduled for clean-up; the projects are removed from
+        # the pool by the clean-up reaper thread (started on the first schedule) when their clean-up time is reached
+        self.clean_up_heap = []
+        self.clean_up_condition = threading.Condition()
+        self.clean_up_reaper = None
+        self.cleaned_up_project_count = 0
+
+        # snapshots of the projects in the pool, from which the pool is restored after the server restarts;
+        # None disables the snapshots (see ProjectSnapshotStore)
+        self.snapshot_store = snapshot_store
+        self.projects_restored = False  # the projects are restored from the snapshots only once
+
         logger.debug("Project pool Created!")
 
     def add_project(self, derived_project_instance):
@@ -37,7 +54,10 @@ class ProjectPool:
 
         try:
             project_id = str(derived_project_instance.get_project_id())
+            derived_project_instance.set_clean_up_scheduler(self.schedule_clean_up)
+            derived_project_instance.set_snapshot_store(self.snapshot_store)
             self.project_pool[project_id] = derived_project_instance
+            derived_project_instance.save_snapshot()
 
             logger.debug(f"Project {project_id}: Project added to the pool!")
         except Exception as exp:
@@ -75,12 +95,57 @@ class ProjectPool:
                 # change the status of the project
                 self.project_pool[project_id].set_status(ProjectStatus.PARAMETERS_READY)
 
+                self.project_pool[project_id].save_snapshot()
+
                 logger.debug(f"Project {project_id}: Started!")
 
         except Exception as exp:
             logger.error(f"Project {project_id}: Failed to start the project!")
             logger.error(f'Project {project_id}: The exception is: {exp}')
 
+    def restore_projects(self, aggregation_executor=None):
+        """
+            Add the projects in the snapshot store to the pool and mark the started ones as running, so that
+            the clients resume at the communication round of the last snapshot; called once when the server starts;
+            the snapshots of the projects that are completed/failed/aborted or deleted in the meantime are removed
+        """
+
+        if self.snapshot_store is None or self.projects_restored:
+            return
+
+        self.projects_restored = True
+
+        for project_id in self.snapshot_store.get_project_ids():
+            try:
+                project_status = HyFedProjectModel.objects.filter(id=project_id).values_list('status', flat=True).first()
+                if project_status is None or project_status in [ProjectStatus.DONE, ProjectStatus.FAILED,
+                                                                ProjectStatus.ABORTED]:
+                    self.snapshot_store.remove(project_id)
+                    continue
+
+                project_snapshot = self.snapshot_store.load(project_id)
+                if project_snapshot is None:
+                    self.snapshot_store.remove(project_id)
+                    continue
+
+                project_class, snapshot = project_snapshot
+                derived_project_instance = project_class.from_snapshot(snapshot)
+                derived_project_instance.set_aggregation_executor(aggregation_executor)
+
+                derived_project_instance.set_clean_up_scheduler(self.schedule_clean_up)
+                derived_project_instance.set_snapshot_store(self.snapshot_store)
+                self.project_pool[project_id] = derived_project_instance
+
+                if derived_project_instance.get_status() != ProjectStatus.CREATED:
+                    hash_project_id = hashlib.sha256(project_id.encode('utf-8')).hexdigest()
+                    self.hash_to_plain_id[hash_project_id] = project_id
+
+                logger.debug(f"Project {project_id}: restored to the pool at round "
+                             f"{derived_project_instance.get_comm_round()}!")
+
+            except Exception as restore_exp:
+                logger.error(f'Project {project_id}: Failed to restore the project: {restore_exp}')
+
     def is_running(self, project_id):
         """ Check whether the project specified with project_id is running """
 
@@ -123,6 +188,11 @@ class ProjectPool:
 
         return self.project_pool[project_id]
 
+    def get_project(self, project_id):
+        """ Get the project instance specified with the project_id regardless of its status (None if not in the pool) """
+
+        return self.project_pool.get(project_id)
+
     def get_project_id(self, hash_project_id):
         """ Get the project ID corresponding to hash_project_id """
 
@@ -134,16 +204,84 @@ class ProjectPool:
         logger.debug("Removing the projects marked as clean-up from the pool ...")
         project_id_list = list(self.project_pool.keys())[:]
         for project_id in project_id_list:
-            if self.project_pool[project_id].clean_me_up():
+            project = self.project_pool.get(project_id)
+            if project is not None and project.clean_me_up():
+                self.remove_project(project_id)
 
-                # first delete hash_project_id
-                hash_project_id = hashlib.sha256(project_id.encode('utf-8')).hexdigest()
-                del self.hash_to_plain_id[hash_project_id]
+    def schedule_clean_up(self, project_id, clean_up_time):
+        """ Schedule the removal of the project from the pool at clean_up_time (in seconds since the epoch) """
+
+        with self.clean_up_condition:
+            heapq.heappush(self.clean_up_heap, (clean_up_time, project_id))
+
+            # start the reaper on the first schedule
+            if self.clean_up_reaper is None:
+                self.clean_up_reaper = threading.Thread(target=self.reap_projects, daemon=True)
+                self.clean_up_reaper.start()
 
-                # delete project itself
-                del self.project_pool[project_id]
+            # wake up the reaper in case the new clean-up time is the earliest one
+            self.clean_up_condition.notify()
 
-                logger.debug(f"Project {project_id} removed from the project pool!")
+        logger.debug(f"Project {project_id}: clean-up scheduled in {clean_up_time - time.time():.0f} seconds "
+                     f"(clean-up backlog: {len(self.clean_up_heap)})")
+
+    def reap_projects(self):
+        """ Remove the projects from the pool as their clean-up time is reached; runs in the clean-up reaper thread """
+
+        while True:
+            with self.clean_up_condition:
+                while not self.clean_up_heap:
+                    self.clean_up_condition.wait()
+
+                clean_up_time, project_id = self.clean_up_heap[0]
+                remaining_time = clean_up_time - time.time()
+                if remaining_time > 0:
+                    self.clean_up_condition.wait(timeout=remaining_time)
+                    continue
+
+                heapq.heappop(self.clean_up_heap)
+
+            try:
+                self.remove_project(project_id)
+                self.cleaned_up_project_count += 1
+            except Exception as exp:
+                logger.error(f'Project {project_id}: {exp}')
+
+    def remove_project(self, project_id):
+        """ Remove the project specified by project id and its hash from the pool """
+
+        with self.pool_lock:
+            if project_id not in self.project_pool.keys():
+                return
+
+            # first delete hash_project_id
+            hash_project_id = hashlib.sha256(project_id.encode('utf-8')).hexdigest()
+            self.hash_to_plain_id.pop(hash_project_id, None)
+
+            # delete project itself
+            del self.project_pool[project_id]
+
+        # the project is not restored anymore
+        if self.snapshot_store is not None:
+            self.snapshot_store.remove(project_id)
+
+        logger.debug(f"Project {project_id} removed from the project pool!")
+
+    def get_clean_up_metrics(self):
+        """ Get the backlog of the clean-up reaper as well as the number of projects in the pool """
+
+        with self.clean_up_condition:
+            current_time = time.time()
+            clean_up_backlog = len(self.clean_up_heap)
+            overdue_count = sum(1 for clean_up_time, _ in self.clean_up_heap if clean_up_time <= current_time)
+            next_clean_up = self.clean_up_heap[0][0] - current_time if self.clean_up_heap else None
+
+        return {'project_count': len(self.project_pool),
+                'running_project_count': len(self.hash_to_plain_id),
+                'clean_up_backlog': clean_up_backlog,
+                'clean_up_overdue': overdue_count,
+                'next_clean_up_in': next_clean_up,
+                'cleaned_up_project_count': self.cleaned_up_project_count}
 
     def delete_project(self, project_id):
         """ Delete the project specified by project id """
@@ -156,11 +294,4 @@ class ProjectPool:
         if project_status == ProjectStatus.PARAMETERS_READY or project_status == ProjectStatus.AGGREGATING:
             return
 
-        # first delete hash_project_id
-        hash_project_id = hashlib.sha256(project_id.encode('utf-8')).hexdigest()
-        del self.hash_to_plain_id[hash_project_id]
-
-        # delete project itself
-        del self.project_pool[project_id]
-
-        logger.debug(f"Project {project_id} removed from the project pool!")
+        self.remove_project(project_id)
@@ -0,0 +1,197 @@
+"""
+    Project-affinity sharding of the projects across multiple server worker processes
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.model.hyfed_models import HyFedProjectModel
+from hyfed_server.util.endpoint import EndPoint, RoutingHeader
+from hyfed_server.util.status import ProjectStatus
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+
+import urllib.request
+import urllib.error
+import threading
+import hashlib
+import re
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ShardRouter:
+    """
+        Routes the requests of each project to the server worker process (shard) that owns the project, i.e. keeps it
+        in its project pool; the owner of a project is stored in the shard field of its model, so the routing table is
+        shared by the workers through the database; a request received by another worker is forwarded to the owner;
+        the project of a request is taken from the path or the routing headers (see RoutingHeader), so the (large)
+        bodies are never decoded for routing; with at most one shard URL, the server runs as a single process and
+        nothing is routed
+    """
+
+    # set on the forwarded requests, so that they are never forwarded again
+    FORWARDED_HEADER = 'X-HyFed-Forwarded-Shard'
+
+    # the webapp requests of a project (e.g. delete) have the project ID in the path
+    PROJECT_PATH = re.compile(r'^/projects/(?P<project_id>[0-9a-f-]{36})/')
+    GLOBAL_PARAMETERS_PATH = re.compile(r'^/' + EndPoint.GLOBAL_PARAMETERS + r'(?P<project_id>[^/]+)/')
+
+    # request/response headers passed through when forwarding
+    FORWARDED_REQUEST_HEADERS = ('Content-Type', 'Authorization', 'Cookie', 'Accept', 'Accept-Encoding')
+    FORWARDED_RESPONSE_HEADERS = ('Content-Disposition', 'Cache-Control', 'X-Accel-Buffering')
+
+    def __init__(self, shard_urls, shard_index, forward_timeout=None):
+        self.shard_urls = [shard_url.rstrip('/') for shard_url in shard_urls]
+        self.shard_index = shard_index
+        self.forward_timeout = forward_timeout
+
+        # cache of the routing table; the shard of a project never changes
+        self.routing_lock = threading.Lock()
+        self.project_shards = dict()  # project_id -> shard
+        self.hash_project_shards = dict()  # hash_project_id -> shard
+
+    def is_sharded(self):
+        return len(self.shard_urls) > 1
+
+    def is_local(self, shard):
+        return shard is None or shard == self.shard_index
+
+    # ########## routing table
+    def select_shard(self):
+        """ The shard for a new project: the one with the fewest projects that are not completed/failed/aborted """
+
+        active_projects = HyFedProjectModel.objects.exclude(status__in=[ProjectStatus.DONE, ProjectStatus.FAILED,
+                                                                        ProjectStatus.ABORTED])
+        project_counts = {shard_count['shard']: shard_count['project_count'] for shard_count in
+                          active_projects.values('shard').annotate(project_count=Count('id'))}
+
+        return min(range(len(self.shard_urls)), key=lambda shard: (project_counts.get(shard, 0), shard))
+
+    def assign_project(self, project_id):
+        """ Record this worker as the owner of the (newly created) project, indexed by the ID and its hash """
+
+        project_id = str(project_id)
+        hash_project_id = hashlib.sha256(project_id.encode('utf-8')).hexdigest()
+        HyFedProjectModel.objects.filter(id=project_id).update(shard=self.shard_index, hash_id=hash_project_id)
+        with self.routing_lock:
+            self.project_shards[project_id] = self.shard_index
+            self.hash_project_shards[hash_project_id] = self.shard_index
+
+    def get_project_shard(self, project_id):
+        """ The shard of the project; None if the project does not exist """
+
+        with self.routing_lock:
+            if project_id in self.project_shards.keys():
+                return self.project_shards[project_id]
+
+        try:
+            shard = HyFedProjectModel.objects.filter(id=project_id).values_list('shard', flat=True).first()
+        except Exception as lookup_exp:  # e.g. malformed project ID
+            logger.debug(f'Shard routing: {lookup_exp}')
+            return None
+
+        if shard is not None:
+            with self.routing_lock:
+                self.project_shards[project_id] = shard
+
+        return shard
+
+    def get_hash_project_shard(self, hash_project_id):
+        """ The shard of the project whose ID hashes to hash_project_id; None if there is no such project """
+
+        with self.routing_lock:
+            if hash_project_id in self.hash_project_shards.keys():
+                return self.hash_project_shards[hash_project_id]
+
+        # the compensator only knows the hash, which is indexed in the project model
+        shard = HyFedProjectModel.objects.filter(hash_id=hash_project_id).values_list('shard', flat=True).first()
+
+        if shard is not None:
+            with self.routing_lock:
+                self.hash_project_shards[hash_project_id] = shard
+
+        return shard
+
+    # ########## routing
+    def route(self, request):
+        """ The shard that must handle the request; None if any worker can handle it """
+
+        path = request.path
+
+        # creating a project: the least-loaded shard
+        if path.rstrip('/') == '/projects' and request.method == 'POST':
+            return self.select_shard()
+
+        path_match = self.PROJECT_PATH.match(path) or self.GLOBAL_PARAMETERS_PATH.match(path)
+        if path_match:
+            return self.get_project_shard(path_match.group('project_id'))
+
+        # the client and compensator requests have the (hash of the) project ID in the routing headers
+        if request.headers.get(RoutingHeader.PROJECT_ID):
+            return self.get_project_shard(request.headers[RoutingHeader.PROJECT_ID])
+
+        if request.headers.get(RoutingHeader.HASH_PROJECT_ID):
+            return self.get_hash_project_shard(request.headers[RoutingHeader.HASH_PROJECT_ID])
+
+        return None
+
+    def forward(self, request, shard):
+        """ Forward the request to the worker of the shard and return its response """
+
+        logger.debug(f'Shard routing: forwarding {request.method} {request.path} to shard {shard} ...')
+
+        forwarded_request = urllib.request.Request(self.shard_urls[shard] + request.get_full_path(),
+                                                   data=request.body if request.body else None,
+                                                   method=request.method)
+        for header in self.FORWARDED_REQUEST_HEADERS:
+            if request.headers.get(header):
+                forwarded_request.add_header(header, request.headers[header])
+        forwarded_request.add_header(self.FORWARDED_HEADER, str(shard))
+
+        try:
+            shard_response = urllib.request.urlopen(forwarded_request, timeout=self.forward_timeout)
+        except urllib.error.HTTPError as http_error:
+            shard_response = http_error
+
+        content_type = shard_response.headers.get('Content-Type', 'application/octet-stream')
+
+        # the server-sent events are streamed as they arrive
+        if content_type.startswith('text/event-stream'):
+            http_response = StreamingHttpResponse(self.stream(shard_response), content_type=content_type,
+                                                  status=shard_response.getcode())
+        else:
+            http_response = HttpResponse(shard_response.read(), content_type=content_type,
+                                         status=shard_response.getcode())
+            shard_response.close()
+
+        for header in self.FORWARDED_RESPONSE_HEADERS:
+            if shard_response.headers.get(header):
+                http_response[header] = shard_response.headers[header]
+
+        return http_response
+
+    @staticmethod
+    def stream(shard_response):
+        try:
+            for line in shard_response:
+                yield line
+        finally:
+            shard_response.close()
+
+
+shard_router = ShardRouter(settings.SHARD_URLS, settings.SHARD_INDEX, settings.SHARD_FORWARD_TIMEOUT)
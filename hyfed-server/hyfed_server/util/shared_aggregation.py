@@ -0,0 +1,94 @@
+"""
+    Aggregation of the lane buffers of the packed local parameters in shared memory, e.g. in a worker process
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.util.modular import is_non_negative_integer, modular_reduce
+from hyfed_server.util.utils import accumulate_parameter
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing import resource_tracker
+import multiprocessing
+import numpy as np
+import math
+import sys
+
+
+def create_shared_array(shape, dtype):
+    """ Create a shared memory block and a numpy array with the shape and dtype on top of it """
+
+    dtype = np.dtype(dtype)
+    shared_memory = SharedMemory(create=True, size=max(1, math.prod(shape) * dtype.itemsize))
+
+    return shared_memory, np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+
+
+def release_shared_memory(shared_memory):
+    """ Close and remove the shared memory block; the numpy arrays on top of it must have been deleted """
+
+    shared_memory.close()
+    shared_memory.unlink()
+
+
+def attach_shared_memory(shared_memory_name):
+    """
+        Attach to the shared memory block created by the server process; in a worker process, the block is not
+        registered with the resource tracker, which would otherwise unlink it (or warn about it) when the worker exits,
+        because the server process that created the block releases it
+    """
+
+    if multiprocessing.parent_process() is None:
+        return SharedMemory(name=shared_memory_name)
+
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=shared_memory_name, track=False)
+
+    # before python 3.13, attaching to a block always registers it, so the registration is skipped (the worker
+    # processes run one task at a time)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name=shared_memory_name)
+    finally:
+        resource_tracker.register = register
+
+
+def sum_shared_rows(shared_memory_name, shape, dtype_str, data_type, rows, result_row):
+    """
+        Sum the given rows of the 2-D array in the shared memory block into result_row, with the arithmetic of the
+        data type (see DataType; None for a plain sum); runs in a worker process, so the arguments are picklable
+    """
+
+    shared_memory = attach_shared_memory(shared_memory_name)
+    try:
+        shared_array = np.ndarray(shape, dtype=np.dtype(dtype_str), buffer=shared_memory.buf)
+        result = shared_array[result_row]
+        np.copyto(result, shared_array[rows[0]])
+
+        # the rows are added to the result in place
+        aggregated_value = result
+        for folded_count, row in enumerate(rows[1:], start=1):
+            aggregated_value = accumulate_parameter(aggregated_value, shared_array[row], data_type, folded_count)
+
+        if is_non_negative_integer(data_type):
+            aggregated_value = modular_reduce(aggregated_value)
+
+        if aggregated_value is not result:
+            np.copyto(result, aggregated_value, casting='unsafe')
+
+        del shared_array, result, aggregated_value
+
+    finally:
+        shared_memory.close()
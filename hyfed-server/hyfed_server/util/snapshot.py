@@ -0,0 +1,144 @@
+"""
+    Crash-safe snapshots of the projects in the pool, appended to a snapshot file per project on the local disk
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from pathlib import Path
+import importlib
+import threading
+import pickle
+import struct
+import zlib
+import os
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ProjectSnapshotStore:
+    """
+        Append-only snapshot files of the projects, one per project in the snapshot directory; each snapshot is
+        a record of a header (magic, payload size, and crc32 of the payload) followed by the (pickled) class and
+        attributes of the project, so that a record torn by a crash is detected and the previous snapshot is used;
+        after compaction_record_count records, the file is compacted (atomically replaced) to its last snapshot;
+        the snapshot files are only read and written by the server itself
+    """
+
+    SNAPSHOT_SUFFIX = '.snapshot'
+    RECORD_MAGIC = b'HYFS'
+    RECORD_HEADER = struct.Struct('<4sQI')
+
+    def __init__(self, snapshot_dir, compaction_record_count=16):
+        self.snapshot_dir = Path(snapshot_dir)  # created on the first append
+        self.compaction_record_count = compaction_record_count
+
+        self.store_lock = threading.Lock()
+        self.record_counts = dict()  # project_id -> number of the records in the snapshot file
+
+    def get_snapshot_path(self, project_id):
+        return self.snapshot_dir / f'{project_id}{self.SNAPSHOT_SUFFIX}'
+
+    def encode(self, project_class, snapshot):
+        """ Record of the snapshot (i.e. attributes) of a project of the class """
+
+        payload = pickle.dumps({'class': (project_class.__module__, project_class.__qualname__),
+                                'attributes': snapshot}, protocol=pickle.HIGHEST_PROTOCOL)
+
+        return self.RECORD_HEADER.pack(self.RECORD_MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+    def append(self, project_id, record):
+        """ Durably append the record to the snapshot file of the project, compacting the file if it is due """
+
+        snapshot_path = self.get_snapshot_path(project_id)
+
+        with self.store_lock:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            record_count = self.record_counts.get(project_id, 0)
+
+            if record_count >= self.compaction_record_count:
+                compacted_path = snapshot_path.with_suffix('.compacted')
+                with open(compacted_path, 'wb') as compacted_file:
+                    compacted_file.write(record)
+                    compacted_file.flush()
+                    os.fsync(compacted_file.fileno())
+                os.replace(compacted_path, snapshot_path)
+                self.record_counts[project_id] = 1
+                return
+
+            with open(snapshot_path, 'ab') as snapshot_file:
+                snapshot_file.write(record)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            self.record_counts[project_id] = record_count + 1
+
+    def load(self, project_id):
+        """
+            The class and attributes of the last complete snapshot of the project (None if there is no snapshot);
+            a torn record at the end of the file is truncated, so that the next records are appended after
+            the last complete one
+        """
+
+        snapshot_path = self.get_snapshot_path(project_id)
+
+        with self.store_lock:
+            if not snapshot_path.exists():
+                return None
+
+            snapshot_bytes = snapshot_path.read_bytes()
+
+            last_payload = None
+            record_count = 0
+            offset = 0
+            while offset + self.RECORD_HEADER.size <= len(snapshot_bytes):
+                magic, payload_size, payload_crc = self.RECORD_HEADER.unpack_from(snapshot_bytes, offset)
+                payload_start = offset + self.RECORD_HEADER.size
+                payload = snapshot_bytes[payload_start:payload_start + payload_size]
+                if magic != self.RECORD_MAGIC or len(payload) != payload_size or zlib.crc32(payload) != payload_crc:
+                    break
+
+                last_payload = payload
+                record_count += 1
+                offset = payload_start + payload_size
+
+            if offset != len(snapshot_bytes):
+                logger.warning(f'Project {project_id}: torn snapshot record of {len(snapshot_bytes) - offset} bytes '
+                               f'truncated!')
+                with open(snapshot_path, 'r+b') as snapshot_file:
+                    snapshot_file.truncate(offset)
+
+            self.record_counts[project_id] = record_count
+
+        if last_payload is None:
+            return None
+
+        snapshot_record = pickle.loads(last_payload)
+        module_name, class_name = snapshot_record['class']
+        project_class = getattr(importlib.import_module(module_name), class_name)
+
+        return project_class, snapshot_record['attributes']
+
+    def remove(self, project_id):
+        """ Remove the snapshot file of the project """
+
+        with self.store_lock:
+            self.get_snapshot_path(project_id).unlink(missing_ok=True)
+            self.record_counts.pop(project_id, None)
+
+    def get_project_ids(self):
+        """ IDs of the projects with a snapshot file """
+
+        return [snapshot_path.name[:-len(self.SNAPSHOT_SUFFIX)]
+                for snapshot_path in self.snapshot_dir.glob(f'*{self.SNAPSHOT_SUFFIX}')]
@@ -31,3 +31,12 @@ class OperationStatus:
     IN_PROGRESS = "In Progress"
     DONE = "Done"
     FAILED = "Failed"
+
+
+class ProjectEvent:
+    """ Events pushed from the server to the clients through the project event channel """
+
+    PROJECT_STARTED = "project_started"
+    PARAMETERS_READY = "parameters_ready"  # communication round advanced
+    FAILED = "failed"
+    ABORTED = "aborted"
@@ -17,13 +17,27 @@
 """
 
 from hyfed_server.util.data_type import DataType
+from hyfed_server.util.modular import largest_prime_non_negative_int54, is_non_negative_integer, \
+    is_wraparound_integer, modular_sum, modular_fold, wraparound_sum, wraparound_add, \
+    is_float32, masked_dtype
+from hyfed_server.util.sparse import SparseArray, is_sparse, sparse_sum
+from hyfed_server.util import codec
 import numpy as np
 
+from django.conf import settings
+from django.utils.crypto import salted_hmac, constant_time_compare
+
 import logging
 logger = logging.getLogger(__name__)
 
 
-largest_prime_non_negative_int54 = 18014398509481951  # largest prime number that can fit in 54-bit integer
+# kinds of the delta between the global parameter values of two consecutive communication rounds;
+# both are exact, i.e. the client reconstructs exactly the same value
+DELTA_XOR = 'xor'  # bitwise XOR of the floating-point bit patterns
+DELTA_DIFFERENCE = 'difference'  # integer difference with wrap-around
+
+# a delta is sent only if its number of non-zero bytes is at most this fraction of that of the value
+delta_max_nonzero_ratio = 0.75
 
 
 def aggregate_parameters(noisy_parameters, data_type):
@@ -33,18 +47,29 @@ def aggregate_parameters(noisy_parameters, data_type):
     if not type(noisy_parameters) == list or not noisy_parameters:
         return None
 
-    if data_type == DataType.NON_NEGATIVE_INTEGER:
-        return np.sum(noisy_parameters) % largest_prime_non_negative_int54  # modular arithmetic
+    # modular arithmetic; overflow-safe for any number of clients
+    if is_non_negative_integer(data_type):
+        return modular_sum(noisy_parameters)
 
-    if data_type == DataType.NEGATIVE_INTEGER or data_type == DataType.FLOAT:
-        return np.sum(noisy_parameters)
+    # wrap-around (modulo 2^64) arithmetic
+    if is_wraparound_integer(data_type):
+        return wraparound_sum(noisy_parameters, masked_dtype(data_type))
 
-    if data_type == DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_NON_NEGATIVE_INTEGER:
-        return np.sum(noisy_parameters, axis=0) % largest_prime_non_negative_int54
+    # the float32 values are summed as float32
+    if data_type == DataType.NEGATIVE_INTEGER or data_type == DataType.FLOAT or data_type == DataType.FLOAT32:
+        return np.sum(noisy_parameters, dtype=masked_dtype(data_type) if is_float32(data_type) else None)
 
     if data_type == DataType.NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.NUMPY_ARRAY_FLOAT or \
-            data_type == DataType.LIST_NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_FLOAT:
-        return np.sum(noisy_parameters, axis=0)
+            data_type == DataType.LIST_NUMPY_ARRAY_NEGATIVE_INTEGER or data_type == DataType.LIST_NUMPY_ARRAY_FLOAT or \
+            data_type == DataType.NUMPY_ARRAY_FLOAT32 or data_type == DataType.LIST_NUMPY_ARRAY_FLOAT32:
+        return np.sum(noisy_parameters, axis=0, dtype=masked_dtype(data_type) if is_float32(data_type) else None)
+
+    # the sparse arrays are summed without densifying them
+    if data_type == DataType.SPARSE_ARRAY:
+        return sparse_sum(noisy_parameters)
+
+    if data_type == DataType.LIST_SPARSE_ARRAY:
+        return [sparse_sum(list(sparse_arrays)) for sparse_arrays in zip(*noisy_parameters)]
 
     return None
 
@@ -62,4 +87,148 @@ def client_parameters_to_list(parameter_dict, parameter_name):
         logger.error(exp)
         return []
 
-    return parameter_list
\ No newline at end of file
+    return parameter_list
+
+
+def accumulate_parameter(accumulated_value, value, data_type=None, folded_count=0):
+    """
+        Fold the parameter value (scalar, numpy array, or list of numpy arrays) of a client into accumulated_value,
+        i.e. the sum of the folded_count values folded so far (None for the first value), and return the new sum;
+        numpy arrays are summed in place; non-negative integers are summed modulo largest_prime_non_negative_int54
+        (reduced once per block of values, so the result must be reduced at the end), and wrap-around integers
+        modulo 2^64
+    """
+
+    if isinstance(value, list):
+        if accumulated_value is None:
+            accumulated_value = [None] * len(value)
+
+        if len(accumulated_value) != len(value):
+            raise ValueError('The number of numpy arrays in the parameter values do not match!')
+
+        return [accumulate_parameter(accumulated_array, array, data_type, folded_count)
+                for accumulated_array, array in zip(accumulated_value, value)]
+
+    # the sparse arrays are never summed in place, so they are not copied
+    if isinstance(value, SparseArray):
+        return value if accumulated_value is None else sparse_sum([accumulated_value, value])
+
+    # the first value might be a read-only view of the request body, so copy it
+    if accumulated_value is None:
+        if is_wraparound_integer(data_type):
+            wraparound_dtype = masked_dtype(data_type)
+            return np.array(value, dtype=wraparound_dtype) if isinstance(value, np.ndarray) else wraparound_dtype.type(value)
+        return np.array(value) if isinstance(value, np.ndarray) else value
+
+    if is_non_negative_integer(data_type):
+        return modular_fold(accumulated_value, value, folded_count)
+
+    if is_wraparound_integer(data_type):
+        if isinstance(accumulated_value, np.ndarray) and accumulated_value.shape == np.shape(value):
+            return np.add(accumulated_value, value, out=accumulated_value, casting='unsafe')
+        return wraparound_add(accumulated_value, value, masked_dtype(data_type))
+
+    if isinstance(accumulated_value, np.ndarray) and accumulated_value.shape == np.shape(value) and \
+            np.can_cast(np.result_type(value), accumulated_value.dtype):
+        return np.add(accumulated_value, value, out=accumulated_value)
+
+    return accumulated_value + value
+
+
+def delta_encode(value, base_value):
+    """
+        Compute the delta of the numpy array value against base_value (the value of the previous round) as byte planes,
+        i.e. an array of shape (itemsize, size) whose i-th row is the i-th byte of the delta elements;
+        Unchanged high-order bytes then become long runs of zeros, which the payload compression squeezes out.
+        Return (delta_kind, delta_byte_planes), or None if the delta is not applicable or not cheaper than the value.
+    """
+
+    if not isinstance(value, np.ndarray) or not isinstance(base_value, np.ndarray):
+        return None
+
+    if value.shape != base_value.shape or value.dtype != base_value.dtype or value.size == 0:
+        return None
+
+    if np.issubdtype(value.dtype, np.floating):
+        unsigned_dtype = np.dtype(f'u{value.dtype.itemsize}')
+        delta = np.bitwise_xor(value.reshape(-1).view(unsigned_dtype), base_value.reshape(-1).view(unsigned_dtype))
+        delta_kind = DELTA_XOR
+
+    elif np.issubdtype(value.dtype, np.integer):
+        delta = value.reshape(-1) - base_value.reshape(-1)
+        delta_kind = DELTA_DIFFERENCE
+
+    else:
+        return None
+
+    delta_bytes = delta.view(np.uint8)
+    if np.count_nonzero(delta_bytes) > delta_max_nonzero_ratio * np.count_nonzero(value.reshape(-1).view(np.uint8)):
+        return None
+
+    delta_byte_planes = np.ascontiguousarray(delta_bytes.reshape(-1, value.dtype.itemsize).T)
+
+    return delta_kind, delta_byte_planes
+
+
+def summarize_client_round_metrics(client_round_metrics):
+    """
+        Summarize the (serialized) per-client metrics of the rounds (see ClientRoundMetricsModel) per round:
+        p50/p95/max of each time over the clients, the slowest client of each time, and the critical-path client,
+        i.e. the client whose upload arrived last and hence determined when the round could be aggregated
+    """
+
+    round_client_metrics = dict()
+    for client_metrics in client_round_metrics:
+        round_client_metrics.setdefault(client_metrics['comm_round'], list()).append(client_metrics)
+
+    metric_names = ('upload_delay', 'computation', 'network_send', 'network_receive', 'idle')
+
+    round_summaries = list()
+    for comm_round, client_metrics_list in sorted(round_client_metrics.items()):
+        round_summary = {'comm_round': comm_round,
+                         'client_count': len(client_metrics_list),
+                         'critical_path_client': max(client_metrics_list,
+                                                     key=lambda client_metrics: client_metrics['upload_order'])['username']}
+
+        for metric_name in metric_names:
+            metric_values = np.array([client_metrics[metric_name] for client_metrics in client_metrics_list])
+            round_summary[metric_name] = {'p50': np.round(np.percentile(metric_values, 50), 4).item(),
+                                          'p95': np.round(np.percentile(metric_values, 95), 4).item(),
+                                          'max': np.round(metric_values.max(), 4).item(),
+                                          'slowest_client': client_metrics_list[int(metric_values.argmax())]['username']}
+
+        round_summaries.append(round_summary)
+
+    return round_summaries
+
+
+def decode_request_body(request):
+    """
+        Decode the body of the request, only the first time it is called for the request; the decoded body is cached
+        on the (Django) request as decoded_body, so that the middleware, authentication decorators, and views
+        of the same request do not decompress and decode the body again; bodies larger than CODEC_MAX_BODY_SIZE
+        (decompressed) are rejected
+    """
+
+    http_request = getattr(request, '_request', request)  # the Django request wrapped by the REST framework request
+    if not hasattr(http_request, 'decoded_body'):
+        http_request.decoded_body = codec.decode(http_request.body, settings.CODEC_MAX_BODY_SIZE)
+
+    return http_request.decoded_body
+
+
+def global_parameters_capability(project_id, blob_hash):
+    """
+        Capability of the global parameters blob of the project with the content hash blob_hash: an HMAC (keyed by
+        SECRET_KEY, so the same on all server workers and across restarts) that is only given to the authenticated
+        clients of the project and is part of the URL of the blob, so the blob can be fetched without a request body and
+        cached by any HTTP cache, while the URL cannot be guessed by anyone else
+    """
+
+    return salted_hmac('hyfed_server.global_parameters', f'{project_id}/{blob_hash}', algorithm='sha256').hexdigest()
+
+
+def is_global_parameters_capability_valid(project_id, blob_hash, capability):
+    """ Check (in constant time) whether capability is the capability of the global parameters blob """
+
+    return constant_time_compare(global_parameters_capability(project_id, blob_hash), capability)
@@ -17,7 +17,8 @@
 """
 
 
-from django.http import HttpResponseForbidden, HttpResponseNotFound, HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponseForbidden, HttpResponseNotFound, HttpResponse, HttpResponseBadRequest, \
+    HttpResponseNotModified, StreamingHttpResponse
 from django.contrib.auth import authenticate
 from django.db.models import Q
 
@@ -33,14 +34,25 @@ from hyfed_server.model.hyfed_models import HyFedProjectModel, TokenModel
 from hyfed_server.util.hyfed_parameters import Parameter, AuthenticationParameter, CoordinationParameter, \
      SyncParameter, HyFedProjectParameter
 from hyfed_server.util.pool import ProjectPool
+from hyfed_server.util.executor import AggregationExecutor
+from hyfed_server.util.shard import shard_router
+from hyfed_server.util.snapshot import ProjectSnapshotStore
+from hyfed_server.util.model_writer import model_writer
 from hyfed_server.models import UserModel
-from hyfed_server.serializer.hyfed_serializers import UserSerializer, TokenSerializer, HyFedProjectSerializer
+from hyfed_server.serializer.hyfed_serializers import UserSerializer, TokenSerializer, HyFedProjectSerializer, \
+    RoundMetricsSerializer, ClientRoundMetricsSerializer
+from hyfed_server.util.utils import summarize_client_round_metrics, decode_request_body, \
+    is_global_parameters_capability_valid
 from hyfed_server.mappers import server_project, project_model, project_serializer
-from hyfed_server.util.status import ProjectStatus
+from hyfed_server.util.status import ProjectStatus, ProjectEvent
+from hyfed_server.util import codec
+
+from django.conf import settings
 
 import os
-import pickle
-import threading
+import io
+import csv
+import json
 from shutil import make_archive
 from wsgiref.util import FileWrapper
 
@@ -48,7 +60,22 @@ import logging
 logger = logging.getLogger(__name__)
 
 """  a project pool to keep a copy of the projects in the memory """
-project_pool = ProjectPool()
+project_pool = ProjectPool(ProjectSnapshotStore(settings.PROJECT_SNAPSHOT_DIR, settings.PROJECT_SNAPSHOT_COMPACTION_RECORDS)
+                           if settings.PROJECT_SNAPSHOT_DIR else None)
+aggregation_executor = AggregationExecutor(settings.AGGREGATION_THREAD_COUNT, settings.AGGREGATION_PROCESS_COUNT)
+
+
+def restore_running_projects():
+    """
+        Restore the projects that were running before the server (re)started; called once by the WSGI/ASGI
+        application when the server starts (see wsgi.py), not when the views are imported by the management commands
+        (e.g. migrate), which must not need the database tables and snapshot directory of the projects
+    """
+
+    try:
+        project_pool.restore_projects(aggregation_executor)
+    except Exception as restore_exp:
+        logger.error(f'Failed to restore the projects: {restore_exp}')
 
 
 # ############### Decorator(s) ####################
@@ -59,7 +86,7 @@ def client_authentication(request_handler_function):
     def wrapper(self, request, *params, **kwargs):
         try:
             # extract project_id, username, and token from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
 
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
 
@@ -116,7 +143,7 @@ def compensator_authentication(request_handler_function):
     def wrapper(self, request, *params, **kwargs):
         try:
             # extract project_id, username, and token from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
 
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
 
@@ -166,7 +193,7 @@ class ProjectJoinView(APIView):
             # extract the username, password, and token from the request body
             join_ok = True
 
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
 
             username = authentication_parameters[AuthenticationParameter.USERNAME]
@@ -227,7 +254,7 @@ class ProjectJoinView(APIView):
             join_ok = False
 
         response = {CoordinationParameter.CLIENT_JOINED: join_ok}
-        serialized_response = pickle.dumps(response)
+        serialized_response = codec.encode(response)
 
         return HttpResponse(content=serialized_response)
 
@@ -243,7 +270,7 @@ class ProjectInfoView(APIView):
     def get(self, request):
         try:
             # extract project id, token, and username (just for debugging) from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             project_id = authentication_parameters[AuthenticationParameter.PROJECT_ID]
             token = authentication_parameters[AuthenticationParameter.TOKEN]
@@ -253,7 +280,8 @@ class ProjectInfoView(APIView):
             token_instance = TokenModel.objects.get(id=token)
             tool = token_instance.project.tool
 
-            # get derived project model instance
+            # get derived project model instance with the pending model updates written
+            model_writer.flush()
             derived_instance = project_model[tool].objects.get(id=project_id)
 
             # serialize project general info
@@ -261,7 +289,7 @@ class ProjectInfoView(APIView):
 
             # prepare serialized response
             json_response = {Parameter.PROJECT: serialized_project}
-            serialized_response = pickle.dumps(json_response)
+            serialized_response = codec.encode(json_response)
 
             logger.debug(f"Project {project_id}: {tool} project info serialized to client {username} ...")
 
@@ -281,7 +309,7 @@ class ProjectStartedView(APIView):
     def get(self, request):
         try:
             # extract project id from the request
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             project_id = authentication_parameters[AuthenticationParameter.PROJECT_ID]
             username = authentication_parameters[AuthenticationParameter.USERNAME]
@@ -291,7 +319,7 @@ class ProjectStartedView(APIView):
 
             # get status of the project from the pool and sent it to the client
             response = {CoordinationParameter.PROJECT_STARTED: project_pool.is_running(project_id)}
-            serialized_response = pickle.dumps(response)
+            serialized_response = codec.encode(response)
             return HttpResponse(content=serialized_response)
 
         except Exception as project_started_exception:
@@ -299,6 +327,86 @@ class ProjectStartedView(APIView):
             return HttpResponseBadRequest()
 
 
+class ProjectEventsView(APIView):
+    """
+        Push the project events (i.e. project started, parameters ready, failed, and aborted) to the client as
+        server-sent events over a persistent connection; the client falls back to polling if the channel drops or
+        is disabled (PROJECT_EVENTS_ENABLED); the server closes the channel after PROJECT_EVENTS_MAX_HEARTBEATS
+        heartbeat periods, since it holds a worker thread while open, and the client re-opens it
+    """
+
+    permission_classes = (AllowAny,)
+
+    # a heartbeat comment is sent if no event happens in this period (in seconds) to keep the connection alive
+    heartbeat_period = 15
+
+    @client_authentication
+    def get(self, request):
+        if not settings.PROJECT_EVENTS_ENABLED:
+            return HttpResponse(status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        try:
+            # extract project id and username from the request
+            request_body = decode_request_body(request)
+            authentication_parameters = request_body[Parameter.AUTHENTICATION]
+            project_id = authentication_parameters[AuthenticationParameter.PROJECT_ID]
+            username = authentication_parameters[AuthenticationParameter.USERNAME]
+
+            # the project might not be started yet
+            project = project_pool.get_project(project_id)
+            if project is None:
+                return HttpResponseNotFound()
+
+            logger.debug(f'Project {project_id}: event channel opened for client {username}!')
+
+            http_response = StreamingHttpResponse(self.event_stream(project), content_type='text/event-stream')
+            http_response['Cache-Control'] = 'no-cache'
+            http_response['X-Accel-Buffering'] = 'no'  # prevent nginx from buffering the events
+
+            return http_response
+
+        except Exception as project_events_exception:
+            logger.debug(f'Project {project_id}: {project_events_exception}')
+            return HttpResponseBadRequest()
+
+    def event_stream(self, project):
+        """
+            Generate the server-sent events of the project until it is done, failed, or aborted, or for at most
+            PROJECT_EVENTS_MAX_HEARTBEATS heartbeat periods; the current state of the project is pushed right after
+            the client connects, so nothing is missed when the client re-opens the channel
+        """
+
+        project_status = ProjectStatus.CREATED
+        comm_round = None
+        for _ in range(settings.PROJECT_EVENTS_MAX_HEARTBEATS):
+            new_project_status, new_comm_round = project.wait_for_project_event(project_status, comm_round,
+                                                                                timeout=self.heartbeat_period)
+
+            events = list()
+            if project_status == ProjectStatus.CREATED and new_project_status != ProjectStatus.CREATED:
+                events.append(ProjectEvent.PROJECT_STARTED)
+            if new_project_status != ProjectStatus.CREATED and new_comm_round != comm_round:
+                events.append(ProjectEvent.PARAMETERS_READY)
+            if new_project_status == ProjectStatus.FAILED:
+                events.append(ProjectEvent.FAILED)
+            if new_project_status == ProjectStatus.ABORTED:
+                events.append(ProjectEvent.ABORTED)
+
+            event_data = json.dumps({CoordinationParameter.PROJECT_STATUS: new_project_status,
+                                     CoordinationParameter.COMM_ROUND: new_comm_round})
+            for event in events:
+                yield f'event: {event}\ndata: {event_data}\n\n'
+
+            if not events:
+                yield ': heartbeat\n\n'
+
+            project_status = new_project_status
+            comm_round = new_comm_round
+
+            if project_status in (ProjectStatus.DONE, ProjectStatus.FAILED, ProjectStatus.ABORTED):
+                return
+
+
 class ModelAggregationView(APIView):
     """ Get the clients' parameters and perform aggregation """
 
@@ -309,7 +417,7 @@ class ModelAggregationView(APIView):
         try:
 
             # extract project_id and username from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             project_id = authentication_parameters[AuthenticationParameter.PROJECT_ID]
             username = authentication_parameters[AuthenticationParameter.USERNAME]
@@ -321,16 +429,19 @@ class ModelAggregationView(APIView):
 
             # update client->server traffic counter
             request_size = int(request.headers['Content-Length'])
-            running_project.add_to_client_server_traffic(request_size)
+            running_project.add_to_client_server_traffic(request_size, codec.uncompressed_size(request.body))
 
-            # extract client parameters (e.g. sync and local) from the request body
+            # extract client parameters (e.g. sync and local) from the request body; if parameters from all clients
+            # (and the compensator) received, start aggregation (exactly once, even if the last uploads arrive
+            # simultaneously)
             logger.debug(f'Project {project_id}: extracting client {username} parameters ...')
-            running_project.extract_client_parameters(username, request_body)
+            upload_accepted, aggregation_ready = running_project.add_client_upload(username, request_body)
+            if aggregation_ready:
+                aggregation_executor.submit(project_id, running_project.aggregate)
 
-            # if parameters from all clients received, start aggregation
-            if len(running_project.get_local_parameters()) == len(running_project.get_client_tokens()):
-                aggregation_thread = threading.Thread(target=running_project.aggregate)
-                aggregation_thread.start()
+            # tell the client that its parameters were not used in this round, so that it does not retry the upload
+            if not upload_accepted:
+                return HttpResponse(status=409)
 
         except Exception as model_aggregation_exception:
             logger.debug(f'Project {project_id}: {model_aggregation_exception}')
@@ -342,7 +453,8 @@ class ModelAggregationView(APIView):
 class GlobalModelView(APIView):
     """
         Provide the global parameters to the clients if they are ready (aggregation completed);
-        Otherwise, tell clients to keep inquiring the server.
+        Otherwise, tell clients to keep inquiring the server. If the client asks for long polling, the request is held
+        until the global parameters are ready or the long polling timeout expires.
     """
     permission_classes = (AllowAny,)
 
@@ -350,28 +462,36 @@ class GlobalModelView(APIView):
     def get(self, request):
         try:
             # extract project_id, username, and comm_round from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             sync_parameters = request_body[Parameter.SYNCHRONIZATION]
             project_id = authentication_parameters[AuthenticationParameter.PROJECT_ID]
             username = authentication_parameters[AuthenticationParameter.USERNAME]
             comm_round = sync_parameters[SyncParameter.COMM_ROUND]
+            client_compressions = sync_parameters[SyncParameter.COMPRESSION]
+            global_parameters_round = sync_parameters[SyncParameter.GLOBAL_PARAMETERS_ROUND]
+            long_poll_timeout = sync_parameters[SyncParameter.LONG_POLL_TIMEOUT]
 
             # get the running project from the pool
             running_project = project_pool.get_running_project(project_id)
 
             # update client->server traffic counter
             request_size = int(request.headers['Content-Length'])
-            running_project.add_to_client_server_traffic(request_size)
+            running_project.add_to_client_server_traffic(request_size, codec.uncompressed_size(request.body))
+
+            # hold the request until the global parameters are ready or the long polling timeout expires
+            running_project.wait_for_comm_round_change(client_comm_round=comm_round, timeout=long_poll_timeout)
 
             # prepare parameters sent to the clients (e.g. coordination and global parameters if ready)
             logger.debug(f'Project {project_id}: preparing client parameters ...')
             client_parameters_serialized = running_project.prepare_client_parameters(client_username=username,
-                                                                                     client_comm_round=comm_round)
+                                                                                     client_comm_round=comm_round,
+                                                                                     client_compressions=client_compressions,
+                                                                                     client_global_parameters_round=global_parameters_round)
 
             # update server->client traffic counter
             response_size = len(client_parameters_serialized)
-            running_project.add_to_server_client_traffic(response_size)
+            running_project.add_to_server_client_traffic(response_size, codec.uncompressed_size(client_parameters_serialized))
 
             return HttpResponse(content=client_parameters_serialized)
         except Exception as global_model_exception:
@@ -379,6 +499,54 @@ class GlobalModelView(APIView):
             return HttpResponseBadRequest()
 
 
+class GlobalParametersView(APIView):
+    """
+        Provide the clients of the project with the serialized (client agnostic) global parameters specified by their
+        content hash; the URL carries the capability of the blob, which is only given to the authenticated clients of
+        the project (see global_parameters_capability), so no request body is needed and, since the blob never changes
+        for a given hash, the response can be served by any HTTP cache (e.g. nginx) in front of the server
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request, project_id, blob_hash, capability):
+        try:
+            if not is_global_parameters_capability_valid(project_id, blob_hash, capability):
+                logger.debug(f'Project {project_id}: invalid capability for the global parameters {blob_hash}!')
+                return HttpResponseForbidden()
+
+            running_project = project_pool.get_running_project(project_id)
+            if running_project is None:
+                return HttpResponseNotFound()
+
+            # the blob is looked up before answering Not Modified, so a hash that was never produced is not found
+            blob = running_project.get_global_parameters_blob(blob_hash)
+            if blob is None:
+                return HttpResponseNotFound()
+
+            # the content hash of the blob serves as its entity tag
+            entity_tag = f'"{blob_hash}"'
+            cache_control = 'public, max-age=31536000, immutable'
+
+            if request.headers.get('If-None-Match') == entity_tag:
+                http_response = HttpResponseNotModified()
+                http_response['ETag'] = entity_tag
+                http_response['Cache-Control'] = cache_control
+                return http_response
+
+            # update server->client traffic counter
+            running_project.add_to_server_client_traffic(len(blob), codec.uncompressed_size(blob))
+
+            http_response = HttpResponse(content=blob, content_type='application/octet-stream')
+            http_response['ETag'] = entity_tag
+            http_response['Cache-Control'] = cache_control
+
+            return http_response
+        except Exception as global_parameters_exception:
+            logger.debug(f'Project {project_id}: {global_parameters_exception}')
+            return HttpResponseBadRequest()
+
+
 class ResultDownloadView(APIView):
     """ Provides the clients with the result file """
 
@@ -388,7 +556,7 @@ class ResultDownloadView(APIView):
         try:
 
             # extract project_id and username (for debugging purposes) from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             project_id = authentication_parameters[AuthenticationParameter.PROJECT_ID]
             username = authentication_parameters[AuthenticationParameter.USERNAME]  # for debugging purposes
@@ -423,7 +591,7 @@ class ProjectAuthenticationView(APIView):
     def get(self, request):
         try:
             # extract the hash of the project ID from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             hash_project_id = authentication_parameters[AuthenticationParameter.HASH_PROJECT_ID]
 
@@ -443,9 +611,10 @@ class ProjectAuthenticationView(APIView):
             client_count = -1
 
         response = {AuthenticationParameter.PROJECT_AUTHENTICATED: auth_ok,
-                    HyFedProjectParameter.CLIENT_COUNT: client_count}
+                    HyFedProjectParameter.CLIENT_COUNT: client_count,
+                    HyFedProjectParameter.COMPRESSION: codec.available_compressions()}
 
-        serialized_response = pickle.dumps(response)
+        serialized_response = codec.encode(response)
 
         return HttpResponse(content=serialized_response)
 
@@ -460,7 +629,7 @@ class ModelCompensationView(APIView):
         try:
 
             # extract the hash of the project ID from the request body
-            request_body = pickle.loads(request.body)
+            request_body = decode_request_body(request)
             authentication_parameters = request_body[Parameter.AUTHENTICATION]
             hash_project_id = authentication_parameters[AuthenticationParameter.HASH_PROJECT_ID]
 
@@ -470,19 +639,22 @@ class ModelCompensationView(APIView):
 
             logger.debug(f"Project {project_id}: compensator parameters received!")
 
-            # if compensator parameters already received, ignore the request
-            if running_project.is_compensator_parameters_received():
-                logger.debug(f'Project {project_id}: compensator parameters ignored because they have been already received!')
-                return HttpResponseBadRequest()
-
             # add traffic size to compensator -> server traffic counter
             request_size = int(request.headers['Content-Length'])
-            running_project.add_to_compensator_server_traffic(request_size)
+            running_project.add_to_compensator_server_traffic(request_size, codec.uncompressed_size(request.body))
+
+            # init compensator parameters of the corresponding project; if compensator parameters already received,
+            # ignore the request, which is answered with OK so that the compensator does not retry it
+            if not running_project.add_compensator_upload(request_body):
+                logger.debug(f'Project {project_id}: compensator parameters ignored because they have been already received!')
+                return HttpResponse()
 
-            # init compensator parameters of the corresponding project
-            running_project.set_compensator_parameters(request_body)
             logger.debug(f'Project {project_id}: compensator parameters initialized.')
 
+            # start the aggregation if the parameters of all clients have been received before
+            if running_project.claim_aggregation():
+                aggregation_executor.submit(project_id, running_project.aggregate)
+
         except Exception as model_compensation_exception:
             logger.debug(f'Project {project_id}: {model_compensation_exception}')
             return HttpResponseBadRequest()
@@ -517,6 +689,27 @@ class UserInfo(APIView):
         return Response(UserSerializer().to_representation(request.user))
 
 
+class ProjectPoolMetricsView(APIView):
+    """ Provide the number of projects in the pool and the backlog of the clean-up reaper """
+
+    def get(self, request):
+        return Response(project_pool.get_clean_up_metrics())
+
+
+class AggregationMetricsView(APIView):
+    """ Provide the queue depth and task counters of the aggregation executor """
+
+    def get(self, request):
+        return Response(aggregation_executor.get_metrics())
+
+
+class ModelWriterMetricsView(APIView):
+    """ Provide the number of the requested/written model updates of the model writer """
+
+    def get(self, request):
+        return Response(model_writer.get_metrics())
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """ Show the list of users """
     queryset = UserModel.objects.all()
@@ -542,9 +735,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
             # create the project and save the corresponding model instance in the database
             derived_project = server_project[tool](request, project_model[tool])
 
-            # add the project to the project pool
+            # add the project to the project pool; the CPU-heavy aggregation is offloaded to the aggregation executor
+            derived_project.set_aggregation_executor(aggregation_executor)
             project_pool.add_project(derived_project)
 
+            # record this worker as the owner of the project, so that its requests are routed here
+            shard_router.assign_project(derived_project.get_project_id())
+
             # ######### serialize the project
             data = request.data
             context = {'request': request}
@@ -562,6 +759,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """ Show the project(s) """
         try:
+            # the webapp sees the latest status, step, comm_round, times, and traffic of the projects
+            model_writer.flush()
+
             # if request url is in the form of /projects/project_id/
             if len(str(self.request.path).split('/')) == 4:
                 # extract project id from url
@@ -641,6 +841,64 @@ class ProjectViewSet(viewsets.ModelViewSet):
             logger.debug(io_exception)
             return HttpResponseBadRequest()
 
+    @action(detail=True)
+    def round_metrics(self, request, *args, **kwargs):
+        """ Export the per-round runtime and traffic statistics of the project (as a csv file if output=csv) """
+
+        try:
+            project_instance = self.get_object()
+            project_id = project_instance.id
+            round_metrics = RoundMetricsSerializer(many=True).to_representation(project_instance.round_metrics.all())
+
+            if request.query_params.get('output') != 'csv':
+                return Response(round_metrics)
+
+            csv_file = io.StringIO()
+            csv_writer = csv.DictWriter(csv_file, fieldnames=RoundMetricsSerializer.Meta.fields)
+            csv_writer.writeheader()
+            csv_writer.writerows(round_metrics)
+
+            http_response = HttpResponse(csv_file.getvalue(), content_type='text/csv')
+            http_response['Content-Disposition'] = f'attachment; filename="{project_id}-round-metrics.csv"'
+
+            logger.debug(f"Project {project_id}: round metrics exported by participant {request.user}!")
+
+            return http_response
+        except Exception as export_exception:
+            logger.debug(export_exception)
+            return HttpResponseBadRequest()
+
+    @action(detail=True)
+    def client_metrics(self, request, *args, **kwargs):
+        """
+            Provide the p50/p95/max of the client times and the critical-path (i.e. last uploading) client of each
+            round of the project; the per-client per-round times are exported as a csv file if output=csv
+        """
+
+        try:
+            project_instance = self.get_object()
+            project_id = project_instance.id
+            client_round_metrics = ClientRoundMetricsSerializer(many=True).to_representation(
+                project_instance.client_round_metrics.all())
+
+            if request.query_params.get('output') != 'csv':
+                return Response(summarize_client_round_metrics(client_round_metrics))
+
+            csv_file = io.StringIO()
+            csv_writer = csv.DictWriter(csv_file, fieldnames=ClientRoundMetricsSerializer.Meta.fields)
+            csv_writer.writeheader()
+            csv_writer.writerows(client_round_metrics)
+
+            http_response = HttpResponse(csv_file.getvalue(), content_type='text/csv')
+            http_response['Content-Disposition'] = f'attachment; filename="{project_id}-client-metrics.csv"'
+
+            logger.debug(f"Project {project_id}: client metrics exported by participant {request.user}!")
+
+            return http_response
+        except Exception as export_exception:
+            logger.debug(export_exception)
+            return HttpResponseBadRequest()
+
 
 class TokenViewSet(viewsets.ModelViewSet):
     """ List the tokens of the project """
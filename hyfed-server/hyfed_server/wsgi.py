@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hyfed_server.settings')
 
 application = get_wsgi_application()
+
+# restore the projects that were running before the server (re)started, once the apps are loaded; here rather than
+# in the views module, because the management commands (e.g. migrate) import the views too
+from hyfed_server.view.hyfed_views import restore_running_projects  # noqa: E402
+restore_running_projects()
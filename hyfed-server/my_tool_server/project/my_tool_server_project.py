@@ -33,6 +33,10 @@ logger = logging.getLogger(__name__)
 class MyToolServerProject(HyFedServerProject):
     """ Server side of MyTool project """
 
+    # the MyTool coordination and global attributes that are saved in the snapshots of the project; the other MyTool
+    # attributes must be added to transient_attributes (see HyFedServerProject), otherwise no snapshot is saved
+    snapshot_attributes = HyFedServerProject.snapshot_attributes | frozenset()
+
     def __init__(self, creation_request, project_model):
         """ Initialize MyTool project attributes based on the values set by the coordinator """
 
@@ -35,12 +35,21 @@ logger = logging.getLogger(__name__)
 class StatsServerProject(HyFedServerProject):
     """ Server side of Stats project """
 
+    # the Stats (hyper-)parameters and global attributes are saved in the snapshots of the project
+    snapshot_attributes = HyFedServerProject.snapshot_attributes | {
+        'features', 'learning_rate', 'max_iterations', 'current_iteration',
+        'global_sample_count', 'global_mean', 'global_variance', 'global_beta'
+    }
+
     def __init__(self, creation_request, project_model):
         """ Initialize Stats project attributes based on the values set by the coordinator """
 
         # initialize base project
         super().__init__(creation_request, project_model)
 
+        # all Stats parameters are aggregated by summation, so fold them into running sums as they arrive
+        self.set_streaming_aggregation(True)
+
         try:
             # save project (hyper-)parameters in the project model and initialize the project
             stats_model_instance = project_model.objects.get(id=self.project_id)
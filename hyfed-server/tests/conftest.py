@@ -0,0 +1,29 @@
+"""
+    Configure Django for the tests that need the server settings or models; the tests of the utility modules that
+    do not use Django run without it
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import os
+
+try:
+    import django
+except ImportError:
+    django = None
+
+if django is not None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hyfed_server.settings')
+    django.setup()
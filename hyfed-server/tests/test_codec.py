@@ -0,0 +1,122 @@
+"""
+    Test the binary codec: the decoded payload must equal the encoded value with and without compression, and
+    payloads that are malformed, of another codec version, or larger than the maximum body size must be rejected
+    (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.util import codec
+from hyfed_server.util.codec import Compression
+from hyfed_server.util.data_type import DataType
+from hyfed_server.util.parameter_pack import ParameterPack
+from hyfed_server.util.sparse import SparseArray
+
+import numpy as np
+import pytest
+import struct
+
+# offsets of the version and body size fields in the header (see codec._HEADER)
+version_offset = 4
+body_size_offset = 24
+
+
+def sample_value():
+    parameters = {'weights': np.arange(12, dtype=np.float64).reshape(3, 4), 'count': 7,
+                  'layers': [np.ones(5, dtype=np.float32), np.zeros((2, 2), dtype=np.float32)]}
+
+    return {'none': None, 'flags': (True, False), 'int': -3, 'big_int': 2 ** 80, 'float': 0.5, 'str': 'hyfed',
+            'bytes': b'\x00\x01', 'scalar': np.int32(9), 'array': np.arange(3000, dtype=np.int64),
+            'pack': ParameterPack.pack(parameters, {'weights': DataType.NUMPY_ARRAY_FLOAT}),
+            'sparse': SparseArray.from_dense(np.array([0.0, 2.0, 0.0, 4.0]))}
+
+
+def assert_decoded_equal(decoded_value, value):
+    assert decoded_value.keys() == value.keys()
+    for key in ['none', 'flags', 'int', 'big_int', 'float', 'str', 'bytes']:
+        assert decoded_value[key] == value[key]
+
+    assert decoded_value['scalar'] == value['scalar'] and decoded_value['scalar'].dtype == np.int32
+    assert np.array_equal(decoded_value['array'], value['array'])
+
+    decoded_parameters = decoded_value['pack'].unpack()
+    parameters = value['pack'].unpack()
+    assert decoded_parameters.keys() == parameters.keys()
+    assert np.array_equal(decoded_parameters['weights'], parameters['weights'])
+    assert decoded_parameters['count'] == parameters['count']
+    assert all(np.array_equal(decoded_array, array) and decoded_array.dtype == array.dtype
+               for decoded_array, array in zip(decoded_parameters['layers'], parameters['layers']))
+
+    assert np.array_equal(decoded_value['sparse'].to_dense(), value['sparse'].to_dense())
+
+
+@pytest.mark.parametrize('compression', [Compression.NONE] + codec.available_compressions())
+def test_round_trip(compression):
+    value = sample_value()
+    payload = codec.encode(value, compression)
+
+    assert_decoded_equal(codec.decode(payload), value)
+    assert codec.uncompressed_size(payload) == len(codec.encode(value))
+
+
+def test_compressible_payload_is_compressed():
+    value = {'zeros': np.zeros(100000)}
+    payload = codec.encode(value, Compression.ZLIB)
+
+    assert len(payload) < codec.uncompressed_size(payload) // 10
+    assert np.array_equal(codec.decode(payload)['zeros'], value['zeros'])
+
+
+def test_decoded_arrays_are_read_only():
+    decoded_array = codec.decode(codec.encode(np.arange(10)))
+
+    assert not decoded_array.flags.writeable
+
+
+@pytest.mark.parametrize('compression', [Compression.NONE, Compression.ZLIB])
+def test_body_larger_than_maximum_is_rejected(compression):
+    payload = codec.encode({'zeros': np.zeros(100000)}, compression)
+
+    with pytest.raises(ValueError, match='exceeds the maximum body size'):
+        codec.decode(payload, max_body_size=codec.uncompressed_size(payload) // 2)
+
+
+def test_body_decompressing_beyond_its_declared_size_is_rejected():
+    payload = bytearray(codec.encode({'zeros': np.zeros(100000)}, Compression.ZLIB))
+    declared_size, = struct.unpack_from('<Q', payload, body_size_offset)
+
+    # a (forged) header that declares a small body in front of a compressed body that is 1000 times larger
+    struct.pack_into('<Q', payload, body_size_offset, declared_size // 1000)
+
+    with pytest.raises(ValueError, match='larger than its declared body size'):
+        codec.decode(bytes(payload))
+
+
+def test_other_codec_version_is_rejected():
+    payload = bytearray(codec.encode({'a': 1}))
+    payload[version_offset] = codec.CODEC_VERSION - 1
+
+    with pytest.raises(ValueError, match='version'):
+        codec.decode(bytes(payload))
+
+
+def test_truncated_payload_is_rejected():
+    payload = codec.encode({'array': np.arange(100)})
+
+    with pytest.raises(ValueError):
+        codec.decode(payload[:-8])
+
+    with pytest.raises(ValueError):
+        codec.decode(payload[:3])
@@ -0,0 +1,83 @@
+"""
+    Test the delta encoding of the global parameters: the value reconstructed from the byte planes and the value of
+    the previous round must be bit-identical to the value, and the delta must only be used if it is cheaper
+    (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import pytest
+
+pytest.importorskip('django')  # hyfed_server.util.utils imports the Django settings
+
+from hyfed_server.util.utils import delta_encode, DELTA_XOR, DELTA_DIFFERENCE
+
+import numpy as np
+
+
+def reconstruct(delta_kind, delta_byte_planes, base_value):
+    """ Reconstruct the value from its delta as the client does (see delta_decode in hyfed_client.util.utils) """
+
+    delta_bytes = np.ascontiguousarray(delta_byte_planes.T).reshape(-1)
+    base_values = base_value.reshape(-1)
+
+    if delta_kind == DELTA_XOR:
+        unsigned_dtype = np.dtype(f'u{base_value.dtype.itemsize}')
+        value = np.bitwise_xor(base_values.view(unsigned_dtype), delta_bytes.view(unsigned_dtype))
+        return value.view(base_value.dtype).reshape(base_value.shape)
+
+    return (base_values + delta_bytes.view(base_value.dtype)).reshape(base_value.shape)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_float_delta_is_bit_exact(dtype):
+    generator = np.random.default_rng(0)
+    base_value = generator.normal(size=(50, 20)).astype(dtype)
+    value = base_value.copy()
+    value[::7] += dtype(1e-3)  # a few slightly changed rows, e.g. after one more gradient step
+
+    delta_kind, delta_byte_planes = delta_encode(value, base_value)
+
+    assert delta_kind == DELTA_XOR
+    assert delta_byte_planes.shape == (value.dtype.itemsize, value.size)
+    assert reconstruct(delta_kind, delta_byte_planes, base_value).tobytes() == value.tobytes()
+
+
+def test_integer_delta_wraps_around():
+    base_value = np.full(1000, np.iinfo(np.int64).max, dtype=np.int64)
+    value = base_value.copy()
+    value[:10] = np.iinfo(np.int64).min  # the difference overflows int64
+
+    delta_kind, delta_byte_planes = delta_encode(value, base_value)
+
+    assert delta_kind == DELTA_DIFFERENCE
+    assert np.array_equal(reconstruct(delta_kind, delta_byte_planes, base_value), value)
+
+
+def test_delta_is_not_used_if_not_cheaper():
+    generator = np.random.default_rng(1)
+    base_value = generator.normal(size=1000)
+
+    # an unrelated value, i.e. all bytes change
+    assert delta_encode(generator.normal(size=1000), base_value) is None
+
+
+def test_delta_is_not_applicable():
+    base_value = np.zeros(10)
+
+    assert delta_encode(np.zeros(11), base_value) is None
+    assert delta_encode(np.zeros(10, dtype=np.float32), base_value) is None
+    assert delta_encode(1.0, base_value) is None
+    assert delta_encode(np.zeros(0), np.zeros(0)) is None
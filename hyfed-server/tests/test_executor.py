@@ -0,0 +1,132 @@
+"""
+    Test the aggregation executor: the tasks of a project must run one at a time in the order they were submitted,
+    the tasks of different projects must run concurrently, and the scheduled tasks must be submitted when they are due
+    (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.util.executor import AggregationExecutor
+
+import threading
+import random
+import time
+
+wait_timeout = 10  # in seconds; only reached if the executor is broken
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + wait_timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def test_tasks_of_project_run_in_order_one_at_a_time():
+    executor = AggregationExecutor(thread_count=8)
+    task_count = 100
+
+    executed_tasks = list()
+    running_tasks = set()
+    overlaps = list()
+
+    def task(task_index):
+        if running_tasks:
+            overlaps.append(task_index)
+        running_tasks.add(task_index)
+        time.sleep(random.random() * 0.001)
+        executed_tasks.append(task_index)
+        running_tasks.discard(task_index)
+
+    for task_index in range(task_count):
+        executor.submit('project-1', task, task_index)
+
+    wait_until(lambda: len(executed_tasks) == task_count)
+
+    assert executed_tasks == list(range(task_count))
+    assert overlaps == []
+    wait_until(lambda: executor.get_metrics()['active_project_count'] == 0)
+
+
+def test_tasks_of_different_projects_run_concurrently():
+    executor = AggregationExecutor(thread_count=2)
+
+    # each task only finishes if the task of the other project runs at the same time
+    barrier = threading.Barrier(2, timeout=wait_timeout)
+    finished_projects = list()
+
+    def task(project_key):
+        barrier.wait()
+        finished_projects.append(project_key)
+
+    executor.submit('project-1', task, 'project-1')
+    executor.submit('project-2', task, 'project-2')
+
+    wait_until(lambda: len(finished_projects) == 2)
+    assert sorted(finished_projects) == ['project-1', 'project-2']
+
+
+def test_failed_task_does_not_block_next_task():
+    executor = AggregationExecutor(thread_count=1)
+    executed_tasks = list()
+
+    def failing_task():
+        raise ValueError('aggregation failed')
+
+    executor.submit('project-1', failing_task)
+    executor.submit('project-1', executed_tasks.append, 'next')
+
+    wait_until(lambda: executed_tasks == ['next'])
+    wait_until(lambda: executor.get_metrics()['completed_task_count'] == 2)
+
+    metrics = executor.get_metrics()
+    assert metrics['failed_task_count'] == 1
+    assert metrics['queued_task_count'] == 0 and metrics['running_task_count'] == 0
+
+
+def test_scheduled_task_runs_when_due():
+    executor = AggregationExecutor(thread_count=1)
+    run_times = list()
+
+    schedule_time = time.monotonic()
+    executor.schedule(0.2, 'project-1', lambda: run_times.append(time.monotonic()))
+
+    wait_until(lambda: run_times)
+    assert run_times[0] - schedule_time >= 0.2
+    assert executor.get_metrics()['scheduled_task_count'] == 0
+
+
+def test_scheduler_wakes_up_for_earlier_task():
+    executor = AggregationExecutor(thread_count=2)
+    executed_tasks = list()
+
+    # the scheduler waits for the later task when the earlier one is scheduled
+    executor.schedule(60, 'project-1', executed_tasks.append, 'later')
+    time.sleep(0.05)
+    executor.schedule(0.05, 'project-2', executed_tasks.append, 'earlier')
+
+    wait_until(lambda: executed_tasks)
+    assert executed_tasks == ['earlier']
+    assert executor.get_metrics()['scheduled_task_count'] == 1
+
+
+def test_run_in_process():
+    assert AggregationExecutor(thread_count=1).run_in_process(pow, 3, 4) == 81
+
+    executor = AggregationExecutor(thread_count=1, process_count=1)
+    try:
+        assert executor.run_in_process(pow, 2, 10) == 1024
+    finally:
+        executor.process_pool.shutdown()
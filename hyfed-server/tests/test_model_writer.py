@@ -0,0 +1,157 @@
+"""
+    Test the write-behind model writer: the updates of each instance must be coalesced into one update of the changed
+    fields (with the auto_now fields set), written in the background, and a failed write must be raised by the next
+    update of each of its instances (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import pytest
+
+pytest.importorskip('django')  # the model writer of the server is created from the Django settings
+
+from hyfed_server.util import model_writer as model_writer_module
+from hyfed_server.util.model_writer import ModelWriter
+
+from types import SimpleNamespace
+import contextlib
+import time
+
+wait_timeout = 10  # in seconds
+
+
+class FakeManager:
+    """ Records the update() and bulk_create() calls instead of writing them to the database """
+
+    def __init__(self):
+        self.updates = list()
+        self.created_instances = list()
+        self.failing = False
+
+    def filter(self, id):
+        def update(**field_values):
+            if self.failing:
+                raise IOError('database is locked')
+            self.updates.append((id, field_values))
+            return 1
+
+        return SimpleNamespace(update=update)
+
+    def bulk_create(self, instances, ignore_conflicts=False):
+        if self.failing:
+            raise IOError('database is locked')
+        self.created_instances.extend(instances)
+
+
+def fake_model_class():
+    class FakeModel:
+        _meta = SimpleNamespace(concrete_fields=[SimpleNamespace(name='status'),
+                                                 SimpleNamespace(name='updated_at', auto_now=True)])
+        objects = FakeManager()
+
+    return FakeModel
+
+
+@pytest.fixture(autouse=True)
+def no_database_transaction(monkeypatch):
+    monkeypatch.setattr(model_writer_module, 'transaction', SimpleNamespace(atomic=contextlib.nullcontext))
+
+
+def test_updates_of_instance_are_coalesced():
+    model_class = fake_model_class()
+    model_writer = ModelWriter(flush_interval=60000)
+
+    model_writer.update(model_class, 1, status='Created', step='Init')
+    model_writer.update(model_class, 1, step='Result')
+    model_writer.update(model_class, 2, status='Done')
+    assert model_class.objects.updates == []
+
+    model_writer.flush()
+
+    updates = dict(model_class.objects.updates)
+    assert len(model_class.objects.updates) == 2
+    assert updates['1'].pop('updated_at') is not None and updates['2'].pop('updated_at') is not None
+    assert updates == {'1': {'status': 'Created', 'step': 'Result'}, '2': {'status': 'Done'}}
+
+    metrics = model_writer.get_metrics()
+    assert metrics['requested_update_count'] == 3 and metrics['written_update_count'] == 2
+    assert metrics['pending_instance_count'] == 0
+
+
+def test_updates_are_written_behind():
+    model_class = fake_model_class()
+    model_writer = ModelWriter(flush_interval=10)
+
+    model_writer.update(model_class, 1, status='Running')
+    model_writer.create(model_class())
+
+    deadline = time.monotonic() + wait_timeout
+    while model_writer.get_metrics()['flush_count'] == 0:
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+    assert [instance_id for instance_id, _ in model_class.objects.updates] == ['1']
+    assert len(model_class.objects.created_instances) == 1
+
+
+def test_new_instances_are_created_in_order():
+    model_class = fake_model_class()
+    model_writer = ModelWriter(flush_interval=60000)
+
+    instances = [model_class() for _ in range(3)]
+    for instance in instances:
+        model_writer.create(instance)
+    model_writer.flush()
+
+    assert model_class.objects.created_instances == instances
+    assert model_writer.get_metrics()['created_instance_count'] == 3
+
+
+def test_failed_flush_is_raised_by_next_update():
+    model_class = fake_model_class()
+    model_writer = ModelWriter(flush_interval=60000)
+
+    model_class.objects.failing = True
+    model_writer.update(model_class, 1, status='Running')
+    with pytest.raises(IOError):
+        model_writer.flush()
+
+    # the lost update fails the next update of the instance, only once, but not the updates of other instances
+    model_class.objects.failing = False
+    model_writer.update(model_class, 2, status='Running')
+    with pytest.raises(RuntimeError, match='database is locked'):
+        model_writer.update(model_class, 1, status='Done')
+    model_writer.update(model_class, 1, status='Failed')
+    model_writer.flush()
+
+    assert dict(model_class.objects.updates)['1']['status'] == 'Failed'
+    assert model_writer.get_metrics()['failed_flush_count'] == 1
+
+
+def test_synchronous_write_raises_right_away():
+    model_class = fake_model_class()
+    model_writer = ModelWriter(flush_interval=0)
+
+    model_writer.update(model_class, 1, status='Running')
+    assert len(model_class.objects.updates) == 1
+
+    model_class.objects.failing = True
+    with pytest.raises(IOError):
+        model_writer.update(model_class, 1, status='Done')
+
+    # the error was already raised to the caller, so it is not raised again
+    model_class.objects.failing = False
+    model_writer.update(model_class, 1, status='Failed')
+    assert model_class.objects.updates[-1][1]['status'] == 'Failed'
@@ -0,0 +1,145 @@
+"""
+    Test the shard routing: the requests of a project must be routed to its shard by the path or the routing headers
+    without decoding the body, the routing table must be cached, and the forwarded requests must reach the shard with
+    their body (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import pytest
+
+pytest.importorskip('django')  # the shard router reads the project model and builds Django responses
+
+from hyfed_server.util import shard as shard_module
+from hyfed_server.util.shard import ShardRouter
+from hyfed_server.util.endpoint import EndPoint, RoutingHeader
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+import threading
+import hashlib
+
+project_id = '0f8fad5b-d9cb-469f-a165-70867728950e'
+hash_project_id = hashlib.sha256(project_id.encode('utf-8')).hexdigest()
+
+
+class FakeProjectModel:
+    """ Project model with the shard of a single project; counts the lookups """
+
+    lookups = list()
+
+    class objects:
+        @staticmethod
+        def filter(**lookup):
+            FakeProjectModel.lookups.append(lookup)
+            found = lookup.get('id') == project_id or lookup.get('hash_id') == hash_project_id
+            return SimpleNamespace(values_list=lambda field, flat: SimpleNamespace(first=lambda: 1 if found else None))
+
+
+@pytest.fixture
+def shard_router(monkeypatch):
+    FakeProjectModel.lookups = list()
+    monkeypatch.setattr(shard_module, 'HyFedProjectModel', FakeProjectModel)
+
+    return ShardRouter(['http://127.0.0.1:8000', 'http://127.0.0.1:8001'], shard_index=0)
+
+
+def fake_request(path, headers=None, method='GET', body=b''):
+    return SimpleNamespace(path=path, method=method, headers=headers or dict(), body=body,
+                           get_full_path=lambda: path)
+
+
+def test_sharded_router(shard_router):
+    assert shard_router.is_sharded()
+    assert shard_router.is_local(0) and shard_router.is_local(None) and not shard_router.is_local(1)
+    assert not ShardRouter(['http://127.0.0.1:8000'], shard_index=0).is_sharded()
+
+
+def test_route_by_project_header(shard_router):
+    request = fake_request(f'/{EndPoint.MODEL_AGGREGATION}', {RoutingHeader.PROJECT_ID: project_id})
+
+    assert shard_router.route(request) == 1
+    assert shard_router.route(request) == 1
+    assert FakeProjectModel.lookups == [{'id': project_id}]  # the second lookup is cached
+
+
+def test_route_by_project_hash_header(shard_router):
+    request = fake_request(f'/{EndPoint.MODEL_COMPENSATION}', {RoutingHeader.HASH_PROJECT_ID: hash_project_id})
+
+    assert shard_router.route(request) == 1
+    assert shard_router.route(request) == 1
+    assert FakeProjectModel.lookups == [{'hash_id': hash_project_id}]
+
+
+def test_route_by_global_parameters_path(shard_router):
+    request = fake_request(f'/{EndPoint.GLOBAL_PARAMETERS}{project_id}/{"0" * 64}/{"1" * 64}/')
+
+    assert shard_router.route(request) == 1
+
+
+def test_unknown_or_missing_project_is_not_routed(shard_router):
+    assert shard_router.route(fake_request(f'/{EndPoint.MODEL_AGGREGATION}')) is None
+    assert shard_router.route(fake_request(f'/{EndPoint.MODEL_AGGREGATION}',
+                                           {RoutingHeader.HASH_PROJECT_ID: '0' * 64})) is None
+
+
+def test_assigned_project_is_routed_without_lookup(shard_router, monkeypatch):
+    monkeypatch.setattr(FakeProjectModel.objects, 'filter',
+                        staticmethod(lambda **lookup: SimpleNamespace(update=lambda **fields: 1)))
+
+    other_project_id = '7c9e6679-7425-40de-944b-e07fc1f90ae7'
+    shard_router.assign_project(other_project_id)
+    other_hash_project_id = hashlib.sha256(other_project_id.encode('utf-8')).hexdigest()
+
+    assert shard_router.route(fake_request('/', {RoutingHeader.PROJECT_ID: other_project_id})) == 0
+    assert shard_router.route(fake_request('/', {RoutingHeader.HASH_PROJECT_ID: other_hash_project_id})) == 0
+
+
+def test_forwarded_request_reaches_shard(shard_router):
+    received_requests = list()
+
+    class ShardHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received_requests.append((self.path, self.headers, body))
+            self.send_response(201)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(b'aggregated')
+
+        def log_message(self, *args):
+            pass
+
+    shard_server = HTTPServer(('127.0.0.1', 0), ShardHandler)
+    threading.Thread(target=shard_server.serve_forever, daemon=True).start()
+    try:
+        shard_router.shard_urls[1] = f'http://127.0.0.1:{shard_server.server_port}'
+        request = fake_request(f'/{EndPoint.MODEL_AGGREGATION}', {RoutingHeader.PROJECT_ID: project_id,
+                                                                   'Content-Type': 'application/octet-stream'},
+                               method='POST', body=b'local parameters')
+
+        response = shard_router.forward(request, 1)
+    finally:
+        shard_server.shutdown()
+        shard_server.server_close()
+
+    assert response.status_code == 201
+    assert response.content == b'aggregated'
+    assert response['Cache-Control'] == 'no-cache'
+
+    path, headers, body = received_requests[0]
+    assert path == f'/{EndPoint.MODEL_AGGREGATION}' and body == b'local parameters'
+    assert headers[ShardRouter.FORWARDED_HEADER] == '1'
@@ -0,0 +1,88 @@
+"""
+    Test the summation of the packed local parameters in the shared memory: the result row must be the sum of the
+    rows with the arithmetic of the data type, both in the server process and in a worker process
+    (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import pytest
+
+pytest.importorskip('django')  # hyfed_server.util.utils imports the Django settings
+
+from hyfed_server.util.data_type import DataType
+from hyfed_server.util.modular import largest_prime_non_negative_int54
+from hyfed_server.util.shared_aggregation import create_shared_array, release_shared_memory, sum_shared_rows
+from hyfed_server.util.executor import AggregationExecutor
+
+import numpy as np
+
+client_count = 5
+element_count = 1000
+
+
+def sum_rows(rows, data_type, executor=None):
+    """ Sum the rows in a shared array (one more row for the result) as the server does; return the result row """
+
+    shared_memory, shared_array = create_shared_array((len(rows) + 1, rows[0].size), rows[0].dtype)
+    try:
+        shared_array[:len(rows)] = rows
+        lane_sum_arguments = (shared_memory.name, shared_array.shape, shared_array.dtype.str, data_type,
+                              list(range(len(rows))), len(rows))
+
+        if executor is None:
+            sum_shared_rows(*lane_sum_arguments)
+        else:
+            executor.run_in_process(sum_shared_rows, *lane_sum_arguments)
+
+        result = shared_array[len(rows)].copy()
+        del shared_array
+        return result
+
+    finally:
+        release_shared_memory(shared_memory)
+
+
+def test_float_rows_are_summed():
+    rows = np.random.default_rng(0).normal(size=(client_count, element_count))
+
+    assert np.allclose(sum_rows(rows, DataType.NUMPY_ARRAY_FLOAT), rows.sum(axis=0))
+    assert np.allclose(sum_rows(rows, None), rows.sum(axis=0))
+
+
+def test_modular_rows_are_summed_and_reduced():
+    rows = np.full((client_count, element_count), largest_prime_non_negative_int54 - 1, dtype=np.int64)
+
+    expected_sum = (client_count * (largest_prime_non_negative_int54 - 1)) % largest_prime_non_negative_int54
+    assert np.all(sum_rows(rows, DataType.NUMPY_ARRAY_NON_NEGATIVE_INTEGER) == expected_sum)
+
+
+def test_wraparound_rows_wrap_around():
+    rows = np.full((client_count, element_count), np.iinfo(np.int32).max, dtype=np.int32)
+
+    expected_sum = np.full(element_count, client_count * np.iinfo(np.int32).max, dtype=np.int64).astype(np.int32)
+    assert np.array_equal(sum_rows(rows, DataType.NUMPY_ARRAY_WRAPAROUND_INTEGER32), expected_sum)
+
+
+def test_rows_are_summed_in_worker_process():
+    executor = AggregationExecutor(thread_count=1, process_count=1)
+    rows = np.arange(client_count * element_count, dtype=np.float64).reshape(client_count, element_count)
+
+    try:
+        # twice, so that the worker process attaches to a second shared memory block after releasing the first one
+        for _ in range(2):
+            assert np.array_equal(sum_rows(rows, DataType.NUMPY_ARRAY_FLOAT, executor), rows.sum(axis=0))
+    finally:
+        executor.process_pool.shutdown()
@@ -0,0 +1,162 @@
+"""
+    Test the project snapshots: the last complete snapshot must be restored, a torn record at the end of the snapshot
+    file must be truncated, the file must be compacted to its last snapshot, and only the snapshot attributes of
+    a project may be saved (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.util.snapshot import ProjectSnapshotStore
+
+import numpy as np
+import pytest
+
+project_id = 'project-1'
+
+
+class SampleProject:
+    """ Stand-in for the project class saved in the snapshot records """
+
+
+def snapshot_of_round(comm_round):
+    return {'project_id': project_id, 'comm_round': comm_round, 'global_parameters': {'mean': np.full(3, comm_round)}}
+
+
+def test_last_snapshot_is_restored(tmp_path):
+    snapshot_store = ProjectSnapshotStore(tmp_path / 'snapshot')
+    for comm_round in range(3):
+        snapshot_store.append(project_id, snapshot_store.encode(SampleProject, snapshot_of_round(comm_round)))
+
+    project_class, snapshot = ProjectSnapshotStore(tmp_path / 'snapshot').load(project_id)
+
+    assert project_class.__qualname__ == SampleProject.__qualname__
+    assert snapshot['comm_round'] == 2
+    assert np.array_equal(snapshot['global_parameters']['mean'], np.full(3, 2))
+    assert snapshot_store.get_project_ids() == [project_id]
+
+
+def test_no_snapshot(tmp_path):
+    assert ProjectSnapshotStore(tmp_path).load(project_id) is None
+
+
+@pytest.mark.parametrize('torn_size', [3, ProjectSnapshotStore.RECORD_HEADER.size + 5])
+def test_torn_record_is_truncated(tmp_path, torn_size):
+    snapshot_store = ProjectSnapshotStore(tmp_path)
+    for comm_round in range(2):
+        snapshot_store.append(project_id, snapshot_store.encode(SampleProject, snapshot_of_round(comm_round)))
+
+    # a crash in the middle of appending the record of the next round
+    snapshot_path = snapshot_store.get_snapshot_path(project_id)
+    complete_size = snapshot_path.stat().st_size
+    torn_record = snapshot_store.encode(SampleProject, snapshot_of_round(2))[:torn_size]
+    with open(snapshot_path, 'ab') as snapshot_file:
+        snapshot_file.write(torn_record)
+
+    restarted_store = ProjectSnapshotStore(tmp_path)
+    _, snapshot = restarted_store.load(project_id)
+
+    assert snapshot['comm_round'] == 1
+    assert snapshot_path.stat().st_size == complete_size
+
+    # the next record is appended after the last complete one
+    restarted_store.append(project_id, restarted_store.encode(SampleProject, snapshot_of_round(3)))
+    _, snapshot = ProjectSnapshotStore(tmp_path).load(project_id)
+    assert snapshot['comm_round'] == 3
+
+
+def test_corrupted_record_falls_back_to_previous_snapshot(tmp_path):
+    snapshot_store = ProjectSnapshotStore(tmp_path)
+    snapshot_store.append(project_id, snapshot_store.encode(SampleProject, snapshot_of_round(0)))
+    snapshot_path = snapshot_store.get_snapshot_path(project_id)
+    first_record_size = snapshot_path.stat().st_size
+    snapshot_store.append(project_id, snapshot_store.encode(SampleProject, snapshot_of_round(1)))
+
+    # flip the last byte of the payload of the second record, so that its crc32 does not match
+    snapshot_bytes = bytearray(snapshot_path.read_bytes())
+    snapshot_bytes[-1] ^= 0xff
+    snapshot_path.write_bytes(bytes(snapshot_bytes))
+
+    _, snapshot = ProjectSnapshotStore(tmp_path).load(project_id)
+
+    assert snapshot['comm_round'] == 0
+    assert snapshot_path.stat().st_size == first_record_size
+
+
+def test_file_is_compacted_to_last_snapshot(tmp_path):
+    compaction_record_count = 4
+    snapshot_store = ProjectSnapshotStore(tmp_path, compaction_record_count)
+    record_size = len(snapshot_store.encode(SampleProject, snapshot_of_round(0)))
+
+    for comm_round in range(compaction_record_count + 1):
+        snapshot_store.append(project_id, snapshot_store.encode(SampleProject, snapshot_of_round(comm_round)))
+
+    snapshot_path = snapshot_store.get_snapshot_path(project_id)
+    assert snapshot_path.stat().st_size == record_size
+    assert not snapshot_path.with_suffix('.compacted').exists()
+
+    _, snapshot = ProjectSnapshotStore(tmp_path, compaction_record_count).load(project_id)
+    assert snapshot['comm_round'] == compaction_record_count
+
+
+def test_snapshot_is_removed(tmp_path):
+    snapshot_store = ProjectSnapshotStore(tmp_path)
+    snapshot_store.append(project_id, snapshot_store.encode(SampleProject, snapshot_of_round(0)))
+    snapshot_store.remove(project_id)
+
+    assert snapshot_store.load(project_id) is None
+    assert snapshot_store.get_project_ids() == []
+
+
+# ########## snapshot attributes of the projects (need the Django settings, see conftest.py)
+def bare_project(project_class, **attributes):
+    """ Project of the class with only the given attributes and the transient ones, without touching the database """
+
+    project = project_class.from_snapshot({'project_id': project_id, 'comm_round': 0})
+    project.__dict__.update(attributes)
+
+    return project
+
+
+def test_only_snapshot_attributes_are_saved():
+    pytest.importorskip('django')
+    from hyfed_server.project.hyfed_server_project import HyFedServerProject
+
+    project = bare_project(HyFedServerProject, global_parameters={'mean': 1.0},
+                           local_parameters={'client-1': {'mean': 0.5}})
+    snapshot = project.get_snapshot()
+
+    assert snapshot == {'project_id': project_id, 'comm_round': 0, 'global_parameters': {'mean': 1.0}}
+
+    restored_project = HyFedServerProject.from_snapshot(snapshot)
+    assert restored_project.global_parameters == {'mean': 1.0}
+    assert restored_project.local_parameters == dict()
+
+
+def test_unknown_attribute_fails_the_snapshot():
+    pytest.importorskip('django')
+    from hyfed_server.project.hyfed_server_project import HyFedServerProject
+
+    class DerivedServerProject(HyFedServerProject):
+        pass
+
+    project = bare_project(DerivedServerProject, client_histograms={'client-1': [1, 2, 3]})
+
+    with pytest.raises(ValueError, match='client_histograms'):
+        project.get_snapshot()
+
+    # the attributes that are not snapshot attributes are never restored either
+    restored_project = DerivedServerProject.from_snapshot({'project_id': project_id, 'comm_round': 0,
+                                                           'client_histograms': {'client-1': [1, 2, 3]}})
+    assert not hasattr(restored_project, 'client_histograms')
@@ -0,0 +1,80 @@
+"""
+    Test the sparse arrays: they must match their dense arrays, the values of the duplicate coordinates must be summed,
+    and the sum of the sparse arrays must match the sum of their dense arrays
+    (run from hyfed-server with python -m pytest tests)
+
+    Copyright 2021 Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from hyfed_server.util.sparse import SparseArray, sparse_sum
+from hyfed_server.util import codec
+
+import numpy as np
+import pytest
+
+
+def random_dense_array(generator, shape=(20, 30), density=0.05):
+    return np.where(generator.random(shape) < density, generator.normal(size=shape), 0.0)
+
+
+def test_dense_round_trip():
+    dense_array = random_dense_array(np.random.default_rng(0))
+    sparse_array = SparseArray.from_dense(dense_array)
+
+    assert sparse_array.nnz == np.count_nonzero(dense_array)
+    assert np.all(np.diff(sparse_array.indices) > 0)
+    assert np.array_equal(sparse_array.to_dense(), dense_array)
+
+
+def test_duplicate_coordinates_are_summed():
+    sparse_array = SparseArray.from_coordinates((3, 4), (np.array([2, 0, 2]), np.array([1, 3, 1])),
+                                                np.array([1.5, 2.0, 0.5]))
+
+    expected_array = np.zeros((3, 4))
+    expected_array[2, 1] = 2.0
+    expected_array[0, 3] = 2.0
+
+    assert sparse_array.nnz == 2
+    assert np.array_equal(sparse_array.to_dense(), expected_array)
+
+
+def test_sum_matches_dense_sum():
+    generator = np.random.default_rng(1)
+    dense_arrays = [random_dense_array(generator) for _ in range(5)]
+
+    aggregated_array = sparse_sum([SparseArray.from_dense(dense_array) for dense_array in dense_arrays])
+
+    assert np.allclose(aggregated_array.to_dense(), np.sum(dense_arrays, axis=0))
+    assert aggregated_array.nnz <= sum(np.count_nonzero(dense_array) for dense_array in dense_arrays)
+
+
+def test_empty_and_mismatched_arrays():
+    empty_array = SparseArray.from_dense(np.zeros((4, 4)))
+
+    assert empty_array.nnz == 0
+    assert np.array_equal(sparse_sum([empty_array, empty_array]).to_dense(), np.zeros((4, 4)))
+
+    with pytest.raises(ValueError):
+        sparse_sum([empty_array, SparseArray.from_dense(np.zeros(16))])
+
+
+def test_codec_round_trip():
+    sparse_array = SparseArray.from_dense(random_dense_array(np.random.default_rng(2)))
+
+    decoded_array = codec.decode(codec.encode({'sparse': sparse_array}))['sparse']
+
+    assert decoded_array.shape == sparse_array.shape
+    assert np.array_equal(decoded_array.indices, sparse_array.indices)
+    assert np.array_equal(decoded_array.values, sparse_array.values)
@@ -0,0 +1,35 @@
+/**
+    Per-round summary of the client times (in seconds) and the critical-path client of a project
+
+    Copyright 2021 Julian Matschinske and Reza NasiriGerdeh. All Rights Reserved.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+*/
+
+export interface ClientTimeJson {
+  p50: number;
+  p95: number;
+  max: number;
+  slowest_client: string;
+}
+
+export interface ClientMetricsJson {
+  comm_round: number;
+  client_count: number;
+  critical_path_client: string;
+  upload_delay: ClientTimeJson;
+  computation: ClientTimeJson;
+  network_send: ClientTimeJson;
+  network_receive: ClientTimeJson;
+  idle: ClientTimeJson;
+}
@@ -35,6 +35,13 @@ export interface ProjectJson extends IModelJson {
   client_compensator?: string;
   compensator_server?: string;
   traffic_total?: string;
+
+  // traffic stats if the payloads had been sent without compression
+  client_server_uncompressed?: string;
+  server_client_uncompressed?: string;
+  client_compensator_uncompressed?: string;
+  compensator_server_uncompressed?: string;
+  traffic_total_uncompressed?: string;
 }
 
 export class ProjectModel extends BaseModel<ProjectJson> {
@@ -64,6 +71,12 @@ export class ProjectModel extends BaseModel<ProjectJson> {
   private _compensatorServer: string;
   private _trafficTotal: string;
 
+  private _clientServerUncompressed: string;
+  private _serverClientUncompressed: string;
+  private _clientCompensatorUncompressed: string;
+  private _compensatorServerUncompressed: string;
+  private _trafficTotalUncompressed: string;
+
   constructor() {
     super();
   }
@@ -95,6 +108,12 @@ export class ProjectModel extends BaseModel<ProjectJson> {
     this._compensatorServer = proj.compensator_server;
     this._trafficTotal = proj.traffic_total;
 
+    this._clientServerUncompressed = proj.client_server_uncompressed;
+    this._serverClientUncompressed = proj.server_client_uncompressed;
+    this._clientCompensatorUncompressed = proj.client_compensator_uncompressed;
+    this._compensatorServerUncompressed = proj.compensator_server_uncompressed;
+    this._trafficTotalUncompressed = proj.traffic_total_uncompressed;
+
   }
 
   public get tool(): ToolType {
@@ -185,4 +204,24 @@ export class ProjectModel extends BaseModel<ProjectJson> {
     return this._trafficTotal;
   }
 
+  public get clientServerUncompressed(): string {
+    return this._clientServerUncompressed;
+  }
+
+  public get serverClientUncompressed(): string {
+    return this._serverClientUncompressed;
+  }
+
+  public get clientCompensatorUncompressed(): string {
+    return this._clientCompensatorUncompressed;
+  }
+
+  public get compensatorServerUncompressed(): string {
+    return this._compensatorServerUncompressed;
+  }
+
+  public get trafficTotalUncompressed(): string {
+    return this._trafficTotalUncompressed;
+  }
+
 }
@@ -5,6 +5,7 @@ import { ProjectModel } from '../../models/project.model';
 
 import { ProjectService} from '../../services/project.service';
 import { TokenModel } from '../../models/token.model';
+import { ClientMetricsJson } from '../../models/client-metrics.model';
 import { UserService } from '../../services/user.service';
 import { UserModel } from '../../models/user.model';
 import { environment } from '../../../environments/environment';
@@ -20,6 +21,7 @@ export class ProjectPageComponent implements OnInit, OnDestroy {
   public projectId: string | null = null;
   public project: ProjectModel | null = null;
   public tokens: TokenModel[] = null;
+  public clientMetrics: ClientMetricsJson[] = [];
 
   private interval: any = null;
   private ts = 0;
@@ -67,6 +69,7 @@ export class ProjectPageComponent implements OnInit, OnDestroy {
       if (this.haveRole('coordinator')) {
         await this.refreshTokens();
       }
+      await this.refreshClientMetrics();
       await this.refreshResults();
       this.ts = new Date().getTime();
     }
@@ -93,6 +96,15 @@ export class ProjectPageComponent implements OnInit, OnDestroy {
     // TODO
   }
 
+  private async refreshClientMetrics() {
+    if (!this.project || this.project.status === 'Created') {
+      return;
+    }
+    // the last rounds first
+    const clientMetrics = await this.projectService.getClientMetrics(this.project);
+    this.clientMetrics = (clientMetrics || []).slice(-10).reverse();
+  }
+
   private async refreshTokens() {
     this.tokens = await this.projectService.getTokens(this.project);
   }
@@ -101,6 +113,14 @@ export class ProjectPageComponent implements OnInit, OnDestroy {
     return `${environment.apiUrl}/projects/${this.project.id}/download_results/`;
   }
 
+  public get roundMetricsLink(): string {
+    return `${environment.apiUrl}/projects/${this.project.id}/round_metrics/?output=csv`;
+  }
+
+  public get clientMetricsLink(): string {
+    return `${environment.apiUrl}/projects/${this.project.id}/client_metrics/?output=csv`;
+  }
+
   public get plotSrc(): string {
     return `${environment.apiUrl}/projects/${this.project.id}/plot/?${this.ts}`;
   }
@@ -18,6 +18,7 @@ import { Injectable } from '@angular/core';
 import { ApiService } from './api.service';
 import { ProjectJson, ProjectModel } from '../models/project.model';
 import { TokenJson, TokenModel } from '../models/token.model';
+import { ClientMetricsJson } from '../models/client-metrics.model';
 
 
 @Injectable({
@@ -59,6 +60,10 @@ export class ProjectService {
   }
 
 
+  public async getClientMetrics(proj: ProjectModel): Promise<ClientMetricsJson[]> {
+    return await this.api.get<ClientMetricsJson[]>(`/projects/${proj.id}/client_metrics/`);
+  }
+
   public async createToken(proj: ProjectModel): Promise<TokenModel> {
     return await this.api.post<TokenJson>(`/projects/${proj.id}/create_token/`, {}).then(async (json) => {
       return await this.tokenFromJson(json);